@@ -10,17 +10,32 @@ except Exception:
     genai = None
     GOOGLE_AVAILABLE = False
 import PIL.Image
-import sqlite3
+import PIL.ImageOps
+import PIL.ImageStat
+import asyncio
+import base64
+import concurrent.futures
+import heapq
+import io
 import json
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, g
+import math
+import queue
+import random
+import re
+import threading
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, g
 from flask_cors import CORS
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import IntegrityError
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta, timezone 
 import jwt
 from werkzeug.security import generate_password_hash, check_password_hash
-from functools import wraps
-from decimal import Decimal
+from functools import partial, wraps
+from collections import Counter, OrderedDict, deque
+from decimal import Decimal, ROUND_HALF_UP
 
 #import DB language 
 
@@ -41,15 +56,42 @@ CORS(app, resources={r"/api/*": {"origins": "*"}})
 # basic config
 basedir = os.path.abspath(os.path.dirname(__file__))
 # Use a real sqlite database file (not the .sql schema file).
-db_path = os.path.join(basedir, 'byte_and_bite.db')
+# SQLITE_DB_PATH points the app at another file (tests and benchmarks use a fresh one).
+db_path = os.environ.get('SQLITE_DB_PATH') or os.path.join(basedir, 'byte_and_bite.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.secret_key = os.environ.get('FLASK_SECRET', 'dev-secret')
 
+# SQLite tuning, applied to every pooled connection (override via environment)
+# WAL lets readers keep going while a bid/order commit is in progress, and
+# busy_timeout makes concurrent writers wait instead of failing with "database is locked".
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+app.config['SQLITE_CACHE_SIZE_KB'] = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+
 
 # initialise SQLAlchemy
 db = SQLAlchemy(app)
 
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the configured SQLite pragmas when the pool opens a connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={app.config['SQLITE_JOURNAL_MODE']}")
+    cursor.execute(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+    cursor.execute(f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    cursor.execute(f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{int(app.config['SQLITE_CACHE_SIZE_KB'])}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+with app.app_context():
+    event.listen(db.engine, 'connect', set_sqlite_pragmas)
+
 # SQLAlchemy models
 class Customers(db.Model):
     __tablename__ = 'Customers'
@@ -89,7 +131,7 @@ class Registration_Requests(db.Model):
 class Dishes(db.Model):
     __tablename__ = 'Dishes'
     dish_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    chef_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'))
+    chef_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'), index=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -122,10 +164,14 @@ class VIP_Customers(db.Model):
 
 class Orders(db.Model):
     __tablename__ = 'Orders'
+    __table_args__ = (
+        # Delivery pool lookups: status='Ready for Delivery' AND delivery_person_id IS NULL
+        db.Index('ix_Orders_status_delivery_person_id', 'status', 'delivery_person_id'),
+    )
     order_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
-    chef_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'))
-    delivery_person_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'))
+    customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False, index=True)
+    chef_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'), index=True)
+    delivery_person_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'), index=True)
     status = db.Column(db.String(20), default='Pending')
     total_price = db.Column(db.Numeric(10, 2), nullable=False)
     vip_discount = db.Column(db.Numeric(10, 2), default=0.00)
@@ -139,23 +185,26 @@ class Orders(db.Model):
 class Order_Items(db.Model):
     __tablename__ = 'Order_Items'
     order_id = db.Column(db.Integer, db.ForeignKey('Orders.order_id'), primary_key=True)
-    dish_id = db.Column(db.Integer, db.ForeignKey('Dishes.dish_id'), primary_key=True)
+    dish_id = db.Column(db.Integer, db.ForeignKey('Dishes.dish_id'), primary_key=True, index=True)
     quantity = db.Column(db.Integer, default=1)
 
 class Delivery_Bids(db.Model):
     __tablename__ = 'Delivery_Bids'
+    __table_args__ = (
+        db.Index('ix_Delivery_Bids_order_id_status', 'order_id', 'status'),
+    )
     bidding_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     order_id = db.Column(db.Integer, db.ForeignKey('Orders.order_id'), nullable=False)
     start_time = db.Column(db.DateTime, default=utc_now)
     end_time = db.Column(db.DateTime)
     memo = db.Column(db.Text)
-    status = db.Column(db.String(20), default='created')
+    status = db.Column(db.String(20), default='created', index=True)
 
 class Bid(db.Model):
     __tablename__ = 'Bid'
     bid_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    bidding_id = db.Column(db.Integer, db.ForeignKey('Delivery_Bids.bidding_id'), nullable=False)
-    employee_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'), nullable=False)
+    bidding_id = db.Column(db.Integer, db.ForeignKey('Delivery_Bids.bidding_id'), nullable=False, index=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'), nullable=False, index=True)
     bid_amount = db.Column(db.Numeric(10, 2), nullable=False)
     bid_time = db.Column(db.DateTime, default=utc_now)
     is_winning_bid = db.Column(db.Boolean, default=False)
@@ -163,16 +212,40 @@ class Bid(db.Model):
 class Reviews(db.Model):
     __tablename__ = 'Reviews'
     review_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('Orders.order_id'), nullable=False)
-    customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
-    chef_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'))
-    delivery_person_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'))
+    order_id = db.Column(db.Integer, db.ForeignKey('Orders.order_id'), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False, index=True)
+    chef_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'), index=True)
+    delivery_person_id = db.Column(db.Integer, db.ForeignKey('Employees.employee_id'), index=True)
     chef_rating = db.Column(db.Integer)
     delivery_rating = db.Column(db.Integer)
     dish_rating = db.Column(db.Integer)
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class Dish_Recommendation_Stats(db.Model):
+    __tablename__ = 'Dish_Recommendation_Stats'
+    # Per-dish aggregates behind /api/recommendations, kept in step with Orders/Reviews
+    dish_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    delivered_orders = db.Column(db.Integer, nullable=False, default=0)
+    # Reviews of any order containing the dish (rating_count: those with a dish_rating)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    # The same, limited to delivered orders
+    delivered_review_count = db.Column(db.Integer, nullable=False, default=0)
+    delivered_rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    delivered_rating_count = db.Column(db.Integer, nullable=False, default=0)
+
+class Customer_Dish_Stats(db.Model):
+    __tablename__ = 'Customer_Dish_Stats'
+    # Per-customer, per-dish aggregates for personalized recommendations
+    customer_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    dish_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    delivered_orders = db.Column(db.Integer, nullable=False, default=0)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+
 class Warnings(db.Model):
     __tablename__ = 'Warnings'
     warning_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -198,10 +271,17 @@ class AI_Ratings(db.Model):
     helpful_score = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class Image_Search_Cache(db.Model):
+    __tablename__ = 'Image_Search_Cache'
+    # Vision result per 64-bit dHash (hex) of a prepared search upload
+    image_hash = db.Column(db.String(16), primary_key=True)
+    label = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=utc_now)
+
 class Financial_Log(db.Model):
     __tablename__ = 'Financial_Log'
     log_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'))
+    customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), index=True)
     order_id = db.Column(db.Integer, db.ForeignKey('Orders.order_id'))
     type = db.Column(db.String(20), nullable=False)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
@@ -215,40 +295,60 @@ class Forum_Posts(db.Model):
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50), nullable=False)
+    # Counters maintained by the like/compliment/comment routes (see reconcile_forum_counters)
     likes = db.Column(db.Integer, default=0)
+    compliments = db.Column(db.Integer, default=0)
+    comment_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=utc_now)
     updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
 
 class Forum_Comments(db.Model):
     __tablename__ = 'Forum_Comments'
     comment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    post_id = db.Column(db.Integer, db.ForeignKey('Forum_Posts.post_id'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('Forum_Posts.post_id'), nullable=False, index=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    likes = db.Column(db.Integer, default=0)
+    compliments = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=utc_now)
 
 class Forum_Likes(db.Model):
     __tablename__ = 'Forum_Likes'
+    __table_args__ = (
+        db.Index('ix_Forum_Likes_post_id_customer_id', 'post_id', 'customer_id'),
+    )
     like_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     post_id = db.Column(db.Integer, db.ForeignKey('Forum_Posts.post_id'), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
 class Forum_Comment_Likes(db.Model):
     __tablename__ = 'Forum_Comment_Likes'
+    __table_args__ = (
+        db.Index('ix_Forum_Comment_Likes_comment_id_customer_id', 'comment_id', 'customer_id'),
+    )
     like_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     comment_id = db.Column(db.Integer, db.ForeignKey('Forum_Comments.comment_id'), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
 class Forum_Post_Compliments(db.Model):
     __tablename__ = 'Forum_Post_Compliments'
+    __table_args__ = (
+        db.Index('ix_Forum_Post_Compliments_post_id_customer_id', 'post_id', 'customer_id'),
+    )
     compliment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     post_id = db.Column(db.Integer, db.ForeignKey('Forum_Posts.post_id'), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
 class Forum_Comment_Compliments(db.Model):
     __tablename__ = 'Forum_Comment_Compliments'
+    __table_args__ = (
+        db.Index('ix_Forum_Comment_Compliments_comment_id_customer_id', 'comment_id', 'customer_id'),
+    )
     compliment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     comment_id = db.Column(db.Integer, db.ForeignKey('Forum_Comments.comment_id'), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
 class Forum_Reports(db.Model):
     __tablename__ = 'Forum_Reports'
+    __table_args__ = (
+        db.Index('ix_Forum_Reports_content_type_content_id', 'content_type', 'content_id'),
+    )
     report_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     reporter_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
     content_type = db.Column(db.String(20), nullable=False)  # 'post' or 'comment'
@@ -264,7 +364,7 @@ class Forum_Reports(db.Model):
 class User_Notifications(db.Model):
     __tablename__ = 'User_Notifications'
     notification_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False, index=True)
     title = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
     type = db.Column(db.String(50), nullable=False)  # 'forum_report', 'system', etc.
@@ -272,12 +372,18 @@ class User_Notifications(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=utc_now)
 
+class User_Notification_Counts(db.Model):
+    __tablename__ = 'User_Notification_Counts'
+    # Unread notifications per user_id, kept in step with User_Notifications
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
 class Complaints(db.Model):
     __tablename__ = 'Complaints'
     complaint_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    complainant_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False)  # Who filed the complaint
+    complainant_id = db.Column(db.Integer, db.ForeignKey('Customers.customer_id'), nullable=False, index=True)  # Who filed the complaint
     complainant_type = db.Column(db.String(20), nullable=False)  # 'customer' or 'delivery'
-    accused_id = db.Column(db.Integer, nullable=False)  # ID of accused (customer_id or employee_id)
+    accused_id = db.Column(db.Integer, nullable=False, index=True)  # ID of accused (customer_id or employee_id)
     accused_type = db.Column(db.String(20), nullable=False)  # 'customer', 'chef', 'delivery'
     complaint_type = db.Column(db.String(20), nullable=False)  # 'complaint' or 'compliment'
     category = db.Column(db.String(50), nullable=False)  # 'food_quality', 'service', 'behavior', 'delivery', etc.
@@ -295,50 +401,428 @@ class Complaints(db.Model):
     disputed_at = db.Column(db.DateTime)
     dispute_reason = db.Column(db.Text)
 
-def resolve_expired_biddings():
+# Delivery bidding windows close 5 minutes after the first bid
+BIDDING_WINDOW = timedelta(minutes=5)
+
+
+def resolve_expired_biddings(bidding_ids=None):
     """
-    Checks all active biddings. If 5 minutes have passed since the first bid,
-    automatically assign the order to the lowest bidder.
+    Assign every expired active bidding to its lowest bidder.
+    Winners are picked for all sessions at once with a window query, then
+    Orders, Delivery_Bids and Bid are updated in bulk and committed together.
+    If bidding_ids is given only those sessions are considered.
     """
-    # Find all active biddings
-    active_biddings = Delivery_Bids.query.filter_by(status='active').all()
-    
-    for bidding in active_biddings:
-        # Check time (5 minutes expiration)
-        # Note: start_time should be timezone-aware if using utc_now
-        time_diff = datetime.now(timezone.utc) - bidding.start_time.replace(tzinfo=timezone.utc)
-        
-        if time_diff > timedelta(minutes=5):
-            print(f"[SYSTEM] Bidding #{bidding.bidding_id} expired. Resolving...")
-            
-            # Find all bids for this session
-            bids = Bid.query.filter_by(bidding_id=bidding.bidding_id).all()
-            
-            if not bids:
-                # No bids? Maybe extend time or notify manager (For now, just leave it active)
+    # Stored datetimes are naive UTC
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - BIDDING_WINDOW
+
+    # Rank bids within each expired session: lowest amount first, earliest bid breaks ties
+    ranked = db.session.query(
+        Bid.bid_id, Bid.bidding_id, Bid.employee_id, Bid.bid_amount,
+        Delivery_Bids.order_id,
+        db.func.row_number().over(
+            partition_by=Bid.bidding_id,
+            order_by=(Bid.bid_amount, Bid.bid_id)
+        ).label('bid_rank')
+    ).join(Delivery_Bids, Bid.bidding_id == Delivery_Bids.bidding_id)\
+     .filter(Delivery_Bids.status == 'active', Delivery_Bids.start_time <= cutoff)
+    if bidding_ids is not None:
+        ranked = ranked.filter(Delivery_Bids.bidding_id.in_(bidding_ids))
+    ranked = ranked.subquery()
+
+    # Sessions with no bids have no rows here and simply stay active
+    winners = db.session.query(ranked).filter(ranked.c.bid_rank == 1).all()
+    if not winners:
+        return
+
+    # Bulk UPDATEs skip the flush hooks, so queue the status events by hand
+    orders = {o.order_id: o for o in db.session.query(
+        Orders.order_id, Orders.status, Orders.customer_id, Orders.chef_id
+    ).filter(Orders.order_id.in_([w.order_id for w in winners]))}
+    for w in winners:
+        o = orders[w.order_id]
+        queue_order_event(db.session, w.order_id, 'In Transit', o.status, o.customer_id, o.chef_id, w.employee_id)
+
+    # 1. Assign orders to the winning employees (executemany by primary key)
+    db.session.execute(db.update(Orders), [
+        {'order_id': w.order_id, 'delivery_person_id': w.employee_id, 'status': 'In Transit'}
+        for w in winners
+    ])
+
+    # 2. Close the bidding sessions
+    Delivery_Bids.query.filter(Delivery_Bids.bidding_id.in_([w.bidding_id for w in winners]))\
+        .update({'status': 'completed', 'end_time': datetime.now(timezone.utc)}, synchronize_session=False)
+
+    # 3. Mark the winning bids
+    Bid.query.filter(Bid.bid_id.in_([w.bid_id for w in winners]))\
+        .update({'is_winning_bid': True}, synchronize_session=False)
+
+    db.session.commit()
+    for w in winners:
+        print(f"[SYSTEM] Order #{w.order_id} assigned to Emp #{w.employee_id} at ${w.bid_amount} (bidding #{w.bidding_id})")
+
+
+# Bidding scheduler
+# A background thread sleeps until the earliest bidding deadline (kept in a
+# min-heap) and settles only the sessions that have expired, so dashboard
+# GET endpoints never do settlement work.
+bidding_deadlines = []  # heap of (deadline, bidding_id), deadlines naive UTC
+bidding_scheduler_cond = threading.Condition()
+bidding_scheduler_started = False
+
+
+def schedule_bidding_deadline(bidding_id, start_time):
+    """Register a bidding session so the scheduler wakes when it closes."""
+    deadline = start_time.replace(tzinfo=None) + BIDDING_WINDOW
+    with bidding_scheduler_cond:
+        heapq.heappush(bidding_deadlines, (deadline, bidding_id))
+        bidding_scheduler_cond.notify()
+
+
+def run_bidding_scheduler():
+    while True:
+        with bidding_scheduler_cond:
+            while True:
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                if bidding_deadlines and bidding_deadlines[0][0] <= now:
+                    break
+                timeout = (bidding_deadlines[0][0] - now).total_seconds() if bidding_deadlines else None
+                bidding_scheduler_cond.wait(timeout)
+
+            due_ids = []
+            while bidding_deadlines and bidding_deadlines[0][0] <= now:
+                due_ids.append(heapq.heappop(bidding_deadlines)[1])
+
+        with app.app_context():
+            try:
+                resolve_expired_biddings(due_ids)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[SYSTEM] Bidding resolution failed, retrying shortly: {e}")
+                retry_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=5)
+                with bidding_scheduler_cond:
+                    for bidding_id in due_ids:
+                        heapq.heappush(bidding_deadlines, (retry_at, bidding_id))
+            finally:
+                db.session.remove()
+
+
+def start_bidding_scheduler():
+    """Load open biddings into the heap and start the scheduler thread (once)."""
+    global bidding_scheduler_started
+    with bidding_scheduler_cond:
+        if bidding_scheduler_started:
+            return
+        bidding_scheduler_started = True
+
+    with app.app_context():
+        for bidding in Delivery_Bids.query.filter_by(status='active').all():
+            schedule_bidding_deadline(bidding.bidding_id, bidding.start_time)
+
+    threading.Thread(target=run_bidding_scheduler, name='bidding-scheduler', daemon=True).start()
+
+
+@app.before_request
+def ensure_bidding_scheduler():
+    # Started from the first request rather than at import so the reloader
+    # parent process and scripts importing app (seed_data.py) don't run it.
+    if not bidding_scheduler_started:
+        start_bidding_scheduler()
+
+
+def ensure_columns():
+    """
+    Add any model column that is missing from an existing table.
+    db.create_all() never alters existing tables, so columns added to a model
+    later (e.g. the forum counters) are added here with their scalar default.
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
                 continue
-                
-            # Find lowest bid
-            winning_bid = min(bids, key=lambda x: x.bid_amount)
-            
-            # 1. Update Order (Assign Employee)
-            order = Orders.query.get(bidding.order_id)
-            order.delivery_person_id = winning_bid.employee_id
-            order.status = 'In Transit'
-            
-            # 2. Update Bidding status
-            bidding.status = 'completed'
-            
-            # 3. Update Bid status
-            winning_bid.is_winning_bid = True
-            
-            db.session.commit()
-            print(f"[SYSTEM] Order #{order.order_id} assigned to Emp #{winning_bid.employee_id} at ${winning_bid.bid_amount}")
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column.type.compile(dialect=db.engine.dialect)}'
+                if column.default is not None and column.default.is_scalar:
+                    ddl += f' DEFAULT {column.default.arg!r}'
+                conn.execute(db.text(ddl))
+                print(f"[SYSTEM] Added column {table.name}.{column.name}")
+
+
+def ensure_indexes():
+    """
+    Create any model-declared index that is missing from the database.
+    db.create_all() only builds indexes for new tables, so existing databases
+    get them here. Safe to run on every startup (CREATE INDEX IF NOT EXISTS).
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def ensure_dish_search_index():
+    """
+    Create the Dishes_FTS full-text index (FTS5, external content over Dishes)
+    and the triggers that keep it in step with dish inserts, edits and deletes,
+    then rebuild it so rows written before the triggers existed are included.
+    """
+    statements = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS Dishes_FTS USING fts5(
+            name, description, content='Dishes', content_rowid='dish_id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS Dishes_FTS_insert AFTER INSERT ON Dishes BEGIN
+            INSERT INTO Dishes_FTS(rowid, name, description) VALUES (new.dish_id, new.name, new.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS Dishes_FTS_delete AFTER DELETE ON Dishes BEGIN
+            INSERT INTO Dishes_FTS(Dishes_FTS, rowid, name, description) VALUES ('delete', old.dish_id, old.name, old.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS Dishes_FTS_update AFTER UPDATE OF name, description ON Dishes BEGIN
+            INSERT INTO Dishes_FTS(Dishes_FTS, rowid, name, description) VALUES ('delete', old.dish_id, old.name, old.description);
+            INSERT INTO Dishes_FTS(rowid, name, description) VALUES (new.dish_id, new.name, new.description);
+        END""",
+        "INSERT INTO Dishes_FTS(Dishes_FTS) VALUES ('rebuild')",
+    ]
+    with db.engine.begin() as conn:
+        for statement in statements:
+            conn.execute(db.text(statement))
+
+
+# Forum counter reconciliation
+# Like/compliment/comment counts are kept on Forum_Posts and Forum_Comments and
+# bumped in the same transaction as the toggle. This job recomputes them from
+# the junction tables and repairs any row that drifted (manual SQL, a crash
+# between statements, rows deleted by hand). Runs at startup and periodically.
+FORUM_COUNTER_RECONCILE_INTERVAL = int(os.environ.get('FORUM_COUNTER_RECONCILE_INTERVAL', 6 * 60 * 60))  # seconds
+forum_counter_job_started = False
+forum_counter_job_lock = threading.Lock()
+
+
+def reconcile_forum_counters():
+    """Recompute every forum counter; only rows whose value differs are written."""
+    targets = [
+        (Forum_Posts, Forum_Posts.post_id, Forum_Posts.likes, Forum_Likes.post_id),
+        (Forum_Posts, Forum_Posts.post_id, Forum_Posts.compliments, Forum_Post_Compliments.post_id),
+        (Forum_Posts, Forum_Posts.post_id, Forum_Posts.comment_count, Forum_Comments.post_id),
+        (Forum_Comments, Forum_Comments.comment_id, Forum_Comments.likes, Forum_Comment_Likes.comment_id),
+        (Forum_Comments, Forum_Comments.comment_id, Forum_Comments.compliments, Forum_Comment_Compliments.comment_id),
+    ]
+    repaired = 0
+    for model, pk, counter, fk in targets:
+        actual = db.select(db.func.count()).select_from(fk.table).where(fk == pk).scalar_subquery()
+        result = db.session.execute(
+            db.update(model)
+            .where(db.func.coalesce(counter, -1) != actual)
+            .values({counter: actual})
+        )
+        repaired += result.rowcount
+    db.session.commit()
+    if repaired:
+        print(f"[SYSTEM] Reconciled {repaired} forum counter(s)")
+    return repaired
+
+
+def run_forum_counter_job():
+    while True:
+        time.sleep(FORUM_COUNTER_RECONCILE_INTERVAL)
+        with app.app_context():
+            try:
+                reconcile_forum_counters()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[SYSTEM] Forum counter reconciliation failed: {e}")
+            finally:
+                db.session.remove()
+
+
+@app.before_request
+def ensure_forum_counter_job():
+    global forum_counter_job_started
+    if forum_counter_job_started:
+        return
+    with forum_counter_job_lock:
+        if forum_counter_job_started:
+            return
+        forum_counter_job_started = True
+    threading.Thread(target=run_forum_counter_job, name='forum-counter-job', daemon=True).start()
+
+
+# Unread notification counts
+# Inserts, deletes and ORM is_read changes adjust User_Notification_Counts in
+# the same flush via mapper events; bulk UPDATEs call adjust_unread_count
+# themselves. The table is rebuilt from User_Notifications at startup.
+def adjust_unread_count(connection, user_id, delta):
+    stmt = sqlite_insert(User_Notification_Counts).values(user_id=user_id, unread_count=max(delta, 0))
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={'unread_count': db.func.max(User_Notification_Counts.unread_count + delta, 0)}
+    ))
+
+
+@event.listens_for(User_Notifications, 'after_insert')
+def count_inserted_notification(mapper, connection, target):
+    if not target.is_read:
+        adjust_unread_count(connection, target.user_id, 1)
+
+
+@event.listens_for(User_Notifications, 'after_update')
+def count_updated_notification(mapper, connection, target):
+    history = db.inspect(target).attrs.is_read.history
+    if history.has_changes():
+        was_read = bool(history.deleted[0]) if history.deleted else False
+        if was_read != bool(target.is_read):
+            adjust_unread_count(connection, target.user_id, 1 if was_read else -1)
+
+
+@event.listens_for(User_Notifications, 'after_delete')
+def count_deleted_notification(mapper, connection, target):
+    if not target.is_read:
+        adjust_unread_count(connection, target.user_id, -1)
+
+
+def reconcile_unread_counts():
+    """Rebuild User_Notification_Counts from User_Notifications."""
+    db.session.execute(db.delete(User_Notification_Counts))
+    db.session.execute(db.insert(User_Notification_Counts).from_select(
+        ['user_id', 'unread_count'],
+        db.select(User_Notifications.user_id, db.func.count())
+        .where(User_Notifications.is_read.isnot(True))
+        .group_by(User_Notifications.user_id)
+    ))
+    db.session.commit()
+
+
+def bump_counter(model, pk_col, pk, counter, delta):
+    """Atomically add delta to a counter column in the current transaction."""
+    model.query.filter(pk_col == pk).update(
+        {counter: db.func.coalesce(counter, 0) + delta},
+        synchronize_session=False
+    )
+
+
+# Recommendation aggregates
+# Dish_Recommendation_Stats and Customer_Dish_Stats hold the counts and rating
+# sums /api/recommendations ranks by. Mapper events update them in the same
+# transaction when an order enters or leaves 'Delivered' and when a review is
+# created; rebuild_recommendation_stats() recomputes both tables at startup.
+def adjust_recommendation_stats(connection, model, keys, deltas):
+    stmt = sqlite_insert(model).values(**keys, **deltas)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: getattr(model, column) + delta for column, delta in deltas.items()}
+    ))
+
+
+def order_dish_ids(connection, order_id):
+    return connection.execute(
+        db.select(Order_Items.dish_id).where(Order_Items.order_id == order_id)
+    ).scalars().all()
+
+
+def review_deltas(review_count, rating_sum, rating_count, prefix=''):
+    return {
+        f'{prefix}review_count': review_count,
+        f'{prefix}rating_sum': rating_sum,
+        f'{prefix}rating_count': rating_count
+    }
+
+
+@event.listens_for(Orders, 'after_update')
+def track_delivered_order(mapper, connection, target):
+    history = db.inspect(target).attrs.status.history
+    if not history.has_changes():
+        return
+    was_delivered = bool(history.deleted) and history.deleted[0] == 'Delivered'
+    if was_delivered == (target.status == 'Delivered'):
+        return
+
+    sign = -1 if was_delivered else 1
+    # Reviews already on the order move in/out of the delivered-only figures
+    review_count, rating_sum, rating_count = connection.execute(
+        db.select(db.func.count(Reviews.review_id), db.func.coalesce(db.func.sum(Reviews.dish_rating), 0), db.func.count(Reviews.dish_rating))
+        .where(Reviews.order_id == target.order_id)
+    ).one()
+    for dish_id in order_dish_ids(connection, target.order_id):
+        adjust_recommendation_stats(connection, Dish_Recommendation_Stats, {'dish_id': dish_id}, {
+            'delivered_orders': sign,
+            **review_deltas(sign * review_count, sign * rating_sum, sign * rating_count, 'delivered_')
+        })
+        adjust_recommendation_stats(connection, Customer_Dish_Stats,
+                                    {'customer_id': target.customer_id, 'dish_id': dish_id},
+                                    {'delivered_orders': sign})
+
+
+@event.listens_for(Reviews, 'after_insert')
+def track_review(mapper, connection, target):
+    order = connection.execute(
+        db.select(Orders.customer_id, Orders.status).where(Orders.order_id == target.order_id)
+    ).first()
+    if order is None:
+        return
+
+    rating = target.dish_rating
+    deltas = review_deltas(1, rating or 0, 0 if rating is None else 1)
+    dish_deltas = dict(deltas)
+    if order.status == 'Delivered':
+        dish_deltas.update(review_deltas(1, rating or 0, 0 if rating is None else 1, 'delivered_'))
+    for dish_id in order_dish_ids(connection, target.order_id):
+        adjust_recommendation_stats(connection, Dish_Recommendation_Stats, {'dish_id': dish_id}, dish_deltas)
+        adjust_recommendation_stats(connection, Customer_Dish_Stats,
+                                    {'customer_id': order.customer_id, 'dish_id': dish_id}, deltas)
+
+
+def rebuild_recommendation_stats():
+    """Recompute both recommendation aggregate tables from Orders, Order_Items and Reviews."""
+    delivered = db.case((Orders.status == 'Delivered', 1), else_=0)
+    delivered_review = db.case((Orders.status == 'Delivered', Reviews.review_id))
+    delivered_rating = db.case((Orders.status == 'Delivered', Reviews.dish_rating))
+    # One row per (order, dish) with the order's review figures (at most one review per order)
+    per_item = db.select(
+        Orders.customer_id, Order_Items.dish_id,
+        delivered.label('delivered'),
+        db.func.count(Reviews.review_id).label('review_count'),
+        db.func.coalesce(db.func.sum(Reviews.dish_rating), 0).label('rating_sum'),
+        db.func.count(Reviews.dish_rating).label('rating_count'),
+        db.func.count(delivered_review).label('delivered_review_count'),
+        db.func.coalesce(db.func.sum(delivered_rating), 0).label('delivered_rating_sum'),
+        db.func.count(delivered_rating).label('delivered_rating_count')
+    ).join(Orders, Orders.order_id == Order_Items.order_id)\
+     .outerjoin(Reviews, Reviews.order_id == Orders.order_id)\
+     .group_by(Order_Items.order_id, Order_Items.dish_id).subquery()
+
+    db.session.execute(db.delete(Dish_Recommendation_Stats))
+    db.session.execute(db.insert(Dish_Recommendation_Stats).from_select(
+        ['dish_id', 'delivered_orders', 'review_count', 'rating_sum', 'rating_count',
+         'delivered_review_count', 'delivered_rating_sum', 'delivered_rating_count'],
+        db.select(
+            per_item.c.dish_id, db.func.sum(per_item.c.delivered),
+            db.func.sum(per_item.c.review_count), db.func.sum(per_item.c.rating_sum), db.func.sum(per_item.c.rating_count),
+            db.func.sum(per_item.c.delivered_review_count), db.func.sum(per_item.c.delivered_rating_sum),
+            db.func.sum(per_item.c.delivered_rating_count)
+        ).group_by(per_item.c.dish_id)
+    ))
+    db.session.execute(db.delete(Customer_Dish_Stats))
+    db.session.execute(db.insert(Customer_Dish_Stats).from_select(
+        ['customer_id', 'dish_id', 'delivered_orders', 'review_count', 'rating_sum', 'rating_count'],
+        db.select(
+            per_item.c.customer_id, per_item.c.dish_id, db.func.sum(per_item.c.delivered),
+            db.func.sum(per_item.c.review_count), db.func.sum(per_item.c.rating_sum), db.func.sum(per_item.c.rating_count)
+        ).group_by(per_item.c.customer_id, per_item.c.dish_id)
+    ))
+    db.session.commit()
 
 
 # Create all tables (commented out since DB is initialized from SQL)
 with app.app_context():#wei
     db.create_all()
+    ensure_columns()
+    ensure_indexes()
+    ensure_dish_search_index()
+    reconcile_forum_counters()  # Backfills the counters on first run
+    reconcile_unread_counts()
+    rebuild_recommendation_stats()
 
 # Seed dishes if not exists
 with app.app_context():
@@ -470,10 +954,9 @@ def checkout():
     auth_header = request.headers.get('Authorization')
     if auth_header:
         try:
-            token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-            payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+            payload = decode_auth_header(auth_header)
             email = payload.get('email')
-            user = Customers.query.filter_by(email=email).first()
+            user = current_customer(payload)
             print(f"[CHECKOUT] Found user: {user.email if user else None}, current order_count: {user.order_count if user else None}")
             if user:
                 user.order_count = (user.order_count or 0) + 1
@@ -498,88 +981,159 @@ def health_check():
     return jsonify({"status": "healthy", "message": "Backend is running"})
 
 
+# Menu response cache
+# The menu only changes when chefs edit dishes or new orders/reviews change the
+# aggregates, so serialized responses are cached per variant ('vip' / 'public')
+# and invalidated by bumping a version counter.
+# Dish, chef and review changes bump the version at once. New orders only move
+# the chef order counts, so they just mark the menu stale and the version is
+# bumped at most once per MENU_ORDER_REFRESH_SECONDS; at peak, checkouts would
+# otherwise invalidate the menu (and every client's ETag) on every request.
+# Single dishes (/api/menu/<id>) carry no aggregates and have their own
+# versions, bumped only when that dish is created, edited or deleted.
+MENU_ORDER_REFRESH_SECONDS = 5
+menu_cache_lock = threading.Lock()
+menu_cache_version = int(time.time())  # Seeded from boot time so ETags never repeat across restarts
+menu_cache = {}  # variant -> (version, serialized JSON body)
+menu_orders_stale = False
+menu_orders_refreshed_at = time.monotonic()
+MENU_ITEM_BOOT_VERSION = int(time.time())  # Same seeding as menu_cache_version
+menu_item_version_seq = MENU_ITEM_BOOT_VERSION
+menu_item_versions = {}  # dish_id (str) -> version; dishes not in here are at the boot version
+menu_item_cache = {}  # dish_id (str) -> (version, serialized JSON body)
+
+
+def invalidate_menu_cache():
+    """Bump the menu version so cached menus and ETags become stale."""
+    with menu_cache_lock:
+        bump_menu_version()
+
+
+def bump_menu_version():
+    # Caller holds menu_cache_lock
+    global menu_cache_version, menu_orders_stale, menu_orders_refreshed_at
+    menu_cache_version += 1
+    menu_cache.clear()
+    # The rebuild picks up any pending order counts too
+    menu_orders_stale = False
+    menu_orders_refreshed_at = time.monotonic()
+
+
+def mark_menu_orders_changed():
+    """Chef order counts changed; current_menu_version() folds this into the next batched bump."""
+    global menu_orders_stale
+    menu_orders_stale = True
+
+
+def current_menu_version():
+    if menu_orders_stale and time.monotonic() - menu_orders_refreshed_at >= MENU_ORDER_REFRESH_SECONDS:
+        with menu_cache_lock:
+            # Re-checked under the lock so concurrent requests bump only once
+            if menu_orders_stale and time.monotonic() - menu_orders_refreshed_at >= MENU_ORDER_REFRESH_SECONDS:
+                bump_menu_version()
+    return menu_cache_version
+
+
+def invalidate_menu_item(dish_id):
+    """Give one dish a new version so its cached body and ETag become stale."""
+    global menu_item_version_seq
+    key = str(dish_id)
+    with menu_cache_lock:
+        menu_item_version_seq += 1
+        menu_item_versions[key] = menu_item_version_seq
+        menu_item_cache.pop(key, None)
+
+
+def menu_etag(variant, version=None):
+    if version is None:
+        version = menu_cache_version
+    return f'menu-v{version}-{variant}'
+
+
+def not_modified(etag):
+    """Return a bodiless 304 if the client already holds this ETag, else None."""
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
 # Get single menu item
+# Goes through the shared SQLAlchemy engine pool; the statement is compiled once
+# and sqlite3 keeps it prepared per pooled connection.
+dish_by_id_query = db.text("SELECT * FROM Dishes WHERE dish_id = :dish_id")
+
 @app.route('/api/menu/<item_id>', methods=['GET'])
 def get_menu_item(item_id):
-    # Query menu item from database
-    db_conn = sqlite3.connect(db_path)
-    db_conn.row_factory = sqlite3.Row
-    cursor = db_conn.cursor()
-    cursor.execute("SELECT * FROM Dishes WHERE dish_id = ?", (item_id,))
-    row = cursor.fetchone()
-    db_conn.close()
-    if row:
+    cache_key = str(item_id)
+    version = menu_item_versions.get(cache_key, MENU_ITEM_BOOT_VERSION)
+    etag = f'menu-item-{cache_key}-v{version}'
+    cached_response = not_modified(etag)
+    if cached_response:
+        return cached_response
+
+    cached = menu_item_cache.get(cache_key)
+    if cached and cached[0] == version:
+        body = cached[1]
+    else:
+        # Query menu item from database
+        row = db.session.execute(dish_by_id_query, {'dish_id': item_id}).mappings().first()
+        if not row:
+            return jsonify({"error": "Item not found"}), 404
         item = dict(row)
         # Rename dish_id to id for frontend compatibility
         item['id'] = str(item.pop('dish_id'))
         item['price'] = float(item['price']) if item['price'] else 0
-        return jsonify(item)
-    return jsonify({"error": "Item not found"}), 404
+        body = jsonify(item).get_data()
+        with menu_cache_lock:
+            # Only store if the dish wasn't changed while we were reading it
+            if menu_item_versions.get(cache_key, MENU_ITEM_BOOT_VERSION) == version:
+                menu_item_cache[cache_key] = (version, body)
 
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-# Get all menu items
-@app.route('/api/menu', methods=['GET'])
-def get_menu():
-    category = request.args.get('category')
-    
-    # Check if user is authenticated and get VIP status
-    is_vip = False
-    auth_header = request.headers.get('Authorization')
-    if auth_header:
-        try:
-            token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-            payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-            email = payload.get('email')
-            role = payload.get('role')
-            
-            # Check if this is a customer
-            if role == 'Customer':
-                customer = Customers.query.filter_by(email=email).first()
-                if customer:
-                    # Check if customer is VIP
-                    vip_customer = VIP_Customers.query.filter_by(customer_id=customer.customer_id).first()
-                    is_vip = vip_customer is not None
-        except Exception as e:
-            # If token is invalid, treat as unauthenticated
-            pass
-    
-    # Get dishes based on VIP status
-    if is_vip:
-        # VIP customers see all dishes
-        dishes = Dishes.query.all()
-    else:
+
+def build_menu_items(include_vip=False):
+    """
+    Build the full menu list in a single grouped query.
+    Chef order counts and dish ratings are aggregated in subqueries and
+    outer-joined onto Dishes, instead of running 3 queries per dish.
+    """
+    # Orders per chef
+    chef_orders = db.session.query(
+        Orders.chef_id.label('chef_id'),
+        db.func.count(Orders.order_id).label('order_count')
+    ).group_by(Orders.chef_id).subquery()
+
+    # Average dish rating across reviews of orders containing the dish
+    dish_ratings = db.session.query(
+        Order_Items.dish_id.label('dish_id'),
+        db.func.avg(Reviews.dish_rating).label('avg_rating')
+    ).join(Reviews, Reviews.order_id == Order_Items.order_id)\
+     .group_by(Order_Items.dish_id).subquery()
+
+    query = db.session.query(
+        Dishes,
+        Employees.name.label('chef_name'),
+        Employees.profile_image_url.label('chef_image'),
+        chef_orders.c.order_count,
+        dish_ratings.c.avg_rating
+    ).outerjoin(Employees, Dishes.chef_id == Employees.employee_id)\
+     .outerjoin(chef_orders, Dishes.chef_id == chef_orders.c.chef_id)\
+     .outerjoin(dish_ratings, Dishes.dish_id == dish_ratings.c.dish_id)
+
+    if not include_vip:
         # Non-VIP customers and visitors only see non-VIP dishes
-        dishes = Dishes.query.filter_by(is_vip=False).all()
-    
+        query = query.filter(Dishes.is_vip == False)
+
     menu_items = []
-    for dish in dishes:
-        # Get chef name, image, and order count if chef_id exists
-        chef_name = None
-        chef_image = None
-        chef_order_count = None
-        if dish.chef_id:
-            chef = Employees.query.filter_by(employee_id=dish.chef_id).first()
-            if chef:
-                chef_name = chef.name
-                chef_image = chef.profile_image_url
-                # Count orders assigned to this chef
-                chef_order_count = Orders.query.filter_by(chef_id=dish.chef_id).count()
-        
-        # Calculate average rating for this dish
-        avg_rating = None
-        try:
-            # Get all reviews for orders containing this dish
-            rating_result = db.session.query(db.func.avg(Reviews.dish_rating)).\
-                join(Order_Items, Reviews.order_id == Order_Items.order_id).\
-                filter(Order_Items.dish_id == dish.dish_id).\
-                scalar()
-            if rating_result is not None:
-                avg_rating = round(float(rating_result), 1)
-        except Exception as e:
-            # If there's an error calculating rating, just continue without it
-            pass
-        
-        item = {
+    for dish, chef_name, chef_image, order_count, avg_rating in query.order_by(Dishes.dish_id).all():
+        has_chef = chef_name is not None
+        menu_items.append({
             'id': str(dish.dish_id),
             'name': dish.name,
             'price': float(dish.price),
@@ -588,17 +1142,253 @@ def get_menu():
             'is_vip': dish.is_vip,
             'chef_name': chef_name,
             'chef_image': chef_image,
-            'chef_order_count': chef_order_count,
-            'rating': avg_rating
-        }
-        menu_items.append(item)
+            'chef_order_count': (order_count or 0) if has_chef else None,
+            'rating': round(float(avg_rating), 1) if avg_rating is not None else None
+        })
+    return menu_items
+
+
+def request_is_vip():
+    """True if the request carries a valid token for a VIP customer."""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return False
+    try:
+        payload = decode_auth_header(auth_header)
+        email = payload.get('email')
+        role = payload.get('role')
+        
+        # Check if this is a customer
+        if role == 'Customer':
+            # Check if customer is VIP (single join instead of two lookups)
+            vip_customer = db.session.query(VIP_Customers.customer_id)\
+                .join(Customers, VIP_Customers.customer_id == Customers.customer_id)\
+                .filter(Customers.email == email).first()
+            return vip_customer is not None
+    except Exception as e:
+        # If token is invalid, treat as unauthenticated
+        pass
+    return False
+
+
+# Get all menu items
+@app.route('/api/menu', methods=['GET'])
+def get_menu():
+    category = request.args.get('category')
+    
+    # Check if user is authenticated and get VIP status
+    is_vip = request_is_vip()
     
     # Filter by category if provided (though schema doesn't have category, maybe add later)
     if category:
         # For now, no category filter
         pass
     
-    return jsonify(menu_items)
+    variant = 'vip' if is_vip else 'public'
+    version = current_menu_version()
+    etag = menu_etag(variant, version)
+
+    # Client already has the current menu: skip the DB and serialization entirely
+    cached_response = not_modified(etag)
+    if cached_response:
+        return cached_response
+
+    cached = menu_cache.get(variant)
+    if cached and cached[0] == version:
+        body = cached[1]
+    else:
+        body = jsonify(build_menu_items(include_vip=is_vip)).get_data()
+        with menu_cache_lock:
+            # Only store if no invalidation happened while we were building
+            if menu_cache_version == version:
+                menu_cache[variant] = (version, body)
+
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Dish search
+# Text search runs against the Dishes_FTS index (see ensure_dish_search_index),
+# ranked by bm25 with name matches weighted above description matches. Each
+# word of the query is matched as a prefix and words are OR-ed, so dishes
+# matching more (and rarer) words rank first.
+DISH_SEARCH_NAME_WEIGHT = 10.0
+DISH_SEARCH_DESCRIPTION_WEIGHT = 1.0
+DISH_SEARCH_DEFAULT_LIMIT = 20
+DISH_SEARCH_MAX_LIMIT = 50
+
+
+def dish_search_query(text):
+    """Build an FTS5 MATCH expression from free text, or None if it has no words."""
+    words = re.findall(r"\w+", (text or '').lower())
+    if not words:
+        return None
+    # Quoted so user input can't inject FTS syntax (AND/NEAR/column filters)
+    return " OR ".join(f'"{word}"*' for word in dict.fromkeys(words))
+
+
+def search_dishes(text, limit=DISH_SEARCH_DEFAULT_LIMIT, include_vip=True):
+    """Return [(Dishes, chef_name)] best match first."""
+    match = dish_search_query(text)
+    if match is None:
+        return []
+    fts = db.table('Dishes_FTS', db.column('rowid'))
+    rank = db.func.bm25(db.literal_column('Dishes_FTS'), DISH_SEARCH_NAME_WEIGHT, DISH_SEARCH_DESCRIPTION_WEIGHT)
+    query = db.session.query(Dishes, Employees.name)\
+        .join(fts, fts.c.rowid == Dishes.dish_id)\
+        .outerjoin(Employees, Dishes.chef_id == Employees.employee_id)\
+        .filter(db.literal_column('Dishes_FTS').op('MATCH')(match))
+    if not include_vip:
+        query = query.filter(Dishes.is_vip == False)
+    return query.order_by(rank, Dishes.dish_id).limit(limit).all()
+
+
+def serialize_search_results(rows):
+    return [{
+        'id': str(dish.dish_id),
+        'name': dish.name,
+        'price': float(dish.price),
+        'description': dish.description,
+        'image': dish.image_url,
+        'is_vip': dish.is_vip,
+        'chef_name': chef_name or "Unknown"
+    } for dish, chef_name in rows]
+
+
+# Typo-tolerant dish search
+# An in-memory trigram index over the words of dish names and descriptions
+# (kb_tokenize normalization). A query word matches any indexed word whose
+# trigram Dice similarity is at least DISH_FUZZY_MIN_SIMILARITY, so "ramn" finds
+# "ramen" and "bun" finds "buns". The index is loaded on first use and then
+# updated per dish from the session's after_commit hook.
+DISH_FUZZY_MIN_SIMILARITY = 0.45
+DISH_FUZZY_NAME_WEIGHT = 2.0
+DISH_FUZZY_DESCRIPTION_WEIGHT = 1.0
+dish_fuzzy_lock = threading.Lock()
+dish_fuzzy_loaded = False
+dish_fuzzy_docs = {}  # dish_id -> {"is_vip", "words": {word: weight}}
+dish_fuzzy_postings = {}  # word -> {dish_id: weight}
+dish_fuzzy_word_grams = {}  # word -> frozenset of trigrams
+dish_fuzzy_trigrams = {}  # trigram -> set of words
+
+
+def word_trigrams(word):
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def unindex_dish_fuzzy(dish_id):
+    doc = dish_fuzzy_docs.pop(dish_id, None)
+    if doc is None:
+        return
+    for word in doc['words']:
+        postings = dish_fuzzy_postings[word]
+        postings.pop(dish_id, None)
+        if not postings:
+            del dish_fuzzy_postings[word]
+            for gram in dish_fuzzy_word_grams.pop(word):
+                dish_fuzzy_trigrams[gram].discard(word)
+                if not dish_fuzzy_trigrams[gram]:
+                    del dish_fuzzy_trigrams[gram]
+
+
+def index_dish_fuzzy(dish_id, name, description, is_vip):
+    unindex_dish_fuzzy(dish_id)
+    words = {}
+    for word in kb_tokenize(description):
+        words[word] = DISH_FUZZY_DESCRIPTION_WEIGHT
+    for word in kb_tokenize(name):
+        words[word] = DISH_FUZZY_NAME_WEIGHT
+    dish_fuzzy_docs[dish_id] = {"is_vip": bool(is_vip), "words": words}
+    for word, weight in words.items():
+        if word not in dish_fuzzy_postings:
+            dish_fuzzy_postings[word] = {}
+            grams = dish_fuzzy_word_grams[word] = word_trigrams(word)
+            for gram in grams:
+                dish_fuzzy_trigrams.setdefault(gram, set()).add(word)
+        dish_fuzzy_postings[word][dish_id] = weight
+
+
+def load_dish_fuzzy_index():
+    global dish_fuzzy_loaded
+    with dish_fuzzy_lock:
+        if dish_fuzzy_loaded:
+            return
+        rows = db.session.query(Dishes.dish_id, Dishes.name, Dishes.description, Dishes.is_vip).all()
+        for row in rows:
+            index_dish_fuzzy(*row)
+        dish_fuzzy_loaded = True
+
+
+def apply_dish_fuzzy_changes(changes):
+    """changes: {dish_id: (name, description, is_vip) or None if deleted}."""
+    with dish_fuzzy_lock:
+        if not dish_fuzzy_loaded:
+            return  # The first load will read the committed rows
+        for dish_id, values in changes.items():
+            if values is None:
+                unindex_dish_fuzzy(dish_id)
+            else:
+                index_dish_fuzzy(dish_id, *values)
+
+
+def fuzzy_search_dish_ids(text, limit=DISH_SEARCH_DEFAULT_LIMIT, include_vip=True):
+    """Return dish ids ranked by summed best-word similarity per query word."""
+    load_dish_fuzzy_index()
+    scores = Counter()
+    with dish_fuzzy_lock:
+        for term in dict.fromkeys(kb_tokenize(text)):
+            grams = word_trigrams(term)
+            shared = Counter()
+            for gram in grams:
+                shared.update(dish_fuzzy_trigrams.get(gram, ()))
+            best = {}
+            for word, count in shared.items():
+                similarity = 2 * count / (len(grams) + len(dish_fuzzy_word_grams[word]))
+                if similarity < DISH_FUZZY_MIN_SIMILARITY:
+                    continue
+                for dish_id, weight in dish_fuzzy_postings[word].items():
+                    best[dish_id] = max(best.get(dish_id, 0), similarity * weight)
+            scores.update(best)
+        ranked = sorted(
+            (dish_id for dish_id in scores if include_vip or not dish_fuzzy_docs[dish_id]['is_vip']),
+            key=lambda dish_id: (-scores[dish_id], dish_id)
+        )
+    return ranked[:limit]
+
+
+def find_dishes(text, limit=DISH_SEARCH_DEFAULT_LIMIT, include_vip=True):
+    """Full-text matches first, then typo-tolerant matches to fill up to limit."""
+    rows = search_dishes(text, limit=limit, include_vip=include_vip)
+    if len(rows) < limit:
+        seen = {dish.dish_id for dish, _ in rows}
+        extra_ids = [dish_id for dish_id in fuzzy_search_dish_ids(text, limit, include_vip) if dish_id not in seen]
+        extra_ids = extra_ids[:limit - len(rows)]
+        if extra_ids:
+            extra = db.session.query(Dishes, Employees.name)\
+                .outerjoin(Employees, Dishes.chef_id == Employees.employee_id)\
+                .filter(Dishes.dish_id.in_(extra_ids)).all()
+            order = {dish_id: position for position, dish_id in enumerate(extra_ids)}
+            rows += sorted(extra, key=lambda row: order[row[0].dish_id])
+    return rows
+
+
+@app.route('/api/menu/search', methods=['GET'])
+def search_menu():
+    text = request.args.get('q', '').strip()
+    if not dish_search_query(text):
+        return jsonify({"success": False, "message": "Search query is required"}), 400
+    try:
+        limit = min(int(request.args.get('limit', DISH_SEARCH_DEFAULT_LIMIT)), DISH_SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"success": False, "message": "limit must be an integer"}), 400
+    if limit < 1:
+        return jsonify({"success": False, "message": "limit must be positive"}), 400
+
+    rows = find_dishes(text, limit=limit, include_vip=request_is_vip())
+    return jsonify({"success": True, "query": text, "dishes": serialize_search_results(rows)}), 200
 
 
 # Public endpoints for home page (no authentication required)
@@ -761,14 +1551,13 @@ def get_employee_profile():
         return jsonify({"success": False, "message": "Missing authorization header"}), 401
 
     try:
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(auth_header)
         email = payload.get('email')
         role = payload.get('role')
     except Exception as e:
         return jsonify({"success": False, "message": "Invalid token"}), 401
 
-    employee = Employees.query.filter_by(email=email).first()
+    employee = current_employee(payload)
     if not employee:
         return jsonify({"success": False, "message": "Employee not found"}), 404
 
@@ -785,6 +1574,179 @@ def get_employee_profile():
     }), 200
 
 
+# Authenticated principal cache
+# Decoded JWT payloads are kept in a short-TTL LRU keyed by token, along with
+# the customer/employee id each one resolved to, so a request pays at most one
+# HMAC check and one primary-key lookup. Within a request the payload and user
+# rows live on flask.g, so require_role and the handler share them. User rows
+# are always re-read, so blacklist/fired flags are never served from the cache.
+PRINCIPAL_CACHE_TTL = 60  # seconds
+PRINCIPAL_CACHE_SIZE = 4096
+principal_cache = OrderedDict()  # token -> {"payload", "expires", "ids"}
+principal_cache_lock = threading.Lock()
+
+
+def decode_auth_token(token):
+    """Verify a JWT, reusing the cached payload while it is fresh."""
+    if g.get('auth_token') == token:
+        return g.auth_payload
+
+    now = time.time()
+    with principal_cache_lock:
+        entry = principal_cache.get(token)
+        if entry and entry['expires'] > now:
+            principal_cache.move_to_end(token)
+        else:
+            entry = None
+
+    if entry is None:
+        # Raises jwt.ExpiredSignatureError / InvalidTokenError as before
+        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        if payload.get('purpose'):
+            raise jwt.InvalidTokenError("Stream tickets only open event streams")
+        entry = {
+            'payload': payload,
+            # Never cache past the token's own expiry
+            'expires': min(now + PRINCIPAL_CACHE_TTL, payload.get('exp', now + PRINCIPAL_CACHE_TTL)),
+            'ids': {}
+        }
+        with principal_cache_lock:
+            principal_cache[token] = entry
+            while len(principal_cache) > PRINCIPAL_CACHE_SIZE:
+                principal_cache.popitem(last=False)
+
+    g.auth_token = token
+    g.auth_entry = entry
+    g.auth_payload = entry['payload']
+    return entry['payload']
+
+
+def decode_auth_header(auth_header):
+    token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
+    return decode_auth_token(token)
+
+
+def resolve_principal(model, payload):
+    """Load the Customers/Employees row for a decoded token, or None."""
+    email = payload.get('email')
+    users = g.setdefault('auth_users', {})
+    key = (model.__tablename__, email)
+    if key in users:
+        return users[key]
+
+    entry = g.get('auth_entry') if g.get('auth_payload') is payload else None
+    cached_id = entry['ids'].get(model.__tablename__) if entry else None
+
+    user = None
+    if cached_id is not None:
+        user = db.session.get(model, cached_id)
+        if user is not None and user.email != email:
+            user = None  # Account was edited since; fall back to the email lookup
+    if user is None:
+        user = model.query.filter_by(email=email).first()
+        if user is not None and entry is not None:
+            entry['ids'][model.__tablename__] = user.customer_id if model is Customers else user.employee_id
+
+    users[key] = user
+    return user
+
+
+def current_customer(payload):
+    return resolve_principal(Customers, payload)
+
+
+def current_employee(payload):
+    return resolve_principal(Employees, payload)
+
+
+def invalidate_principal(*emails):
+    """Drop cached tokens for accounts that were blacklisted, fired, edited or deleted."""
+    with principal_cache_lock:
+        stale = [token for token, entry in principal_cache.items() if entry['payload'].get('email') in emails]
+        for token in stale:
+            del principal_cache[token]
+
+
+# Keyset pagination
+# List endpoints accept ?limit= and ?cursor= and answer with "nextCursor".
+# The cursor is an opaque token for the (timestamp, id) of the last row sent,
+# so each page is an index range scan instead of an OFFSET over the history.
+# Requests without ?limit= get DEFAULT_PAGE_SIZE rows; clients follow
+# nextCursor until it comes back null.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for anything it couldn't have produced."""
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    sort_value, row_id = json.loads(raw)
+    if sort_value is not None and not isinstance(sort_value, str):
+        raise ValueError("cursor sort value must be a timestamp string or null")
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise ValueError("cursor id must be an integer")
+    if sort_value is not None:
+        sort_value = datetime.fromisoformat(sort_value)
+    return sort_value, row_id
+
+
+def read_page_args():
+    """
+    Parse ?limit= and ?cursor=.
+    Returns (page, None), or (None, error_response) for a bad cursor/limit.
+    Without ?limit= the page holds DEFAULT_PAGE_SIZE rows.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError):
+        return None, (jsonify({"success": False, "message": "Invalid pagination cursor or limit"}), 400)
+    return {"limit": max(1, min(limit, MAX_PAGE_SIZE)), "after": after}, None
+
+
+def paginate(query, sort_col, id_col, page, descending=True):
+    """
+    Order query by (sort_col, id_col) and, when page is set, return only the
+    rows after page["after"]. Returns (rows, next_cursor).
+    Pass sort_col=None to page on the id alone.
+    NULL timestamps sort first ascending and last descending, as in SQLite.
+    """
+    keys = [id_col] if sort_col is None else [sort_col, id_col]
+    query = query.order_by(*[k.desc() if descending else k.asc() for k in keys])
+    if page is None:
+        return query.all(), None
+
+    if page['after'] is not None:
+        after_sort, after_id = page['after']
+        newer = id_col < after_id if descending else id_col > after_id
+        if sort_col is None:
+            query = query.filter(newer)
+        elif after_sort is None:
+            query = query.filter(db.and_(sort_col.is_(None), newer) if descending
+                                 else db.or_(sort_col.isnot(None), db.and_(sort_col.is_(None), newer)))
+        else:
+            past = db.tuple_(sort_col, id_col) < (after_sort, after_id) if descending \
+                else db.tuple_(sort_col, id_col) > (after_sort, after_id)
+            query = query.filter(db.or_(past, sort_col.is_(None)) if descending else past)
+
+    rows = query.limit(page['limit'] + 1).all()
+    if len(rows) <= page['limit']:
+        return rows, None
+    rows = rows[:page['limit']]
+    last = rows[-1][0] if isinstance(rows[-1], Row) else rows[-1]
+    sort_value = None if sort_col is None else getattr(last, sort_col.key)
+    return rows, encode_cursor(sort_value, getattr(last, id_col.key))
+
+
 # Role-based access control decorator
 def require_role(required_role):
     def decorator(f):
@@ -795,8 +1757,7 @@ def require_role(required_role):
                 return jsonify({"success": False, "message": "Missing authorization header"}), 401
 
             try:
-                token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-                payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+                payload = decode_auth_header(auth_header)
                 role = payload.get('role')
                 if role != required_role:
                     return jsonify({"success": False, "message": "Insufficient permissions"}), 403
@@ -908,6 +1869,7 @@ def update_employee_info(employee_id):
     try:
         if 'name' in data:
             employee.name = data['name']
+        old_email = employee.email
         if 'email' in data:
             employee.email = data['email']
         if 'role' in data:
@@ -916,6 +1878,8 @@ def update_employee_info(employee_id):
                 employee.role = data['role']
         
         db.session.commit()
+        invalidate_principal(old_email, employee.email)
+        invalidate_menu_cache()  # Chef names are shown on the menu
         return jsonify({"success": True, "message": "Employee info updated successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -930,8 +1894,11 @@ def delete_employee(employee_id):
         return jsonify({"success": False, "message": "Employee not found"}), 404
 
     try:
+        email = employee.email
         db.session.delete(employee)
         db.session.commit()
+        invalidate_principal(email)
+        invalidate_menu_cache()
         return jsonify({"success": True, "message": "Employee deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -941,7 +1908,10 @@ def delete_employee(employee_id):
 @app.route('/api/manager/customers', methods=['GET'])
 @require_role('Manager')
 def get_customers():
-    customers = Customers.query.all()
+    page, error = read_page_args()
+    if error:
+        return error
+    customers, next_cursor = paginate(Customers.query, None, Customers.customer_id, page, descending=False)
     customer_list = []
     for cust in customers:
         # Check if VIP
@@ -962,7 +1932,7 @@ def get_customers():
             "is_vip": is_vip,
             "is_blacklisted": cust.is_blacklisted
         })
-    return jsonify({"success": True, "customers": customer_list}), 200
+    return jsonify({"success": True, "customers": customer_list, "nextCursor": next_cursor}), 200
 def manage_customers():
     if request.method == 'GET':
         customers = Customers.query.all()
@@ -1035,6 +2005,7 @@ def update_customer_manager(customer_id):
                 return jsonify({"success": False, "message": "Invalid deposited_cash value"}), 400
         
         # Update other fields if needed
+        old_email = customer.email
         if 'username' in data:
             customer.username = data['username']
         if 'email' in data:
@@ -1067,6 +2038,7 @@ def update_customer_manager(customer_id):
                     db.session.delete(blacklist_entry)
 
         db.session.commit()
+        invalidate_principal(old_email, customer.email)
         return jsonify({"success": True, "message": "Customer updated successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -1098,8 +2070,10 @@ def delete_customer_manager(customer_id):
         
         # Note: You might need to handle cascading deletes for Orders/Reviews depending on your DB setup
         # For now, we assume simple deletion or you might prefer soft-delete (blacklisting)
+        email = customer.email
         db.session.delete(customer)
         db.session.commit()
+        invalidate_principal(email)
         return jsonify({"success": True, "message": "Customer deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -1217,9 +2191,6 @@ def add_customer_warning(customer_id):
 @app.route('/api/manager/biddings', methods=['GET'])
 @require_role('Manager')
 def get_manager_biddings():
-    # Resolve any expired ones first
-    resolve_expired_biddings()
-    
     # Get active biddings
     active_biddings = Delivery_Bids.query.filter_by(status='active').all()
     
@@ -1242,7 +2213,7 @@ def get_manager_biddings():
             
         # Calculate time remaining
         elapsed = datetime.now(timezone.utc) - b.start_time.replace(tzinfo=timezone.utc)
-        remaining_seconds = max(0, 300 - elapsed.total_seconds()) # 5 mins = 300s
+        remaining_seconds = max(0, BIDDING_WINDOW.total_seconds() - elapsed.total_seconds())
 
         biddings_data.append({
             "bidding_id": b.bidding_id,
@@ -1326,10 +2297,9 @@ def review_registration_request(request_id):
 
     # Get manager ID from token
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+    payload = decode_auth_header(auth_header)
     email = payload.get('email')
-    manager = Employees.query.filter_by(email=email).first()
+    manager = current_employee(payload)
 
     request_record = Registration_Requests.query.get(request_id)
     if not request_record:
@@ -1381,10 +2351,9 @@ def create_dish():
     
     # Get chef ID from token
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+    payload = decode_auth_header(auth_header)
     email = payload.get('email')
-    chef = Employees.query.filter_by(email=email).first()
+    chef = current_employee(payload)
     
     if not chef or chef.role != 'Chef':
         return jsonify({"success": False, "message": "Unauthorized"}), 403
@@ -1409,6 +2378,9 @@ def create_dish():
         )
         db.session.add(dish)
         db.session.commit()
+        invalidate_menu_cache()
+        invalidate_menu_item(dish.dish_id)
+        invalidate_prompt_context()
         return jsonify({"success": True, "message": "Dish created successfully", "dish_id": dish.dish_id}), 201
     except Exception as e:
         db.session.rollback()
@@ -1423,10 +2395,9 @@ def update_dish(dish_id):
     
     # Get chef ID from token
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+    payload = decode_auth_header(auth_header)
     email = payload.get('email')
-    chef = Employees.query.filter_by(email=email).first()
+    chef = current_employee(payload)
     
     if not chef or chef.role != 'Chef':
         return jsonify({"success": False, "message": "Unauthorized"}), 403
@@ -1452,6 +2423,9 @@ def update_dish(dish_id):
             dish.is_vip = data['is_vip']
         
         db.session.commit()
+        invalidate_menu_cache()
+        invalidate_menu_item(dish_id)
+        invalidate_prompt_context()
         return jsonify({"success": True, "message": "Dish updated successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -1464,10 +2438,9 @@ def update_dish(dish_id):
 def delete_dish(dish_id):
     # Get chef ID from token
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+    payload = decode_auth_header(auth_header)
     email = payload.get('email')
-    chef = Employees.query.filter_by(email=email).first()
+    chef = current_employee(payload)
     
     if not chef or chef.role != 'Chef':
         return jsonify({"success": False, "message": "Unauthorized"}), 403
@@ -1483,6 +2456,9 @@ def delete_dish(dish_id):
     try:
         db.session.delete(dish)
         db.session.commit()
+        invalidate_menu_cache()
+        invalidate_menu_item(dish_id)
+        invalidate_prompt_context()
         return jsonify({"success": True, "message": "Dish deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -1495,10 +2471,9 @@ def delete_dish(dish_id):
 def get_chef_dishes():
     # Get chef ID from token
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+    payload = decode_auth_header(auth_header)
     email = payload.get('email')
-    chef = Employees.query.filter_by(email=email).first()
+    chef = current_employee(payload)
     
     if not chef or chef.role != 'Chef':
         return jsonify({"success": False, "message": "Unauthorized"}), 403
@@ -1524,9 +2499,8 @@ def get_chef_dishes():
 def get_chef_orders():
     # Get current chef information
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1]
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-    chef = Employees.query.filter_by(email=payload['email']).first()
+    payload = decode_auth_header(auth_header)
+    chef = current_employee(payload)
 
     # Query orders assigned to this chef that are not yet completed
     # Note: This filters out 'Delivered', 'Cancelled', etc. statuses
@@ -1576,9 +2550,8 @@ def update_order_status(order_id):
     
     # Permission check: can only modify own orders
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1]
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-    chef = Employees.query.filter_by(email=payload['email']).first()
+    payload = decode_auth_header(auth_header)
+    chef = current_employee(payload)
     
     if not order or order.chef_id != chef.employee_id:
         return jsonify({"success": False, "message": "Order not found or unauthorized"}), 404
@@ -1598,15 +2571,14 @@ def get_profile():
         return jsonify({"success": False, "message": "Missing authorization header"}), 401
 
     try:
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(auth_header)
         email = payload.get('email')
         print(f"[GET_PROFILE] Decoded email: {email}")
     except Exception as e:
         print(f"[GET_PROFILE] Token decode error: {e}")
         return jsonify({"success": False, "message": "Invalid token"}), 401
 
-    user = Customers.query.filter_by(email=email).first()
+    user = current_customer(payload)
     if not user:
         print(f"[GET_PROFILE] User not found: {email}")
         return jsonify({"success": False, "message": "User not found"}), 404
@@ -1668,8 +2640,7 @@ def update_profile():
         return jsonify({"success": False, "message": "Missing authorization header"}), 401
     
     try:
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(auth_header)
         email = payload.get('email')
         print(f"[UPDATE_PROFILE] Decoded email: {email}")
     except Exception as e:
@@ -1677,7 +2648,7 @@ def update_profile():
         return jsonify({"success": False, "message": "Invalid token"}), 401
     
     try:
-        user = Customers.query.filter_by(email=email).first()
+        user = current_customer(payload)
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
 
@@ -1731,6 +2702,8 @@ def update_profile():
             pass
 
         db.session.commit()
+        if user.email != email:
+            invalidate_principal(email)
 
         return jsonify({
             "success": True,
@@ -1751,16 +2724,165 @@ def update_profile():
         return jsonify({"success": False, "message": "Database error", "error": str(e)}), 500
 
 
+def parse_cart_items(cart_items):
+    """Return ([(dish_id, quantity)], None) or (None, error_response) for the request's cart items."""
+    if not isinstance(cart_items, list):
+        return None, (jsonify({"success": False, "message": "items must be a list"}), 400)
+
+    parsed = []
+    for item in cart_items:
+        if not isinstance(item, dict):
+            return None, (jsonify({"success": False, "message": "Each item must be an object with id and quantity"}), 400)
+        dish_id, quantity = item.get('id'), item.get('quantity')
+        # Ids arrive as numbers or numeric strings ("3"); bools are ints in Python, so reject them explicitly
+        if isinstance(dish_id, bool) or not (isinstance(dish_id, int) or (isinstance(dish_id, str) and dish_id.strip().isdigit())):
+            return None, (jsonify({"success": False, "message": f"Invalid dish id: {dish_id!r}"}), 400)
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+            return None, (jsonify({"success": False, "message": f"Invalid quantity for dish {dish_id}: must be a positive integer"}), 400)
+        parsed.append((int(dish_id), quantity))
+    return parsed, None
+
+
+def price_cart(user, cart_items, client_total=None, full_address=''):
+    """
+    Price a cart in one pass.
+    Loads every cart dish with a single IN query and the VIP record once, then
+    validates VIP-only dishes and works out the subtotal, VIP discount, delivery
+    fee and assigned chef. Returns (priced_cart, None) or (None, error_response).
+    """
+    items, error = parse_cart_items(cart_items)
+    if error:
+        return None, error
+    if client_total is not None:
+        if isinstance(client_total, bool) or not isinstance(client_total, (int, float, str)):
+            return None, (jsonify({"success": False, "message": "totalPrice must be a number"}), 400)
+        try:
+            client_total = Decimal(str(client_total))
+        except ArithmeticError:
+            return None, (jsonify({"success": False, "message": "totalPrice must be a number"}), 400)
+        if not client_total.is_finite() or client_total < 0:
+            return None, (jsonify({"success": False, "message": "totalPrice must be a non-negative number"}), 400)
+
+    vip_record = VIP_Customers.query.filter_by(customer_id=user.customer_id).first()
+    is_vip = vip_record is not None
+
+    dish_ids = [dish_id for dish_id, _ in items]
+    dishes = {d.dish_id: d for d in Dishes.query.filter(Dishes.dish_id.in_(dish_ids)).all()} if dish_ids else {}
+
+    subtotal = Decimal('0.00')
+    non_vip_subtotal = Decimal('0.00')
+    chef_counts = Counter()
+    lines = []
+    for dish_id, quantity in items:
+        dish = dishes.get(dish_id)
+        if not dish:
+            return None, (jsonify({"success": False, "message": f"Dish with ID {dish_id} not found"}), 404)
+        if dish.is_vip and not is_vip:
+            return None, (jsonify({"success": False, "message": f"You must be a VIP customer to order {dish.name}"}), 403)
+
+        line_total = Decimal(str(dish.price)) * quantity
+        subtotal += line_total
+        if not dish.is_vip:
+            non_vip_subtotal += line_total
+        if dish.chef_id:
+            chef_counts[dish.chef_id] += 1
+        lines.append({"dish_id": dish.dish_id, "name": dish.name, "quantity": quantity, "line_total": line_total})
+
+    # Calculate delivery fee
+    delivery_fee = Decimal('5.00')  # Default delivery fee
+    requires_delivery = full_address and full_address != "Pickup"
+    if requires_delivery and is_vip:
+        # For VIP customers, every 3rd order is free delivery
+        current_order_count = vip_record.order_count or 0
+        if (current_order_count + 1) % 3 == 0:
+            delivery_fee = Decimal('0.00')
+
+    # VIPs get 5% off non-VIP dishes only
+    vip_discount = non_vip_subtotal * Decimal('0.05') if is_vip else Decimal('0.00')
+
+    # The checkout page sends its own total (incl. tax); quotes fall back to the dish subtotal
+    base_total = client_total if client_total is not None else subtotal
+    order_total = base_total + delivery_fee - vip_discount
+
+    # Assign to the chef with most dishes in the order
+    if chef_counts:
+        chef_id = chef_counts.most_common(1)[0][0]
+    elif items:
+        # Fallback to first chef if no dishes have chefs assigned
+        default_chef = Employees.query.filter_by(role='Chef').first()
+        chef_id = default_chef.employee_id if default_chef else None
+    else:
+        chef_id = None
+
+    return {
+        "is_vip": is_vip,
+        "vip_record": vip_record,
+        "lines": lines,
+        "subtotal": subtotal,
+        "vip_discount": vip_discount,
+        "delivery_fee": delivery_fee,
+        "total": order_total,
+        "chef_id": chef_id,
+    }, None
+
+
+def format_cart_delivery_address(delivery_info):
+    return f"{delivery_info.get('address', '')}, {delivery_info.get('city', '')} {delivery_info.get('zip', '')}".strip(', ')
+
+
+# Quote a cart without placing the order
+@app.route('/api/orders/quote', methods=['POST'])
+def quote_order():
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return jsonify({"success": False, "message": "Unauthorized"}), 401
+
+    try:
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
+    except Exception:
+        return jsonify({"success": False, "message": "Invalid token"}), 401
+
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    data = request.get_json() or {}
+    if not isinstance(data, dict) or not isinstance(data.get('deliveryInfo') or {}, dict):
+        return jsonify({"success": False, "message": "Request body must be a JSON object"}), 400
+    priced, error = price_cart(
+        user,
+        data.get('items', []),
+        data.get('totalPrice'),
+        format_cart_delivery_address(data.get('deliveryInfo') or {})
+    )
+    if error:
+        return error
+
+    return jsonify({
+        "success": True,
+        "items": [dict(line, line_total=float(line['line_total'])) for line in priced['lines']],
+        "subtotal": float(priced['subtotal']),
+        "vipDiscount": float(priced['vip_discount']),
+        "deliveryFee": float(priced['delivery_fee']),
+        "finalTotal": float(priced['total']),
+        "isVip": priced['is_vip']
+    }), 200
+
+
 # Place order (with Financial Logging for revenue)
 @app.route('/api/orders', methods=['POST'])
 def create_order():
     data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "message": "Request body must be a JSON object"}), 400
     
     # Extract order data    
     cart_items = data.get('items', [])
     total_price = data.get('totalPrice', 0)
-    delivery_info = data.get('deliveryInfo', {})
-    full_address = f"{delivery_info.get('address', '')}, {delivery_info.get('city', '')} {delivery_info.get('zip', '')}".strip(', ')
+    delivery_info = data.get('deliveryInfo') or {}
+    if not isinstance(delivery_info, dict):
+        return jsonify({"success": False, "message": "deliveryInfo must be an object"}), 400
+    full_address = format_cart_delivery_address(delivery_info)
     contact_phone = delivery_info.get('phone', '')
 
     auth_header = request.headers.get('Authorization')
@@ -1769,9 +2891,8 @@ def create_order():
 
     try:
         # Authenticate user and check balance
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
         
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
@@ -1780,64 +2901,39 @@ def create_order():
         if user.is_blacklisted:
             return jsonify({"success": False, "message": "Your account has been blacklisted. Please contact support."}), 403
 
-        # Check if user can order VIP dishes
-        vip_record = VIP_Customers.query.filter_by(customer_id=user.customer_id).first()
-        is_vip = vip_record is not None
-        
-        for item in cart_items:
-            dish = Dishes.query.get(int(item['id']))
-            if not dish:
-                return jsonify({"success": False, "message": f"Dish with ID {item['id']} not found"}), 404
-            if dish.is_vip and not is_vip:
-                return jsonify({"success": False, "message": f"You must be a VIP customer to order {dish.name}"}), 403
-
-        order_total = float(total_price)
-        
-        # Calculate delivery fee
-        delivery_fee = Decimal('5.00')  # Default delivery fee
-        requires_delivery = full_address and full_address != "Pickup"
-        
-        if requires_delivery and is_vip and vip_record:
-            # For VIP customers, every 3rd order is free delivery
-            current_order_count = vip_record.order_count or 0
-            if (current_order_count + 1) % 3 == 0:
-                delivery_fee = Decimal('0.00')
-        
-        # Add delivery fee to order total
-        order_total = order_total + float(delivery_fee)
-        
-        # Check if user is VIP and apply 5% discount only to non-VIP dishes
-        vip_record = VIP_Customers.query.filter_by(customer_id=user.customer_id).first()
-        is_vip = vip_record is not None
-        vip_discount = Decimal('0.00')
-        
-        if is_vip:
-            # Calculate discount only on non-VIP dishes
-            non_vip_subtotal = Decimal('0.00')
-            for item in cart_items:
-                dish = Dishes.query.get(int(item['id']))
-                if dish and not dish.is_vip:  # Only apply discount to non-VIP dishes
-                    item_total = Decimal(str(dish.price)) * Decimal(str(item['quantity']))
-                    non_vip_subtotal += item_total
-            
-            vip_discount = non_vip_subtotal * Decimal('0.05')  # 5% discount on non-VIP dishes only
-            order_total = float(Decimal(str(order_total)) - vip_discount)
-        
-        current_balance = float(user.deposited_cash or 0)
-
-        if current_balance < order_total:
+        # Validate and price the whole cart in one pass
+        priced, error = price_cart(user, cart_items, total_price, full_address)
+        if error:
+            return error
+
+        is_vip = priced['is_vip']
+        vip_discount = priced['vip_discount']
+        delivery_fee = priced['delivery_fee']
+        chef_id = priced['chef_id']
+        # Money stays in Decimal, rounded to cents
+        order_total = priced['total'].quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+        # Deduct payment atomically: the balance check and the debit are one
+        # conditional UPDATE, so concurrent checkouts can't both pass the check.
+        # SQLite does this arithmetic in REAL, so the check compares whole cents
+        # and the new balance is rounded back to cents before it is stored.
+        order_cents = int(order_total * 100)
+        debited = Customers.query.filter(
+            Customers.customer_id == user.customer_id,
+            db.func.round(Customers.deposited_cash * 100) >= order_cents
+        ).update({
+            Customers.deposited_cash: db.func.round(Customers.deposited_cash - order_total, 2),
+            Customers.order_count: db.func.coalesce(Customers.order_count, 0) + 1
+        }, synchronize_session=False)
+
+        if not debited:
             # Record warning for insufficient balance
             user.warning_count = (user.warning_count or 0) + 1
             
-            # Check if user is VIP
-            is_vip = VIP_Customers.query.filter_by(customer_id=user.customer_id).first() is not None
-            
             # At 2 warnings: demote VIP customers to regular customers
             if user.warning_count >= 2 and is_vip:
-                vip_record = VIP_Customers.query.filter_by(customer_id=user.customer_id).first()
-                if vip_record:
-                    db.session.delete(vip_record)
-                    user.warning_count = 0  # Reset warnings after demotion
+                db.session.delete(priced['vip_record'])
+                user.warning_count = 0  # Reset warnings after demotion
             
             # At 3 warnings: blacklist regular customers
             if user.warning_count >= 3 and not is_vip:
@@ -1846,30 +2942,6 @@ def create_order():
             db.session.commit()
             return jsonify({"success": False, "message": "Insufficient funds"}), 400
 
-        # Deduct payment
-        user.deposited_cash = current_balance - order_total
-        user.order_count = (user.order_count or 0) + 1
-        
-        # Get cart dishes to assign chef
-        cart_dishes = [Dishes.query.get(int(item['id'])) for item in cart_items]
-        
-        # Assign chef based on dishes in cart
-        chef_id = None
-        if cart_dishes:
-            # Get all chef_ids from dishes in cart
-            chef_ids = [dish.chef_id for dish in cart_dishes if dish and dish.chef_id]
-            if chef_ids:
-                # Count occurrences of each chef
-                from collections import Counter
-                chef_counts = Counter(chef_ids)
-                # Assign to chef with most dishes in the order
-                most_common_chef = chef_counts.most_common(1)[0][0]
-                chef_id = most_common_chef
-            else:
-                # Fallback to first chef if no dishes have chefs assigned
-                default_chef = Employees.query.filter_by(role='Chef').first()
-                chef_id = default_chef.employee_id if default_chef else None
-
         # A. Create order record
         new_order = Orders(
             customer_id=user.customer_id,
@@ -1886,11 +2958,11 @@ def create_order():
         db.session.flush() # Generate new_order.order_id immediately
 
         # B. Create order details (Order_Items)
-        for item in cart_items:
+        for line in priced['lines']:
             order_item = Order_Items(
                 order_id=new_order.order_id,
-                dish_id=int(item['id']),
-                quantity=item['quantity']
+                dish_id=line['dish_id'],
+                quantity=line['quantity']
             )
             db.session.add(order_item)
 
@@ -1899,15 +2971,16 @@ def create_order():
             customer_id=user.customer_id,
             order_id=new_order.order_id,
             type='Order',
-            amount=Decimal(str(order_total)),
+            amount=order_total,
             created_at=datetime.now(timezone.utc)
         )
         db.session.add(log)
         print(f"[FINANCE] Logged order revenue ${order_total} for Order #{new_order.order_id}")
         # -------------------------------------------
 
-        # Commit all changes (deduction + order + items + log)
+        # Commit all changes in one transaction (debit + order + items + log)
         db.session.commit()
+        mark_menu_orders_changed()
 
         print(f"[SUCCESS] Order #{new_order.order_id} created for {user.username}")
 
@@ -1918,7 +2991,7 @@ def create_order():
             "estimatedDelivery": "30-45 minutes",
             "deliveryFee": float(delivery_fee),
             "vipDiscount": float(vip_discount),
-            "finalTotal": order_total
+            "finalTotal": float(order_total)
         }), 201
 
     except Exception as e:
@@ -1930,12 +3003,15 @@ def create_order():
 @app.route('/api/manager/financials', methods=['GET'])
 @require_role('Manager')
 def get_financial_logs():
+    page, error = read_page_args()
+    if error:
+        return error
     try:
         # Join with Customers table to get usernames and emails for the logs
-        logs = db.session.query(Financial_Log, Customers.username, Customers.email)\
-            .join(Customers, Financial_Log.customer_id == Customers.customer_id)\
-            .order_by(Financial_Log.created_at.desc())\
-            .all()
+        logs, next_cursor = paginate(
+            db.session.query(Financial_Log, Customers.username, Customers.email)
+                .join(Customers, Financial_Log.customer_id == Customers.customer_id),
+            Financial_Log.created_at, Financial_Log.log_id, page)
             
         logs_data = []
         for log, username, email in logs:
@@ -1948,8 +3024,12 @@ def get_financial_logs():
                 "order_id": log.order_id,
                 "created_at": log.created_at.isoformat()
             })
+
+        # Totals over all logs, not just this page, for the dashboard's summary cards
+        totals = {log_type: float(total or 0) for log_type, total in
+                  db.session.query(Financial_Log.type, db.func.sum(Financial_Log.amount)).group_by(Financial_Log.type)}
             
-        return jsonify({"success": True, "logs": logs_data}), 200
+        return jsonify({"success": True, "logs": logs_data, "totals": totals, "nextCursor": next_cursor}), 200
     except Exception as e:
         print(f"Error fetching financial logs: {e}")
         return jsonify({"success": False, "message": "Failed to fetch logs"}), 500
@@ -1960,18 +3040,21 @@ def get_orders():
     auth_header = request.headers.get('Authorization')
     if not auth_header:
         return jsonify({"success": False, "message": "Authentication required to view orders"}), 401
+    page, error = read_page_args()
+    if error:
+        return error
     
     try:
         # Decode token to get user email
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload['email']).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
         
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
 
         # Query orders for this customer, newest first
-        orders = Orders.query.filter_by(customer_id=user.customer_id).order_by(Orders.order_time.desc()).all()
+        orders, next_cursor = paginate(Orders.query.filter_by(customer_id=user.customer_id),
+                                       Orders.order_time, Orders.order_id, page)
         
         orders_data = []
         for order in orders:
@@ -1986,7 +3069,7 @@ def get_orders():
                 "has_review": review is not None
             })
             
-        return jsonify({"success": True, "orders": orders_data}), 200
+        return jsonify({"success": True, "orders": orders_data, "nextCursor": next_cursor}), 200
         
     except jwt.ExpiredSignatureError:
         return jsonify({"success": False, "message": "Session expired. Please login again"}), 401
@@ -2006,9 +3089,8 @@ def get_order_details(order_id):
     
     try:
         # Decode token to get user email
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload['email']).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
         
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
@@ -2080,14 +3162,10 @@ def get_order_details(order_id):
 @app.route('/api/delivery/available-orders', methods=['GET'])
 @require_role('Delivery')
 def get_available_orders():
-    # Trigger system check before showing list
-    resolve_expired_biddings()
-
     # Get current delivery person
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1]
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-    me = Employees.query.filter_by(email=payload['email']).first()
+    payload = decode_auth_header(auth_header)
+    me = current_employee(payload)
 
     # Find orders that are 'Ready for Delivery' and NOT yet assigned
     orders = Orders.query.filter_by(status='Ready for Delivery', delivery_person_id=None).all()
@@ -2133,13 +3211,13 @@ def place_delivery_bid():
         return jsonify({"success": False, "message": "Missing fields"}), 400
 
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1]
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-    delivery_person = Employees.query.filter_by(email=payload['email']).first()
+    payload = decode_auth_header(auth_header)
+    delivery_person = current_employee(payload)
 
     try:
         # 1. Get or Create active Bidding Session
         bidding = Delivery_Bids.query.filter_by(order_id=order_id, status='active').first()
+        new_session = bidding is None
         
         if not bidding:
             # First bid! Start the 5-minute timer now.
@@ -2162,6 +3240,9 @@ def place_delivery_bid():
         )
         db.session.add(new_bid)
         db.session.commit()
+
+        if new_session:
+            schedule_bidding_deadline(bidding.bidding_id, bidding.start_time)
         
         return jsonify({"success": True, "message": "Bid placed successfully! Waiting for system selection."}), 200
 
@@ -2176,9 +3257,8 @@ def place_delivery_bid():
 @require_role('Delivery')
 def get_delivery_bids():
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1]
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-    delivery_person = Employees.query.filter_by(email=payload['email']).first()
+    payload = decode_auth_header(auth_header)
+    delivery_person = current_employee(payload)
 
     bids = Bid.query.filter_by(employee_id=delivery_person.employee_id).order_by(Bid.bid_time.desc()).all()
     
@@ -2202,9 +3282,8 @@ def get_delivery_bids():
 @require_role('Delivery')
 def get_delivery_deliveries():
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1]
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-    delivery_person = Employees.query.filter_by(email=payload['email']).first()
+    payload = decode_auth_header(auth_header)
+    delivery_person = current_employee(payload)
 
     # Get current deliveries (In Transit)
     current_deliveries = Orders.query.filter(
@@ -2336,9 +3415,8 @@ def submit_delivery_customer_feedback():
     try:
         # Get delivery driver info
         auth_header = request.headers.get('Authorization')
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        delivery_driver = Employees.query.filter_by(email=payload['email']).first()
+        payload = decode_auth_header(auth_header)
+        delivery_driver = current_employee(payload)
 
         # Verify the order exists and was delivered by this driver
         order = Orders.query.filter_by(
@@ -2406,9 +3484,8 @@ def create_review():
     
     # Parse the token to obtain the user ID.
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload['email']).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
     except:
         return jsonify({"success": False, "message": "Invalid token"}), 401
 
@@ -2456,6 +3533,7 @@ def create_review():
         db.session.add(review)
         # Commit here so the new rating is included in the average calculation below
         db.session.commit() 
+        invalidate_menu_cache()  # Dish ratings changed
 
         # 2. Update Chef's Reputation Score
         if order.chef_id:
@@ -2569,9 +3647,8 @@ def create_review():
 def get_chef_reviews():
     # Get the current chef.
     auth_header = request.headers.get('Authorization')
-    token = auth_header.split(' ')[1]
-    payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-    chef = Employees.query.filter_by(email=payload['email']).first()
+    payload = decode_auth_header(auth_header)
+    chef = current_employee(payload)
 
     # Retrieve all reviews associated with this chef.
     reviews = Reviews.query.filter_by(chef_id=chef.employee_id).order_by(Reviews.created_at.desc()).all()
@@ -2732,14 +3809,13 @@ def get_recent_orders():
         
         if auth_header:
             try:
-                token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-                payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+                payload = decode_auth_header(auth_header)
                 email = payload.get('email')
                 
                 # Check if this is a customer (not employee)
                 role = payload.get('role')
                 if role == 'Customer':
-                    customer = Customers.query.filter_by(email=email).first()
+                    customer = current_customer(payload)
                     if customer:
                         customer_id = customer.customer_id
             except Exception as e:
@@ -2800,14 +3876,13 @@ def get_recommendations():
         
         if auth_header:
             try:
-                token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-                payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+                payload = decode_auth_header(auth_header)
                 email = payload.get('email')
                 
                 # Check if this is a customer (not employee)
                 role = payload.get('role')
                 if role == 'Customer':
-                    customer = Customers.query.filter_by(email=email).first()
+                    customer = current_customer(payload)
                     if customer:
                         customer_id = customer.customer_id
                         is_authenticated = True
@@ -2867,39 +3942,41 @@ def get_general_recommendations():
     }), 200
 
 
-def get_customer_most_ordered(customer_id, limit=3):
-    """Get most ordered dishes by a specific customer"""
-    query = db.session.query(
+def recommendation_query(stats, *columns):
+    """Dishes joined to an aggregate table and their chef, selecting the usual dish fields."""
+    return db.session.query(
         Dishes.dish_id, Dishes.name, Dishes.description, Dishes.image_url, Dishes.price,
-        db.func.count(Order_Items.dish_id).label('order_count'),
+        *columns,
         Employees.name.label('chef_name'), Employees.profile_image_url
-    ).join(Order_Items, Dishes.dish_id == Order_Items.dish_id)\
-     .join(Orders, Order_Items.order_id == Orders.order_id)\
-     .join(Employees, Dishes.chef_id == Employees.employee_id)\
-     .filter(Orders.customer_id == customer_id)\
-     .filter(Orders.status == 'Delivered')\
-     .group_by(Dishes.dish_id, Dishes.name, Dishes.description, Dishes.image_url, Dishes.price, Employees.name, Employees.profile_image_url)\
-     .order_by(db.func.count(Order_Items.dish_id).desc())\
-     .limit(limit)\
-     .all()
+    ).join(stats, stats.dish_id == Dishes.dish_id)\
+     .join(Employees, Dishes.chef_id == Employees.employee_id)
+
+
+def average_rating(rating_sum, rating_count):
+    return (rating_sum * 1.0 / db.func.nullif(rating_count, 0)).label('rating')
+
+
+def get_customer_most_ordered(customer_id, limit=3):
+    """Get most ordered dishes by a specific customer"""
+    query = recommendation_query(
+        Customer_Dish_Stats, Customer_Dish_Stats.delivered_orders.label('order_count')
+    ).filter(Customer_Dish_Stats.customer_id == customer_id)\
+     .filter(Customer_Dish_Stats.delivered_orders > 0)\
+     .order_by(Customer_Dish_Stats.delivered_orders.desc(), Dishes.dish_id)\
+     .limit(limit)\
+     .all()
     
     return format_dish_results(query, include_order_count=True)
 
 
 def get_customer_highest_rated(customer_id, limit=3):
     """Get highest rated dishes by a specific customer"""
-    query = db.session.query(
-        Dishes.dish_id, Dishes.name, Dishes.description, Dishes.image_url, Dishes.price,
-        db.func.avg(Reviews.dish_rating).label('rating'),
-        db.func.count(Reviews.review_id).label('review_count'),
-        Employees.name.label('chef_name'), Employees.profile_image_url
-    ).join(Order_Items, Dishes.dish_id == Order_Items.dish_id)\
-     .join(Orders, Order_Items.order_id == Orders.order_id)\
-     .join(Reviews, Orders.order_id == Reviews.order_id)\
-     .join(Employees, Dishes.chef_id == Employees.employee_id)\
-     .filter(Orders.customer_id == customer_id)\
-     .group_by(Dishes.dish_id, Dishes.name, Dishes.description, Dishes.image_url, Dishes.price, Employees.name, Employees.profile_image_url)\
-     .order_by(db.func.avg(Reviews.dish_rating).desc())\
+    rating = average_rating(Customer_Dish_Stats.rating_sum, Customer_Dish_Stats.rating_count)
+    query = recommendation_query(
+        Customer_Dish_Stats, rating, Customer_Dish_Stats.review_count.label('review_count')
+    ).filter(Customer_Dish_Stats.customer_id == customer_id)\
+     .filter(Customer_Dish_Stats.review_count > 0)\
+     .order_by(rating.desc(), Dishes.dish_id)\
      .limit(limit)\
      .all()
     
@@ -2908,23 +3985,18 @@ def get_customer_highest_rated(customer_id, limit=3):
 
 def get_most_popular_dishes(limit=3, include_vip=False):
     """Get most popular dishes overall"""
-    query = db.session.query(
-        Dishes.dish_id, Dishes.name, Dishes.description, Dishes.image_url, Dishes.price,
-        db.func.count(Order_Items.dish_id).label('total_orders'),
-        db.func.avg(Reviews.dish_rating).label('rating'),
-        db.func.count(Reviews.review_id).label('review_count'),
-        Employees.name.label('chef_name'), Employees.profile_image_url
-    ).join(Order_Items, Dishes.dish_id == Order_Items.dish_id)\
-     .join(Orders, Order_Items.order_id == Orders.order_id)\
-     .outerjoin(Reviews, Order_Items.order_id == Reviews.order_id)\
-     .join(Employees, Dishes.chef_id == Employees.employee_id)\
-     .filter(Orders.status == 'Delivered')
+    stats = Dish_Recommendation_Stats
+    query = recommendation_query(
+        stats,
+        stats.delivered_orders.label('total_orders'),
+        average_rating(stats.delivered_rating_sum, stats.delivered_rating_count),
+        stats.delivered_review_count.label('review_count')
+    ).filter(stats.delivered_orders > 0)
     
     if not include_vip:
         query = query.filter(Dishes.is_vip == False)
     
-    query = query.group_by(Dishes.dish_id, Dishes.name, Dishes.description, Dishes.image_url, Dishes.price, Employees.name, Employees.profile_image_url)\
-     .order_by(db.func.count(Order_Items.dish_id).desc())\
+    query = query.order_by(stats.delivered_orders.desc(), Dishes.dish_id)\
      .limit(limit)\
      .all()
     
@@ -2933,20 +4005,16 @@ def get_most_popular_dishes(limit=3, include_vip=False):
 
 def get_top_rated_dishes(limit=3, include_vip=False):
     """Get top rated dishes overall"""
-    query = db.session.query(
-        Dishes.dish_id, Dishes.name, Dishes.description, Dishes.image_url, Dishes.price,
-        db.func.avg(Reviews.dish_rating).label('rating'),
-        db.func.count(Reviews.review_id).label('review_count'),
-        Employees.name.label('chef_name'), Employees.profile_image_url
-    ).join(Order_Items, Dishes.dish_id == Order_Items.dish_id)\
-     .join(Reviews, Order_Items.order_id == Reviews.order_id)\
-     .join(Employees, Dishes.chef_id == Employees.employee_id)
+    stats = Dish_Recommendation_Stats
+    rating = average_rating(stats.rating_sum, stats.rating_count)
+    query = recommendation_query(
+        stats, rating, stats.review_count.label('review_count')
+    ).filter(stats.review_count > 0)
     
     if not include_vip:
         query = query.filter(Dishes.is_vip == False)
     
-    query = query.group_by(Dishes.dish_id, Dishes.name, Dishes.description, Dishes.image_url, Dishes.price, Employees.name, Employees.profile_image_url)\
-     .order_by(db.func.avg(Reviews.dish_rating).desc())\
+    query = query.order_by(rating.desc(), Dishes.dish_id)\
      .limit(limit)\
      .all()
     
@@ -2991,9 +4059,8 @@ def report_forum_content():
         return jsonify({"success": False, "message": "Authentication required"}), 401
     
     try:
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        customer = Customers.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        customer = current_customer(payload)
         
         if not customer:
             return jsonify({"success": False, "message": "User not found"}), 404
@@ -3017,8 +4084,11 @@ def report_forum_content():
 @app.route('/api/manager/forum-reports', methods=['GET'])
 @require_role('Manager')
 def get_forum_reports():
+    page, error = read_page_args()
+    if error:
+        return error
     try:
-        reports = Forum_Reports.query.order_by(Forum_Reports.created_at.desc()).all()
+        reports, next_cursor = paginate(Forum_Reports.query, Forum_Reports.created_at, Forum_Reports.report_id, page)
         reports_data = []
         
         for report in reports:
@@ -3057,7 +4127,7 @@ def get_forum_reports():
                 "appeal_message": report.appeal_message
             })
         
-        return jsonify({"success": True, "reports": reports_data}), 200
+        return jsonify({"success": True, "reports": reports_data, "nextCursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"success": False, "message": "Failed to fetch reports"}), 500
 
@@ -3071,9 +4141,8 @@ def update_report_status(report_id):
     
     try:
         # Get manager info
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        manager = Employees.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        manager = current_employee(payload)
         
         if not manager or manager.role != 'Manager':
             return jsonify({"success": False, "message": "Manager access required"}), 403
@@ -3180,11 +4249,10 @@ def appeal_forum_report(report_id):
         return jsonify({"success": False, "message": "Authentication required"}), 401
     
     try:
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(auth_header)
         user_email = payload.get('email')
         
-        user = Customers.query.filter_by(email=user_email).first()
+        user = current_customer(payload)
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
         
@@ -3247,9 +4315,8 @@ def review_forum_report_appeal(report_id):
         return jsonify({"success": False, "message": "Authentication required"}), 401
     
     try:
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        manager = Employees.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        manager = current_employee(payload)
         
         if not manager or manager.role != 'Manager':
             return jsonify({"success": False, "message": "Manager access required"}), 403
@@ -3368,47 +4435,446 @@ def review_forum_report_appeal(report_id):
         db.session.rollback()
         return jsonify({"success": False, "message": "Failed to review appeal"}), 500
 
+# Event pub/sub
+# In-process fan-out behind the SSE streams. A subscriber is a bounded queue
+# registered under one or more topics. Events are captured during a flush and
+# published only after the transaction commits (dropped on rollback), so
+# clients never see uncommitted state and write paths don't call anything.
+# A subscriber whose queue overflows is marked dead instead of silently losing
+# events: its stream closes, and the EventSource reconnects with Last-Event-ID
+# and replays the gap from the database / order_event_log.
+# Every open stream holds a worker thread, blocked in subscriber.get(), for as
+# long as the client stays connected, idle or not. Serve the app with threaded
+# or async workers (the dev server is threaded; under gunicorn use
+# `-k gthread --threads N` or `-k gevent`, never the default sync workers) and
+# keep SSE_MAX_STREAMS below the thread count so API requests always find a
+# free thread. Past the cap new streams get 503 and the client retries later.
+SSE_HEARTBEAT_SECONDS = 25
+SUBSCRIBER_QUEUE_SIZE = 100
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 32))  # Per process
+SSE_BUSY_RETRY_AFTER = 30  # seconds
+event_subscribers = {}  # topic -> set of queue.Queue
+event_subscribers_lock = threading.Lock()
+open_streams = 0
+open_streams_lock = threading.Lock()
+
+
+def subscribe_events(topics):
+    subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    subscriber.dead = False
+    with event_subscribers_lock:
+        for topic in topics:
+            event_subscribers.setdefault(topic, set()).add(subscriber)
+    return subscriber
+
+
+def unsubscribe_events(topics, subscriber):
+    with event_subscribers_lock:
+        for topic in topics:
+            subscribers = event_subscribers.get(topic)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del event_subscribers[topic]
+
+
+def publish_event(topics, data, exclude=()):
+    """Queue data for every subscriber of topics, except those in exclude; returns the subscribers reached."""
+    # A subscriber on several matching topics still gets the event once
+    with event_subscribers_lock:
+        subscribers = set()
+        for topic in topics:
+            subscribers.update(event_subscribers.get(topic, ()))
+    subscribers.difference_update(exclude)
+    for subscriber in subscribers:
+        if subscriber.dead:
+            continue
+        try:
+            subscriber.put_nowait(data)
+        except queue.Full:
+            subscriber.dead = True  # Slow client; its stream closes and replays on reconnect
+    return subscribers
+
+
+def format_sse(data, event_id=None, event_name=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event_name:
+        lines.append(f"event: {event_name}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def acquire_stream_slot():
+    global open_streams
+    with open_streams_lock:
+        if open_streams >= SSE_MAX_STREAMS:
+            return False
+        open_streams += 1
+        return True
+
+
+def release_stream_slot():
+    global open_streams
+    with open_streams_lock:
+        open_streams -= 1
+
+
+def streams_busy_response():
+    return jsonify({"success": False, "message": "Too many open event streams, try again later"}), 503, \
+        {'Retry-After': str(SSE_BUSY_RETRY_AFTER)}
+
+
+def sse_response(stream, topics, subscriber):
+    """
+    Wrap an SSE generator that holds a stream slot (acquire_stream_slot) and a
+    subscription. Both are released when the server closes the response, even
+    if the client went away before the generator ever ran.
+    """
+    response = Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+    })
+    response.call_on_close(lambda: unsubscribe_events(topics, subscriber))
+    response.call_on_close(release_stream_slot)
+    return response
+
+
+def read_last_event_id():
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None
+
+
+# Stream tickets
+# EventSource cannot send an Authorization header, and a 24h login token in a
+# query string ends up in access logs and browser history. Clients POST their
+# token to /api/stream-ticket and open the stream with ?ticket=: a JWT that
+# only the SSE endpoints accept and that expires after STREAM_TICKET_TTL.
+STREAM_TICKET_TTL = 60  # seconds
+STREAM_TICKET_PURPOSE = 'sse'
+
+
+@app.route('/api/stream-ticket', methods=['POST'])
+def issue_stream_ticket():
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return jsonify({"success": False, "message": "Authentication required"}), 401
+    try:
+        payload = decode_auth_header(auth_header)
+    except Exception:
+        return jsonify({"success": False, "message": "Invalid token"}), 401
+
+    expires = datetime.now(timezone.utc) + timedelta(seconds=STREAM_TICKET_TTL)
+    if payload.get('exp'):
+        expires = min(expires, datetime.fromtimestamp(payload['exp'], timezone.utc))
+    ticket = jwt.encode({
+        'email': payload.get('email'),
+        'role': payload.get('role'),
+        'purpose': STREAM_TICKET_PURPOSE,
+        'exp': expires
+    }, app.secret_key, algorithm='HS256')
+    return jsonify({"success": True, "ticket": ticket, "expiresIn": STREAM_TICKET_TTL}), 200
+
+
+def stream_auth_payload():
+    """Decode the caller of an SSE endpoint: an Authorization header or ?ticket=. Raises on a bad token."""
+    auth_header = request.headers.get('Authorization')
+    if auth_header:
+        return decode_auth_header(auth_header)
+    payload = jwt.decode(request.args.get('ticket', ''), app.secret_key, algorithms=['HS256'])
+    if payload.get('purpose') != STREAM_TICKET_PURPOSE:
+        raise jwt.InvalidTokenError("Not a stream ticket")
+    return payload
+
+
+def serialize_notification(n):
+    return {
+        "notification_id": n.notification_id,
+        "title": n.title,
+        "message": n.message,
+        "type": n.type,
+        "related_id": n.related_id,
+        "is_read": n.is_read,
+        "created_at": n.created_at.isoformat() if n.created_at else None
+    }
+
+
+def notification_user_id(payload):
+    """Notifications are keyed by customer_id, or employee_id for staff."""
+    user = current_customer(payload)
+    if user:
+        return user.customer_id
+    user = current_employee(payload)
+    return user.employee_id if user else None
+
+
+# Order status events
+# Every Orders status change (ORM flushes, plus bulk paths that call
+# queue_order_event) becomes an event on the customer's, chef's and driver's
+# topics; entering or leaving 'Ready for Delivery' also goes to the delivery
+# pool. Events are not stored, so a short in-memory log backs Last-Event-ID.
+# Every driver can watch the pool, so pool subscribers only get the order id
+# and status; the customer and staff ids go to the order's own parties.
+ORDER_EVENT_BACKLOG = 500
+DELIVERY_POOL_TOPIC = ('orders', 'delivery-pool')
+DELIVERY_POOL_FIELDS = ('seq', 'order_id', 'status')
+order_event_log = deque(maxlen=ORDER_EVENT_BACKLOG)  # (seq, topics, data)
+order_event_lock = threading.Lock()
+order_event_seq = int(time.time() * 1000)  # Seeded from the clock so ids keep rising across restarts
+
+
+def queue_order_event(session, order_id, status, previous_status, customer_id, chef_id, delivery_person_id):
+    session.info.setdefault('order_events', []).append({
+        "order_id": order_id,
+        "status": status,
+        "previous_status": previous_status,
+        "customer_id": customer_id,
+        "chef_id": chef_id,
+        "delivery_person_id": delivery_person_id,
+        "at": datetime.now(timezone.utc).isoformat()
+    })
+
+
+def order_event_topics(data):
+    topics = {('orders', 'all'), ('orders', 'customer', data['customer_id'])}
+    if data['chef_id']:
+        topics.add(('orders', 'chef', data['chef_id']))
+    if data['delivery_person_id']:
+        topics.add(('orders', 'driver', data['delivery_person_id']))
+    if 'Ready for Delivery' in (data['status'], data['previous_status']):
+        topics.add(DELIVERY_POOL_TOPIC)
+    return topics
+
+
+def order_event_for(data, event_topics, topics):
+    """The version of a logged event a subscriber to topics may see, or None if it matches none of them."""
+    matched = event_topics.intersection(topics)
+    if not matched:
+        return None
+    if matched == {DELIVERY_POOL_TOPIC}:
+        return {field: data[field] for field in DELIVERY_POOL_FIELDS}
+    return data
+
+
+def publish_order_event(data):
+    global order_event_seq
+    topics = order_event_topics(data)
+    with order_event_lock:
+        order_event_seq += 1
+        data = dict(data, seq=order_event_seq)
+        order_event_log.append((order_event_seq, topics, data))
+        # Under the lock so subscribers see seq order; the order's own parties get
+        # the full event, and the rest of the pool the stripped one
+        reached = publish_event(topics - {DELIVERY_POOL_TOPIC}, data)
+        if DELIVERY_POOL_TOPIC in topics:
+            publish_event([DELIVERY_POOL_TOPIC], order_event_for(data, topics, [DELIVERY_POOL_TOPIC]), exclude=reached)
+
+
+@event.listens_for(db.session, 'after_flush')
+def collect_flush_events(session, flush_context):
+    # Serialize now: objects are expired and SQL is not allowed after commit
+    for obj in session.deleted:
+        if isinstance(obj, Dishes):
+            session.info.setdefault('dish_changes', {})[obj.dish_id] = None
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Dishes):
+            session.info.setdefault('dish_changes', {})[obj.dish_id] = (obj.name, obj.description, obj.is_vip)
+    for obj in session.new:
+        if isinstance(obj, User_Notifications):
+            session.info.setdefault('new_notifications', []).append((obj.user_id, serialize_notification(obj)))
+        elif isinstance(obj, Orders):
+            queue_order_event(session, obj.order_id, obj.status, None,
+                              obj.customer_id, obj.chef_id, obj.delivery_person_id)
+    for obj in session.dirty:
+        if isinstance(obj, Orders):
+            history = db.inspect(obj).attrs.status.history
+            if history.has_changes():
+                previous = history.deleted[0] if history.deleted else None
+                if previous != obj.status:
+                    queue_order_event(session, obj.order_id, obj.status, previous,
+                                      obj.customer_id, obj.chef_id, obj.delivery_person_id)
+
+
+@event.listens_for(db.session, 'after_commit')
+def publish_flush_events(session):
+    for user_id, data in session.info.pop('new_notifications', []):
+        publish_event([('notifications', user_id)], data)
+    for data in session.info.pop('order_events', []):
+        publish_order_event(data)
+    dish_changes = session.info.pop('dish_changes', None)
+    if dish_changes:
+        apply_dish_fuzzy_changes(dish_changes)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_flush_events(session):
+    session.info.pop('new_notifications', None)
+    session.info.pop('order_events', None)
+    session.info.pop('dish_changes', None)
+
+
+# Stream new notifications (Server-Sent Events)
+# Browsers authenticate with ?ticket= from /api/stream-ticket.
+# Reconnects send Last-Event-ID (or ?lastEventId=) and get what they missed.
+@app.route('/api/user/notifications/stream', methods=['GET'])
+def stream_user_notifications():
+    if not request.headers.get('Authorization') and not request.args.get('ticket'):
+        return jsonify({"success": False, "message": "Authentication required"}), 401
+
+    try:
+        user_id = notification_user_id(stream_auth_payload())
+    except Exception:
+        return jsonify({"success": False, "message": "Invalid token"}), 401
+    if user_id is None:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    last_event_id = read_last_event_id()
+    if not acquire_stream_slot():
+        return streams_busy_response()
+
+    # Subscribe before reading the backlog so nothing committed in between is lost
+    topics = [('notifications', user_id)]
+    subscriber = subscribe_events(topics)
+    try:
+        missed = []
+        if last_event_id is not None:
+            missed = [serialize_notification(n) for n in User_Notifications.query.filter(
+                User_Notifications.user_id == user_id,
+                User_Notifications.notification_id > last_event_id
+            ).order_by(User_Notifications.notification_id).all()]
+    except Exception:
+        unsubscribe_events(topics, subscriber)
+        release_stream_slot()
+        raise
+    db.session.remove()  # Don't hold a pooled connection for the life of the stream
+
+    def stream():
+        sent_id = last_event_id or 0
+        try:
+            yield "retry: 5000\n\n"
+            for data in missed:
+                sent_id = data['notification_id']
+                yield format_sse(data, sent_id, 'notification')
+            while True:
+                try:
+                    data = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if subscriber.dead:
+                    return  # Overflowed: end the stream so the client reconnects and replays
+                if data['notification_id'] <= sent_id:
+                    continue  # Already replayed from the backlog
+                sent_id = data['notification_id']
+                yield format_sse(data, sent_id, 'notification')
+        finally:
+            unsubscribe_events(topics, subscriber)
+
+    return sse_response(stream(), topics, subscriber)
+
+# Stream order status changes (Server-Sent Events)
+# Customers follow their own orders, chefs their queue, delivery drivers the
+# biddable pool plus orders assigned to them, managers every order.
+# Each event is {"seq", "order_id", "status", "previous_status", ...}; if the
+# client's Last-Event-ID is older than the in-memory log a "resync" event
+# tells it to refetch its lists.
+@app.route('/api/orders/stream', methods=['GET'])
+def stream_order_events():
+    if not request.headers.get('Authorization') and not request.args.get('ticket'):
+        return jsonify({"success": False, "message": "Authentication required"}), 401
+
+    try:
+        payload = stream_auth_payload()
+        customer = current_customer(payload) if payload.get('role') in (None, 'Customer') else None
+        employee = None if customer else current_employee(payload)
+    except Exception:
+        return jsonify({"success": False, "message": "Invalid token"}), 401
+
+    if customer:
+        topics = [('orders', 'customer', customer.customer_id)]
+    elif employee and employee.role == 'Chef':
+        topics = [('orders', 'chef', employee.employee_id)]
+    elif employee and employee.role == 'Delivery':
+        topics = [DELIVERY_POOL_TOPIC, ('orders', 'driver', employee.employee_id)]
+    elif employee and employee.role == 'Manager':
+        topics = [('orders', 'all')]
+    else:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    last_event_id = read_last_event_id()
+    db.session.remove()  # Don't hold a pooled connection for the life of the stream
+    if not acquire_stream_slot():
+        return streams_busy_response()
+
+    # Subscribe and snapshot the log under the publish lock so nothing falls in between
+    with order_event_lock:
+        subscriber = subscribe_events(topics)
+        resync = False
+        missed = []
+        if last_event_id is not None:
+            oldest = order_event_log[0][0] if order_event_log else order_event_seq + 1
+            if last_event_id > order_event_seq or last_event_id < oldest - 1:
+                resync = True  # From another process lifetime, or the log has moved on
+            else:
+                missed = [order_event_for(data, event_topics, topics) for seq, event_topics, data in order_event_log
+                          if seq > last_event_id and not event_topics.isdisjoint(topics)]
+
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            if resync:
+                yield format_sse({"seq": order_event_seq}, order_event_seq, 'resync')
+            for data in missed:
+                yield format_sse(data, data['seq'], 'order')
+            while True:
+                try:
+                    data = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if subscriber.dead:
+                    return  # Overflowed: end the stream so the client reconnects and replays
+                yield format_sse(data, data['seq'], 'order')
+        finally:
+            unsubscribe_events(topics, subscriber)
+
+    return sse_response(stream(), topics, subscriber)
+
 # Get user notifications
 @app.route('/api/user/notifications', methods=['GET'])
 def get_user_notifications():
     auth_header = request.headers.get('Authorization')
     if not auth_header:
         return jsonify({"success": False, "message": "Authentication required"}), 401
+    page, error = read_page_args()
+    if error:
+        return error
+    # ?since=<notification_id> returns only rows newer than the client's latest
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"success": False, "message": "Invalid since parameter"}), 400
     
     try:
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user_email = payload.get('email')
-        
-        # Try to find user as customer first
-        user = Customers.query.filter_by(email=user_email).first()
-        user_id = user.customer_id if user else None
-        user_type = 'customer' if user else None
-        
-        # If not found as customer, try as employee
-        if not user:
-            user = Employees.query.filter_by(email=user_email).first()
-            user_id = user.employee_id if user else None
-            user_type = 'employee' if user else None
-        
-        if not user:
+        payload = decode_auth_header(auth_header)
+        user_id = notification_user_id(payload)
+        if user_id is None:
             return jsonify({"success": False, "message": "User not found"}), 404
         
-        print(f"DEBUG: User {user_id} ({user_email}) requesting notifications")
-        notifications = User_Notifications.query.filter_by(user_id=user_id).order_by(User_Notifications.created_at.desc()).all()
-        print(f"DEBUG: Found {len(notifications)} notifications for user {user_id}")
+        query = User_Notifications.query.filter_by(user_id=user_id)
+        if since is not None:
+            query = query.filter(User_Notifications.notification_id > since)
+        notifications, next_cursor = paginate(query, User_Notifications.created_at, User_Notifications.notification_id, page)
         
-        notifications_data = [{
-            "notification_id": n.notification_id,
-            "title": n.title,
-            "message": n.message,
-            "type": n.type,
-            "related_id": n.related_id,
-            "is_read": n.is_read,
-            "created_at": n.created_at.isoformat() if n.created_at else None
-        } for n in notifications]
+        notifications_data = [serialize_notification(n) for n in notifications]
         
-        return jsonify({"success": True, "notifications": notifications_data}), 200
+        return jsonify({"success": True, "notifications": notifications_data, "nextCursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"success": False, "message": "Failed to get notifications"}), 500
 
@@ -3420,20 +4886,9 @@ def mark_notification_read(notification_id):
         return jsonify({"success": False, "message": "Authentication required"}), 401
     
     try:
-        token = auth_header.split(' ')[1] if ' ' in auth_header else auth_header
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user_email = payload.get('email')
-        
-        # Try to find user as customer first
-        user = Customers.query.filter_by(email=user_email).first()
-        user_id = user.customer_id if user else None
-        
-        # If not found as customer, try as employee
-        if not user:
-            user = Employees.query.filter_by(email=user_email).first()
-            user_id = user.employee_id if user else None
-        
-        if not user:
+        payload = decode_auth_header(auth_header)
+        user_id = notification_user_id(payload)
+        if user_id is None:
             return jsonify({"success": False, "message": "User not found"}), 404
         
         notification = User_Notifications.query.filter_by(
@@ -3452,56 +4907,141 @@ def mark_notification_read(notification_id):
         db.session.rollback()
         return jsonify({"success": False, "message": "Failed to mark notification as read"}), 500
 
+# Unread notification count (one primary-key lookup)
+@app.route('/api/user/notifications/unread-count', methods=['GET'])
+def get_unread_notification_count():
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return jsonify({"success": False, "message": "Authentication required"}), 401
 
-# Get all forum posts
-@app.route('/api/forum/posts', methods=['GET'])
-def get_forum_posts():
-    current_user_id = None
+    try:
+        user_id = notification_user_id(decode_auth_header(auth_header))
+    except Exception:
+        return jsonify({"success": False, "message": "Invalid token"}), 401
+    if user_id is None:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    counts = db.session.get(User_Notification_Counts, user_id)
+    return jsonify({"success": True, "unread": counts.unread_count if counts else 0}), 200
+
+# Mark many notifications as read
+# Body: {"ids": [1, 2, 3]} or {"from_id": 10, "to_id": 20} (inclusive, either bound optional)
+@app.route('/api/user/notifications/read', methods=['PUT'])
+def mark_notifications_read():
     auth_header = request.headers.get('Authorization')
-    if auth_header:
-        try:
-            token = auth_header.split(' ')[1]
-            payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-            user = Customers.query.filter_by(email=payload.get('email')).first()
-            if user: current_user_id = user.customer_id
-        except: pass
+    if not auth_header:
+        return jsonify({"success": False, "message": "Authentication required"}), 401
 
-    posts = db.session.query(Forum_Posts, Customers.username).join(Customers).order_by(Forum_Posts.created_at.desc()).all()
-    
-    result = []
-    for post, author in posts:
-        # Count likes
-        likes_count = Forum_Likes.query.filter_by(post_id=post.post_id).count()
-        # Count comments
-        comments_count = Forum_Comments.query.filter_by(post_id=post.post_id).count()
-        # Count compliments
-        compliments_count = Forum_Post_Compliments.query.filter_by(post_id=post.post_id).count()
-        # Check if current user liked this post
-        is_liked = False
-        if current_user_id:
-            if Forum_Likes.query.filter_by(post_id=post.post_id, customer_id=current_user_id).first():
-                is_liked = True
-        # Check if current user complimented this post
-        is_complimented = False
-        if current_user_id:
-            if Forum_Post_Compliments.query.filter_by(post_id=post.post_id, customer_id=current_user_id).first():
-                is_complimented = True
+    try:
+        user_id = notification_user_id(decode_auth_header(auth_header))
+    except Exception:
+        return jsonify({"success": False, "message": "Invalid token"}), 401
+    if user_id is None:
+        return jsonify({"success": False, "message": "User not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "message": "Request body must be a JSON object"}), 400
+    query = User_Notifications.query.filter(
+        User_Notifications.user_id == user_id,
+        User_Notifications.is_read.isnot(True)
+    )
+    try:
+        if 'ids' in data:
+            if not isinstance(data['ids'], list):
+                return jsonify({"success": False, "message": "ids must be a list"}), 400
+            ids = [int(i) for i in data['ids']]
+            query = query.filter(User_Notifications.notification_id.in_(ids))
+        elif 'from_id' in data or 'to_id' in data:
+            if data.get('from_id') is not None:
+                query = query.filter(User_Notifications.notification_id >= int(data['from_id']))
+            if data.get('to_id') is not None:
+                query = query.filter(User_Notifications.notification_id <= int(data['to_id']))
+        else:
+            return jsonify({"success": False, "message": "Provide ids or from_id/to_id"}), 400
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Invalid notification ids"}), 400
+
+    try:
+        # Bulk UPDATE skips the mapper events, so adjust the unread count here
+        updated = query.update({User_Notifications.is_read: True}, synchronize_session=False)
+        if updated:
+            adjust_unread_count(db.session.connection(), user_id, -updated)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "message": "Failed to mark notifications as read"}), 500
 
+    counts = db.session.get(User_Notification_Counts, user_id)
+    return jsonify({
+        "success": True,
+        "updated": updated,
+        "unread": counts.unread_count if counts else 0
+    }), 200
+
+
+def build_forum_feed(current_user_id=None, page=None):
+    """
+    Build the forum feed in a single query.
+    Like/comment/compliment counts are read from the maintained counter
+    columns and the viewer's like/compliment flags from correlated EXISTS
+    checks, instead of running 5 queries per post.
+    """
+    if current_user_id:
+        is_liked = db.exists().where(
+            Forum_Likes.post_id == Forum_Posts.post_id,
+            Forum_Likes.customer_id == current_user_id
+        )
+        is_complimented = db.exists().where(
+            Forum_Post_Compliments.post_id == Forum_Posts.post_id,
+            Forum_Post_Compliments.customer_id == current_user_id
+        )
+    else:
+        is_liked = is_complimented = db.literal(False)
+
+    query = db.session.query(
+        Forum_Posts,
+        Customers.username,
+        is_liked.label('is_liked'),
+        is_complimented.label('is_complimented')
+    ).join(Customers, Forum_Posts.customer_id == Customers.customer_id)
+    rows, next_cursor = paginate(query, Forum_Posts.created_at, Forum_Posts.post_id, page)
+
+    result = []
+    for post, author, liked, complimented in rows:
         result.append({
             "id": str(post.post_id),
             "authorName": author,
             "title": post.title,
             "content": post.content,
             "category": post.category,
-            "likes": likes_count,
-            "compliments": compliments_count,
-            "commentCount": comments_count,
+            "likes": post.likes or 0,
+            "compliments": post.compliments or 0,
+            "commentCount": post.comment_count or 0,
             "createdAt": post.created_at.isoformat(),
-            "isLiked": is_liked,
-            "isComplimented": is_complimented
+            "isLiked": bool(liked),
+            "isComplimented": bool(complimented)
         })
+    return result, next_cursor
+
+# Get all forum posts
+@app.route('/api/forum/posts', methods=['GET'])
+def get_forum_posts():
+    page, error = read_page_args()
+    if error:
+        return error
+    current_user_id = None
+    auth_header = request.headers.get('Authorization')
+    if auth_header:
+        try:
+            payload = decode_auth_header(auth_header)
+            user = current_customer(payload)
+            if user: current_user_id = user.customer_id
+        except: pass
+
+    result, next_cursor = build_forum_feed(current_user_id, page)
     
-    return jsonify({"success": True, "posts": result}), 200
+    return jsonify({"success": True, "posts": result, "nextCursor": next_cursor}), 200
 
 # Create a new post
 @app.route('/api/forum/posts', methods=['POST'])
@@ -3510,9 +5050,8 @@ def create_forum_post():
     if not auth_header: return jsonify({"success": False, "message": "Unauthorized"}), 401
     
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
     except: return jsonify({"success": False, "message": "Invalid token"}), 401
 
     data = request.get_json()
@@ -3534,9 +5073,8 @@ def like_forum_post(post_id):
     if not auth_header: return jsonify({"success": False, "message": "Unauthorized"}), 401
     
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
     except: return jsonify({"success": False, "message": "Invalid token"}), 401
 
     existing_like = Forum_Likes.query.filter_by(post_id=post_id, customer_id=user.customer_id).first()
@@ -3548,6 +5086,7 @@ def like_forum_post(post_id):
         new_like = Forum_Likes(post_id=post_id, customer_id=user.customer_id)
         db.session.add(new_like) # Like
         action = "liked"
+    bump_counter(Forum_Posts, Forum_Posts.post_id, post_id, Forum_Posts.likes, -1 if existing_like else 1)
     
     db.session.commit()
     return jsonify({"success": True, "action": action}), 200
@@ -3559,9 +5098,8 @@ def like_forum_comment(comment_id):
     if not auth_header: return jsonify({"success": False, "message": "Unauthorized"}), 401
     
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
     except: return jsonify({"success": False, "message": "Invalid token"}), 401
 
     existing_like = Forum_Comment_Likes.query.filter_by(comment_id=comment_id, customer_id=user.customer_id).first()
@@ -3573,6 +5111,7 @@ def like_forum_comment(comment_id):
         new_like = Forum_Comment_Likes(comment_id=comment_id, customer_id=user.customer_id)
         db.session.add(new_like) # Like
         action = "liked"
+    bump_counter(Forum_Comments, Forum_Comments.comment_id, comment_id, Forum_Comments.likes, -1 if existing_like else 1)
     
     db.session.commit()
     return jsonify({"success": True, "action": action}), 200
@@ -3584,9 +5123,8 @@ def compliment_forum_post(post_id):
     if not auth_header: return jsonify({"success": False, "message": "Unauthorized"}), 401
     
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
     except: return jsonify({"success": False, "message": "Invalid token"}), 401
 
     # Check if customer is VIP
@@ -3609,6 +5147,7 @@ def compliment_forum_post(post_id):
     # Save compliment
     new_compliment = Forum_Post_Compliments(post_id=post_id, customer_id=user.customer_id)
     db.session.add(new_compliment)
+    bump_counter(Forum_Posts, Forum_Posts.post_id, post_id, Forum_Posts.compliments, 1)
     
     db.session.commit()
     return jsonify({"success": True, "message": "Compliment given"}), 200
@@ -3620,9 +5159,8 @@ def compliment_forum_comment(comment_id):
     if not auth_header: return jsonify({"success": False, "message": "Unauthorized"}), 401
     
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
     except: return jsonify({"success": False, "message": "Invalid token"}), 401
 
     # Check if customer is VIP
@@ -3645,6 +5183,7 @@ def compliment_forum_comment(comment_id):
     # Save compliment
     new_compliment = Forum_Comment_Compliments(comment_id=comment_id, customer_id=user.customer_id)
     db.session.add(new_compliment)
+    bump_counter(Forum_Comments, Forum_Comments.comment_id, comment_id, Forum_Comments.compliments, 1)
     
     db.session.commit()
     return jsonify({"success": True, "message": "Compliment given"}), 200
@@ -3652,56 +5191,54 @@ def compliment_forum_comment(comment_id):
 # Get comments for a post
 @app.route('/api/forum/posts/<int:post_id>/comments', methods=['GET'])
 def get_post_comments(post_id):
+    page, error = read_page_args()
+    if error:
+        return error
     # Get current user if authenticated
     current_user_id = None
     auth_header = request.headers.get('Authorization')
     if auth_header:
         try:
-            token = auth_header.split(' ')[1]
-            payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-            user = Customers.query.filter_by(email=payload.get('email')).first()
+            payload = decode_auth_header(auth_header)
+            user = current_customer(payload)
             if user:
                 current_user_id = user.customer_id
         except:
             pass
     
-    comments = db.session.query(Forum_Comments, Customers.username)\
-        .join(Customers)\
-        .filter(Forum_Comments.post_id == post_id)\
-        .order_by(Forum_Comments.created_at.asc())\
-        .all()
+    # Counts come from the counter columns; the viewer's flags from EXISTS checks
+    if current_user_id:
+        is_liked = db.exists().where(
+            Forum_Comment_Likes.comment_id == Forum_Comments.comment_id,
+            Forum_Comment_Likes.customer_id == current_user_id
+        )
+        is_complimented = db.exists().where(
+            Forum_Comment_Compliments.comment_id == Forum_Comments.comment_id,
+            Forum_Comment_Compliments.customer_id == current_user_id
+        )
+    else:
+        is_liked = is_complimented = db.literal(False)
+
+    comments, next_cursor = paginate(
+        db.session.query(Forum_Comments, Customers.username, is_liked.label('is_liked'), is_complimented.label('is_complimented'))
+            .join(Customers, Forum_Comments.customer_id == Customers.customer_id)
+            .filter(Forum_Comments.post_id == post_id),
+        Forum_Comments.created_at, Forum_Comments.comment_id, page, descending=False)
         
     result = []
-    for comment, author in comments:
-        # Count likes
-        likes_count = Forum_Comment_Likes.query.filter_by(comment_id=comment.comment_id).count()
-        # Count compliments
-        compliments_count = Forum_Comment_Compliments.query.filter_by(comment_id=comment.comment_id).count()
-        
-        # Check if current user liked this comment
-        is_liked = False
-        if current_user_id:
-            if Forum_Comment_Likes.query.filter_by(comment_id=comment.comment_id, customer_id=current_user_id).first():
-                is_liked = True
-        
-        # Check if current user complimented this comment
-        is_complimented = False
-        if current_user_id:
-            if Forum_Comment_Compliments.query.filter_by(comment_id=comment.comment_id, customer_id=current_user_id).first():
-                is_complimented = True
-        
+    for comment, author, liked, complimented in comments:
         result.append({
             "id": str(comment.comment_id),
             "postId": str(comment.post_id),
             "authorName": author,
             "content": comment.content,
             "createdAt": comment.created_at.isoformat(),
-            "likes": likes_count,
-            "compliments": compliments_count,
-            "isLiked": is_liked,
-            "isComplimented": is_complimented
+            "likes": comment.likes or 0,
+            "compliments": comment.compliments or 0,
+            "isLiked": bool(liked),
+            "isComplimented": bool(complimented)
         })
-    return jsonify({"success": True, "comments": result}), 200
+    return jsonify({"success": True, "comments": result, "nextCursor": next_cursor}), 200
 
 # Add a comment
 @app.route('/api/forum/posts/<int:post_id>/comments', methods=['POST'])
@@ -3710,9 +5247,8 @@ def create_comment(post_id):
     if not auth_header: return jsonify({"success": False, "message": "Unauthorized"}), 401
     
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        user = Customers.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(auth_header)
+        user = current_customer(payload)
     except: return jsonify({"success": False, "message": "Invalid token"}), 401
 
     data = request.get_json()
@@ -3723,37 +5259,113 @@ def create_comment(post_id):
         created_at=datetime.now(timezone.utc)
     )
     db.session.add(new_comment)
+    bump_counter(Forum_Posts, Forum_Posts.post_id, post_id, Forum_Posts.comment_count, 1)
     db.session.commit()
     return jsonify({"success": True, "message": "Comment added"}), 201
 
 
-@app.route('/api/chat', methods=['POST'])
-def chat_with_ai():
-    """
-    Handle chat messages using Google Gemini with Database Context (Menu + Knowledge Base).
-    Includes robust retry logic for rate limits.
-    """
-    GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
-    if not GOOGLE_API_KEY:
-        return jsonify({"success": False, "message": "Server API Key missing"}), 500
-
-    data = request.get_json()
-    user_message = data.get('message', '')
-
-    if not user_message:
-        return jsonify({"success": False, "message": "Message is empty"}), 400
-
-    try:
-        # 1. Fetch Context
-        dishes = Dishes.query.all()
-        menu_context = "\n".join([f"- {d.name}: ${d.price} ({d.description})" for d in dishes])
-
-        kb_entries = AI_Knowledge_Base.query.filter_by(is_deleted=False).all()
-        kb_context_list = [f"Q: {entry.question}\nA: {entry.answer}" for entry in kb_entries]
-        kb_context_str = "\n---\n".join(kb_context_list)
-
-        # 2. Construct System Prompt
-        system_instruction = f"""
+# Knowledge base retrieval
+# A small BM25 index over the active AI_Knowledge_Base entries, rebuilt together
+# with the prompt context. When the best entry's question covers the user's
+# question (and vice versa) closely enough, chat answers from the KB without
+# calling Gemini; otherwise only the top KB_PROMPT_TOP_K entries go in the prompt.
+KB_PROMPT_TOP_K = 5
+KB_DIRECT_ANSWER_MIN_OVERLAP = 0.8  # idf-weighted term overlap, both directions
+BM25_K1 = 1.5
+BM25_B = 0.75
+KB_QUESTION_WEIGHT = 2  # Question terms count double against answer terms
+KB_STOPWORDS = frozenset("""
+    a an the and or but is are am was were be been being do does did can could
+    will would should shall may might must i me my we our you your it its this
+    that these those there here of to in on at for from by with about as if so
+    what how which please tell know want get any some have has had just
+""".split())
+KB_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def kb_tokenize(text):
+    """Lowercase word tokens without stopwords; trailing plural 's' is dropped."""
+    tokens = []
+    for token in KB_TOKEN_PATTERN.findall((text or '').lower()):
+        if token in KB_STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def build_kb_index(entries):
+    docs = []
+    doc_freq = Counter()
+    for entry in entries:
+        question_terms = kb_tokenize(entry.question)
+        terms = Counter(question_terms * KB_QUESTION_WEIGHT + kb_tokenize(entry.answer))
+        docs.append({
+            "kb_id": entry.kb_id,
+            "question": entry.question,
+            "answer": entry.answer,
+            "question_terms": frozenset(question_terms),
+            "terms": terms,
+            "length": sum(terms.values())
+        })
+        doc_freq.update(terms.keys())
+
+    total = len(docs)
+    idf = {term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+    avg_length = (sum(doc['length'] for doc in docs) / total) if total else 0
+    return {"docs": docs, "idf": idf, "avg_length": avg_length}
+
+
+def search_kb(index, query_terms, limit):
+    """Return up to `limit` (score, doc) pairs ranked by BM25, best first."""
+    idf = index['idf']
+    query_terms = [term for term in set(query_terms) if term in idf]
+    if not query_terms:
+        return []
+
+    scored = []
+    for doc in index['docs']:
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc['length'] / index['avg_length'])
+        score = 0.0
+        for term in query_terms:
+            tf = doc['terms'].get(term)
+            if tf:
+                score += idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+        if score > 0:
+            scored.append((score, doc))
+    return heapq.nlargest(limit, scored, key=lambda item: item[0])
+
+
+def kb_overlap(index, terms, other_terms):
+    """Share of `terms` (weighted by idf) that also appear in `other_terms`."""
+    idf = index['idf']
+    # Terms the KB has never seen still count against the match
+    unseen = max(idf.values(), default=1.0)
+    total = sum(idf.get(term, unseen) for term in terms)
+    if not total:
+        return 0.0
+    return sum(idf.get(term, unseen) for term in terms if term in other_terms) / total
+
+
+def find_direct_kb_answer(index, query_terms, ranked):
+    """Return the top-ranked entry if its question matches the query closely enough."""
+    if not ranked:
+        return None
+    doc = ranked[0][1]
+    query = frozenset(query_terms)
+    if min(kb_overlap(index, query, doc['question_terms']),
+           kb_overlap(index, doc['question_terms'], query)) < KB_DIRECT_ANSWER_MIN_OVERLAP:
+        return None
+    return doc
+
+
+# Chatbot prompt context cache
+# The menu part of the chat prompt and the KB index only change when a dish or
+# KB entry does, so they are built once per prompt_context_version. The dish and
+# KB endpoints call invalidate_prompt_context() after committing.
+PROMPT_CHARS_PER_TOKEN = 4  # Rough average for English text; used for the size estimate
+PROMPT_HEADER = """
         You are the helpful AI assistant for 'Byte & Bite', a tech-themed street food restaurant.
         
         Your Goal:
@@ -3766,46 +5378,290 @@ def chat_with_ai():
         4. Keep answers concise.
         
         === Official Knowledge Base ===
-        {kb_context_str}
+        """
+prompt_context_lock = threading.Lock()
+prompt_context_version = 0
+prompt_context = None  # {"version", "menu_text", "kb_index", "chars", "estimated_tokens", "built_at"}
+
+
+def invalidate_prompt_context():
+    global prompt_context_version
+    with prompt_context_lock:
+        prompt_context_version += 1
+
+
+def get_prompt_context():
+    """Return the cached menu text and KB index for the current version, rebuilding them if stale."""
+    global prompt_context
+    with prompt_context_lock:
+        version = prompt_context_version
+        if prompt_context and prompt_context['version'] == version:
+            return prompt_context
+
+    dishes = Dishes.query.all()
+    menu_context = "\n".join([f"- {d.name}: ${d.price} ({d.description})" for d in dishes])
+    menu_text = f"""
         
         === Current Menu ===
         {menu_context}
         
         === User Query ===
-        {user_message}
         """
 
-        # 3. Configure Gemini
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel('gemini-2.0-flash') 
+    kb_index = build_kb_index(AI_Knowledge_Base.query.filter_by(is_deleted=False).all())
+
+    # Size of the prompt before any KB entries or the user's query are added
+    chars = len(PROMPT_HEADER) + len(menu_text)
+    context = {
+        "version": version,
+        "menu_text": menu_text,
+        "kb_index": kb_index,
+        "chars": chars,
+        "estimated_tokens": chars // PROMPT_CHARS_PER_TOKEN,
+        "built_at": datetime.now(timezone.utc).isoformat()
+    }
+    with prompt_context_lock:
+        # Don't overwrite a newer build if an invalidation raced with this one
+        if prompt_context_version == version:
+            prompt_context = context
+    print(f"[AI] Prompt context v{version} built: {chars} chars (~{context['estimated_tokens']} tokens), {len(kb_index['docs'])} KB entries")
+    return context
 
-        # 4. Call API with Retry Logic (Exponential Backoff)
-        max_retries = 3
-        response_text = "I'm having trouble connecting. Please try again."
 
-        for attempt in range(max_retries):
-            try:
-                # Attempt to generate content
-                response = model.generate_content(system_instruction)
-                response_text = response.text
-                break # Success! Exit the loop
-            
-            except google_exceptions.ResourceExhausted:
-                # If quota exceeded (429 error)
-                if attempt < max_retries - 1:
-                    wait_time = 20 + (attempt * 10) # Attempt 0: 20s, Attempt 1: 30s
-                    print(f"[Gemini] Quota exceeded. Retrying in {wait_time} seconds (Attempt {attempt + 1}/{max_retries})...")
-                    time.sleep(wait_time)
-                else:
-                    print("[Gemini] Quota exceeded. Max retries reached.")
-                    return jsonify({
-                        "success": False, 
-                        "message": "System is busy (High Traffic).",
-                        "reply": "Our AI servers are currently overloaded with requests. Please wait a minute and try asking again!"
-                    }), 429
-            except Exception as e:
-                raise e # Throw other errors immediately
+def build_chat_prompt(context, kb_docs, user_message):
+    kb_context_str = "\n---\n".join(f"Q: {doc['question']}\nA: {doc['answer']}" for doc in kb_docs)
+    return PROMPT_HEADER + kb_context_str + context['menu_text'] + f"""{user_message}
+        """
+
+
+# Chatbot response cache
+# Gemini replies are cached per prompt_context_version, so any dish or KB change
+# retires them. The key is the message's casefolded word characters in any
+# script (punctuation and extra whitespace removed); messages with no word
+# characters at all (emoji, punctuation) are never cached, so they can't share
+# a reply. With CHAT_CACHE_FUZZY=1 a miss also tries the message's sorted
+# content terms (kb_tokenize), so rewordings such as "Do you have burgers?" /
+# "burgers" share a reply. Entries expire after CHAT_CACHE_TTL and the least
+# recently used are evicted past CHAT_CACHE_SIZE.
+CHAT_CACHE_TTL = int(os.environ.get('CHAT_CACHE_TTL', 3600))  # seconds
+CHAT_CACHE_SIZE = int(os.environ.get('CHAT_CACHE_SIZE', 1000))
+CHAT_CACHE_FUZZY = os.environ.get('CHAT_CACHE_FUZZY', '0').lower() in ('1', 'true', 'yes')
+CHAT_CACHE_WORD_PATTERN = re.compile(r"\w+")
+chat_cache = OrderedDict()  # (version, kind, key) -> {"reply", "expires"}
+chat_cache_lock = threading.Lock()
+chat_cache_stats = Counter()  # hits, fuzzy_hits, misses
+
+
+def chat_cache_keys(user_message, query_terms):
+    """Cache keys for a message, most specific first; empty when it must not be cached."""
+    text_key = " ".join(CHAT_CACHE_WORD_PATTERN.findall(user_message.casefold()))
+    if not text_key:
+        return []
+    keys = [('text', text_key)]
+    if CHAT_CACHE_FUZZY and query_terms:
+        keys.append(('terms', " ".join(sorted(set(query_terms)))))
+    return keys
+
+
+def get_cached_reply(version, keys):
+    if not keys:
+        return None
+    now = time.time()
+    with chat_cache_lock:
+        for kind, key in keys:
+            entry = chat_cache.get((version, kind, key))
+            if entry is None:
+                continue
+            if entry['expires'] <= now:
+                del chat_cache[(version, kind, key)]
+                continue
+            chat_cache.move_to_end((version, kind, key))
+            chat_cache_stats['hits' if kind == 'text' else 'fuzzy_hits'] += 1
+            return entry['reply']
+        chat_cache_stats['misses'] += 1
+    return None
+
+
+def store_cached_reply(version, keys, reply):
+    entry = {'reply': reply, 'expires': time.time() + CHAT_CACHE_TTL}
+    with chat_cache_lock:
+        for kind, key in keys:
+            chat_cache[(version, kind, key)] = entry
+        while len(chat_cache) > CHAT_CACHE_SIZE:
+            chat_cache.popitem(last=False)
+
+
+# AI gateway
+# All Gemini calls go through one asyncio loop running on a background thread.
+# The model is configured once and reused; at most AI_MAX_CONCURRENCY calls run
+# at a time (the blocking SDK call executes on a matching thread pool), and
+# rate-limit retries back off with jitter via asyncio.sleep on the gateway loop
+# rather than time.sleep in a request worker. Each call has a total time budget:
+# if the next backoff would not fit in it the caller gets 'busy' right away.
+# The request thread blocks for at most that budget, which is kept well below a
+# typical 30s worker timeout, and once AI_MAX_PENDING calls are queued or
+# running new ones fail fast with 'busy' instead of waiting for a slot.
+# GEMINI_API_ENDPOINT points the client at another server (e.g. a local fake).
+AI_MODEL_NAME = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')
+AI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT')
+AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 4))
+AI_MAX_PENDING = int(os.environ.get('AI_MAX_PENDING', AI_MAX_CONCURRENCY * 2))
+AI_CALL_TIMEOUT = float(os.environ.get('AI_CALL_TIMEOUT', 8))  # seconds, including retries
+AI_RESULT_GRACE = 0.5  # seconds past the budget the request thread waits for the gateway
+AI_MAX_RETRIES = 3
+AI_BACKOFF_BASE = 1.0  # seconds
+AI_BACKOFF_CAP = 8.0
+AI_BUSY_RETRY_AFTER = 30  # seconds, sent as Retry-After when Gemini is rate limiting
+
+ai_gateway_lock = threading.Lock()
+ai_pending = 0  # calls submitted to the gateway and not finished yet
+ai_pending_lock = threading.Lock()
+ai_loop = None
+ai_semaphore = None
+ai_executor = None
+ai_model = None
+
+
+def get_ai_gateway():
+    """Start the gateway loop and configure the model on first use."""
+    global ai_loop, ai_semaphore, ai_executor, ai_model
+    with ai_gateway_lock:
+        if ai_model is None:
+            api_key = os.environ.get('GOOGLE_API_KEY')
+            if not GOOGLE_AVAILABLE or not api_key:
+                return None
+            if AI_API_ENDPOINT:
+                genai.configure(api_key=api_key, transport='rest', client_options={'api_endpoint': AI_API_ENDPOINT})
+            else:
+                genai.configure(api_key=api_key)
+            ai_model = genai.GenerativeModel(AI_MODEL_NAME)
+        if ai_loop is None:
+            ai_loop = asyncio.new_event_loop()
+            ai_executor = concurrent.futures.ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENCY, thread_name_prefix='ai-call')
+            threading.Thread(target=ai_loop.run_forever, name='ai-gateway', daemon=True).start()
+            # Created on the loop so it binds to it
+            ai_semaphore = asyncio.run_coroutine_threadsafe(
+                _create_semaphore(AI_MAX_CONCURRENCY), ai_loop).result()
+    return ai_loop
+
+
+async def _create_semaphore(size):
+    return asyncio.Semaphore(size)
+
+
+async def _ai_generate(contents, budget):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    for attempt in range(AI_MAX_RETRIES):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return None, 'timeout'
+        try:
+            # The slot is held only for the call itself, not during backoff
+            async with ai_semaphore:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None, 'timeout'
+                call = partial(ai_model.generate_content, contents, request_options={'timeout': remaining})
+                response = await asyncio.wait_for(loop.run_in_executor(ai_executor, call), remaining)
+            return response.text, None
+        except (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests):
+            # 429 arrives as ResourceExhausted over gRPC and TooManyRequests over REST.
+            # Full jitter: spreads retries from concurrent callers apart
+            delay = random.uniform(0, min(AI_BACKOFF_CAP, AI_BACKOFF_BASE * 2 ** attempt))
+            if attempt == AI_MAX_RETRIES - 1 or loop.time() + delay >= deadline:
+                print("[Gemini] Quota exceeded. Giving up for this request.")
+                return None, 'busy'
+            print(f"[Gemini] Quota exceeded. Retrying in {delay:.1f}s (Attempt {attempt + 1}/{AI_MAX_RETRIES})...")
+            await asyncio.sleep(delay)
+        except (asyncio.TimeoutError, google_exceptions.DeadlineExceeded):
+            return None, 'timeout'
+    return None, 'busy'
+
+
+def ai_generate(contents, budget=AI_CALL_TIMEOUT):
+    """
+    Run a Gemini generate_content call through the gateway.
+    Returns (text, None) or (None, reason) where reason is 'unavailable',
+    'busy' (rate limited) or 'timeout'. Other errors are raised.
+    """
+    global ai_pending
+    loop = get_ai_gateway()
+    if loop is None:
+        return None, 'unavailable'
+    with ai_pending_lock:
+        if ai_pending >= AI_MAX_PENDING:
+            return None, 'busy'
+        ai_pending += 1
+    future = asyncio.run_coroutine_threadsafe(_ai_generate(contents, budget), loop)
+    future.add_done_callback(_ai_call_finished)
+    try:
+        return future.result(timeout=budget + AI_RESULT_GRACE)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        return None, 'timeout'
+
+
+def _ai_call_finished(future):
+    # Counted until the coroutine ends, even if the caller already gave up on it
+    global ai_pending
+    with ai_pending_lock:
+        ai_pending -= 1
+
+
+@app.route('/api/chat', methods=['POST'])
+def chat_with_ai():
+    """
+    Handle chat messages using Google Gemini with Database Context (Menu + Knowledge Base).
+    Rate limits are retried by the AI gateway within its time budget.
+    """
+    data = request.get_json()
+    user_message = data.get('message', '')
+
+    if not user_message:
+        return jsonify({"success": False, "message": "Message is empty"}), 400
+
+    try:
+        # 1. Answer straight from the knowledge base when an entry clearly matches
+        context = get_prompt_context()
+        query_terms = kb_tokenize(user_message)
+        ranked = search_kb(context['kb_index'], query_terms, KB_PROMPT_TOP_K)
+        direct = find_direct_kb_answer(context['kb_index'], query_terms, ranked)
+        if direct:
+            print(f"[AI] Answered from knowledge base entry {direct['kb_id']}")
+            return jsonify({"success": True, "reply": direct['answer'], "source": "knowledge_base"}), 200
+
+        # 2. Reuse an earlier Gemini reply to the same (or reworded) question
+        cache_keys = chat_cache_keys(user_message, query_terms)
+        cached_reply = get_cached_reply(context['version'], cache_keys)
+        if cached_reply is not None:
+            return jsonify({"success": True, "reply": cached_reply, "source": "cache"}), 200
+
+        if not os.environ.get('GOOGLE_API_KEY'):
+            return jsonify({"success": False, "message": "Server API Key missing"}), 500
+
+        # 3. Cached menu context plus only the most relevant KB entries
+        system_instruction = build_chat_prompt(context, [doc for _, doc in ranked], user_message)
 
+        # 4. Call Gemini through the gateway (shared client, bounded concurrency, retries)
+        response_text, failure = ai_generate(system_instruction)
+
+        if failure == 'busy':
+            return jsonify({
+                "success": False, 
+                "message": "System is busy (High Traffic).",
+                "reply": "Our AI servers are currently overloaded with requests. Please wait a minute and try asking again!"
+            }), 429, {'Retry-After': str(AI_BUSY_RETRY_AFTER)}
+        if failure == 'timeout':
+            return jsonify({
+                "success": False,
+                "message": "AI request timed out.",
+                "reply": "I'm having trouble connecting. Please try again."
+            }), 504
+        if failure:
+            raise RuntimeError(f"AI gateway {failure}")
+
+        store_cached_reply(context['version'], cache_keys, response_text)
         return jsonify({
             "success": True, 
             "reply": response_text
@@ -3818,9 +5674,248 @@ def chat_with_ai():
             "message": "AI is currently offline.",
             "reply": "I'm encountering a system error. Please try again later."
         }), 500
+# Image search preprocessing
+# Uploads are capped in bytes and pixels before they are decoded, JPEGs are
+# decoded straight at reduced scale via draft(), and the result is downscaled to
+# IMAGE_MAX_DIMENSION; only a compact re-encoded JPEG of it goes to Gemini, and
+# EXIF (including GPS) is dropped after its orientation is applied.
+IMAGE_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50_000_000  # Checked from the header, before decoding
+IMAGE_MAX_DIMENSION = 1024  # Longest side sent to the model
+IMAGE_JPEG_QUALITY = 85
+IMAGE_UPLOAD_OVERHEAD = 64 * 1024  # Multipart headers/fields around the file itself
+# Caps every request body, so an upload without Content-Length (chunked) is cut
+# off at the limit instead of being spooled to disk in full by the form parser
+app.config['MAX_CONTENT_LENGTH'] = IMAGE_MAX_BYTES + IMAGE_UPLOAD_OVERHEAD
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"success": False, "message": f"Request is too large (max {IMAGE_MAX_BYTES // (1024 * 1024)} MB)"}), 413
+
+
+def prepare_search_image(file):
+    """Return (image, None) with the upload decoded and downscaled, or (None, error_response)."""
+    data = file.stream.read(IMAGE_MAX_BYTES + 1)
+    if len(data) > IMAGE_MAX_BYTES:
+        return None, (jsonify({"success": False, "message": f"Image is too large (max {IMAGE_MAX_BYTES // (1024 * 1024)} MB)"}), 413)
+
+    try:
+        img = PIL.Image.open(io.BytesIO(data))  # Reads the header only
+        if img.width * img.height > IMAGE_MAX_PIXELS:
+            return None, (jsonify({"success": False, "message": "Image resolution is too large"}), 413)
+
+        img.draft('RGB', (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION))  # No-op for non-JPEG
+        img = PIL.ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Flatten transparency onto white rather than black
+            img = img.convert('RGBA')
+            background = PIL.Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), PIL.Image.LANCZOS)
+    except PIL.Image.DecompressionBombError:
+        # Raised by open() itself for headers far past PIL.Image.MAX_IMAGE_PIXELS
+        return None, (jsonify({"success": False, "message": "Image resolution is too large"}), 413)
+    except (PIL.UnidentifiedImageError, OSError, ValueError):
+        return None, (jsonify({"success": False, "message": "Could not read the image"}), 400)
+    return img, None
+
+
+def encode_search_image(img):
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+# Image search result cache
+# Each prepared upload is fingerprinted with a 64-bit difference hash (dHash),
+# which survives re-encoding, resizing and small edits. Vision results are
+# stored in Image_Search_Cache and indexed in memory by a BK-tree over Hamming
+# distance, so a photo within IMAGE_HASH_MAX_DISTANCE bits of one seen before
+# reuses its label without calling Gemini. The tree is loaded from the table on
+# first use, so the cache survives restarts.
+# Only dish labels are cached (an "ERROR: ..." answer may be a one-off), rows
+# expire after IMAGE_CACHE_TTL and the oldest are dropped past
+# IMAGE_CACHE_MAX_ROWS. Flat or near-uniform images are neither looked up nor
+# stored: their hashes are dominated by noise or collapse towards 0, so unrelated
+# photos would share a label.
+IMAGE_HASH_MAX_DISTANCE = 6  # Of 64 bits
+IMAGE_HASH_MIN_BITS = 4  # A usable hash has between 4 and 60 bits set
+IMAGE_HASH_MIN_STDDEV = 6.0  # Grey levels across the hash thumbnail
+IMAGE_CACHE_TTL = int(os.environ.get('IMAGE_CACHE_TTL', 30 * 24 * 3600))  # seconds
+IMAGE_CACHE_MAX_ROWS = int(os.environ.get('IMAGE_CACHE_MAX_ROWS', 10000))
+image_hash_lock = threading.Lock()
+image_hash_tree = None  # BK-tree node: [hash, (label, expires), {distance: child}]
+image_hash_tree_loaded = False
+
+
+def image_hash_thumbnail(img):
+    return img.convert('L').resize((9, 8), PIL.Image.LANCZOS)
+
+
+def image_dhash(img):
+    """64-bit difference hash: does each pixel of a 9x8 grayscale thumbnail get darker to the right?"""
+    pixels = list(image_hash_thumbnail(img).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def image_hash_is_distinctive(img, image_hash):
+    """False for hashes too close to all-0/all-1, or images too flat for the hash to mean anything."""
+    if not IMAGE_HASH_MIN_BITS <= image_hash.bit_count() <= 64 - IMAGE_HASH_MIN_BITS:
+        return False
+    return PIL.ImageStat.Stat(image_hash_thumbnail(img)).stddev[0] >= IMAGE_HASH_MIN_STDDEV
+
+
+def image_cache_expiry(created_at):
+    if created_at is None:
+        return 0
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)  # SQLite hands back naive UTC
+    return created_at.timestamp() + IMAGE_CACHE_TTL
+
+
+def bk_tree_insert(tree, image_hash, label):
+    if tree is None:
+        return [image_hash, label, {}]
+    node = tree
+    while True:
+        distance = (node[0] ^ image_hash).bit_count()
+        if distance == 0:
+            node[1] = label
+            return tree
+        child = node[2].get(distance)
+        if child is None:
+            node[2][distance] = [image_hash, label, {}]
+            return tree
+        node = child
+
+
+def bk_tree_nearest(tree, image_hash, max_distance, now=None):
+    """
+    Return (distance, label) of the closest hash within max_distance, or None.
+    With now set, labels are (label, expires) pairs and expired ones are skipped.
+    """
+    best = None
+    stack = [tree] if tree is not None else []
+    while stack:
+        node = stack.pop()
+        distance = (node[0] ^ image_hash).bit_count()
+        if now is not None and node[1][1] <= now:
+            pass  # Expired; its children may still match
+        elif distance <= max_distance and (best is None or distance < best[0]):
+            best = (distance, node[1] if now is None else node[1][0])
+            if distance == 0:
+                break
+        # Triangle inequality: only children within max_distance of this node's distance can match
+        for edge, child in node[2].items():
+            if distance - max_distance <= edge <= distance + max_distance:
+                stack.append(child)
+    return best
+
+
+def load_image_hash_tree(reload=False):
+    global image_hash_tree, image_hash_tree_loaded
+    if image_hash_tree_loaded and not reload:
+        return
+    rows = Image_Search_Cache.query.all()
+    with image_hash_lock:
+        if image_hash_tree_loaded and not reload:
+            return
+        tree = None
+        for row in rows:
+            tree = bk_tree_insert(tree, int(row.image_hash, 16), (row.label, image_cache_expiry(row.created_at)))
+        image_hash_tree = tree
+        image_hash_tree_loaded = True
+    print(f"[Image Search] Loaded {len(rows)} cached image results")
+
+
+def lookup_image_label(image_hash):
+    load_image_hash_tree()
+    with image_hash_lock:
+        return bk_tree_nearest(image_hash_tree, image_hash, IMAGE_HASH_MAX_DISTANCE, now=time.time())
+
+
+def prune_image_cache():
+    """Delete expired rows and the oldest past IMAGE_CACHE_MAX_ROWS; rebuild the tree if any went."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=IMAGE_CACHE_TTL)
+    removed = Image_Search_Cache.query.filter(db.or_(
+        Image_Search_Cache.created_at < cutoff, Image_Search_Cache.created_at.is_(None)
+    )).delete(synchronize_session=False)
+    excess = Image_Search_Cache.query.count() - IMAGE_CACHE_MAX_ROWS
+    if excess > 0:
+        oldest = db.session.query(Image_Search_Cache.image_hash) \
+            .order_by(Image_Search_Cache.created_at, Image_Search_Cache.image_hash).limit(excess)
+        removed += Image_Search_Cache.query.filter(Image_Search_Cache.image_hash.in_(oldest.scalar_subquery())) \
+            .delete(synchronize_session=False)
+    db.session.commit()
+    if removed:
+        load_image_hash_tree(reload=True)
+
+
+def remember_image_label(image_hash, label):
+    global image_hash_tree
+    created_at = datetime.now(timezone.utc)
+    try:
+        db.session.execute(
+            sqlite_insert(Image_Search_Cache)
+            .values(image_hash=f"{image_hash:016x}", label=label, created_at=created_at)
+            .on_conflict_do_update(index_elements=['image_hash'], set_={'label': label, 'created_at': created_at})
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[Image Search] Failed to cache result: {e}")
+        return
+    load_image_hash_tree()
+    with image_hash_lock:
+        image_hash_tree = bk_tree_insert(image_hash_tree, image_hash, (label, image_cache_expiry(created_at)))
+    try:
+        prune_image_cache()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[Image Search] Failed to prune cache: {e}")
+
+
+def identify_dish_image(img):
+    """Ask Gemini what dish a prepared image shows. Returns (label, None) or (None, error_response)."""
+    if not GOOGLE_AVAILABLE:
+        return None, (jsonify({"success": False, "message": "AI features are not available"}), 503)
+
+    if not os.environ.get('GOOGLE_API_KEY'):
+        return None, (jsonify({"success": False, "message": "Server API Key missing"}), 500)
+
+    prompt = """
+        Analyze this image. 
+        1. Is it a picture of food? If not, respond EXACTLY: "ERROR: NOT_FOOD".
+        2. Are there multiple distinct dishes that are too confusing? If yes, respond EXACTLY: "ERROR: MULTIPLE".
+        3. If it is a single food item, return ONLY the generic name of the dish (e.g., "Burger", "Ramen", "Tacos"). 
+           Do not add punctuation or extra words.
+        """
+
+    result_text, failure = ai_generate([prompt, {"mime_type": "image/jpeg", "data": encode_search_image(img)}])
+    if failure == 'busy':
+        return None, (jsonify({"success": False, "message": "AI service is busy. Please try again shortly."}), 429, {'Retry-After': str(AI_BUSY_RETRY_AFTER)})
+    if failure == 'timeout':
+        return None, (jsonify({"success": False, "message": "AI request timed out. Please try again."}), 504)
+    if failure:
+        return None, (jsonify({"success": False, "message": "AI features are not available"}), 503)
+    return result_text.strip(), None
+
+
 @app.route('/api/menu/search-by-image', methods=['POST'])
 def search_food_by_image():
     # 1. Validate File
+    # Reject oversized uploads from the header, before the body is parsed
+    if request.content_length and request.content_length > IMAGE_MAX_BYTES + IMAGE_UPLOAD_OVERHEAD:
+        return jsonify({"success": False, "message": f"Image is too large (max {IMAGE_MAX_BYTES // (1024 * 1024)} MB)"}), 413
+
     if 'image' not in request.files:
         return jsonify({"success": False, "message": "No image uploaded"}), 400
     
@@ -3833,31 +5928,24 @@ def search_food_by_image():
     if '.' not in file.filename or file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
         return jsonify({"success": False, "message": "Invalid file type. Allowed: png, jpg, jpeg, webp"}), 400
 
-    # 2. Call Gemini Vision API
     try:
-        if not GOOGLE_AVAILABLE:
-            return jsonify({"success": False, "message": "AI features are not available"}), 503
-            
-        GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
-        if not GOOGLE_API_KEY:
-            return jsonify({"success": False, "message": "Server API Key missing"}), 500
-
-        img = PIL.Image.open(file)
-        
-        # Configure Gemini
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel('gemini-2.0-flash') # Use Flash for speed
-
-        prompt = """
-        Analyze this image. 
-        1. Is it a picture of food? If not, respond EXACTLY: "ERROR: NOT_FOOD".
-        2. Are there multiple distinct dishes that are too confusing? If yes, respond EXACTLY: "ERROR: MULTIPLE".
-        3. If it is a single food item, return ONLY the generic name of the dish (e.g., "Burger", "Ramen", "Tacos"). 
-           Do not add punctuation or extra words.
-        """
-
-        response = model.generate_content([prompt, img])
-        result_text = response.text.strip()
+        img, error = prepare_search_image(file)
+        if error:
+            return error
+
+        # 2. Reuse the label of a near-identical photo seen before
+        image_hash = image_dhash(img)
+        cacheable = image_hash_is_distinctive(img, image_hash)
+        match = lookup_image_label(image_hash) if cacheable else None
+        if match:
+            distance, result_text = match
+            print(f"[Image Search] Cache hit (distance {distance})")
+        else:
+            result_text, error = identify_dish_image(img)
+            if error:
+                return error
+            if cacheable and result_text and "ERROR:" not in result_text:
+                remember_image_label(image_hash, result_text)
 
         # 3. Handle Exceptions from AI
         if "ERROR: NOT_FOOD" in result_text:
@@ -3869,33 +5957,10 @@ def search_food_by_image():
         # 4. Search Database for matches
         print(f"[Image Search] AI identified: '{result_text}'")
         
-        # Get all dishes for reference
-        all_dishes = Dishes.query.all() 
-        print(f"[Image Search] Total dishes in DB: {len(all_dishes)}")
-        
-        # Simple but effective search: try multiple variations
-        search_terms = [
-            result_text.lower(),
-            result_text.lower().replace(' ', ''),  # Remove spaces
-            result_text.lower().split()[0] if ' ' in result_text else result_text.lower()  # First word only
-        ]
-        
-        matched_dishes = set()
-        
-        for term in search_terms:
-            search_pattern = f"%{term}%"
-            
-            # Search in names
-            name_matches = Dishes.query.filter(Dishes.name.ilike(search_pattern)).all()
-            for dish in name_matches:
-                matched_dishes.add(dish)
-            
-            # Search in descriptions
-            desc_matches = Dishes.query.filter(Dishes.description.ilike(search_pattern)).all()
-            for dish in desc_matches:
-                matched_dishes.add(dish)
-        
-        matched_dishes = list(matched_dishes)
+        # Ranked full-text query, falling back to typo-tolerant matches;
+        # the variants cover "Chicken Burger" vs "chickenburger"
+        search_text = f"{result_text} {result_text.replace(' ', '')}"
+        matched_dishes = find_dishes(search_text)
         print(f"[Image Search] Found {len(matched_dishes)} matches")
 
         if not matched_dishes:
@@ -3911,23 +5976,7 @@ def search_food_by_image():
             }), 404
 
         # 5. Return Results
-        results = []
-        for dish in matched_dishes:
-            # Get Chef Name
-            chef_name = "Unknown"
-            if dish.chef_id:
-                chef = Employees.query.get(dish.chef_id)
-                if chef: chef_name = chef.name
-
-            results.append({
-                'id': str(dish.dish_id),
-                'name': dish.name,
-                'price': float(dish.price),
-                'description': dish.description,
-                'image': dish.image_url,
-                'is_vip': dish.is_vip,
-                'chef_name': chef_name
-            })
+        results = serialize_search_results(matched_dishes)
 
         return jsonify({
             "success": True, 
@@ -3946,9 +5995,8 @@ def rate_ai_answer():
     # 1. Get Customer ID (if logged in)
     if auth_header:
         try:
-            token = auth_header.split(' ')[1]
-            payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-            user = Customers.query.filter_by(email=payload.get('email')).first()
+            payload = decode_auth_header(auth_header)
+            user = current_customer(payload)
             if user: customer_id = user.customer_id
         except: pass
 
@@ -4007,10 +6055,14 @@ def rate_ai_answer():
             )
             db.session.add(new_rating)
             db.session.commit()
+            if rating in (0, 5):
+                invalidate_prompt_context()  # KB entry was added, restored or hidden
             return jsonify({"success": True, "message": "Rating saved and KB updated."}), 200
         elif kb_entry:
             # Guest user: KB updated but rating not saved
             db.session.commit()
+            if rating in (0, 5):
+                invalidate_prompt_context()
             return jsonify({"success": True, "message": "Feedback received and KB updated."}), 200
         else:
             # If we are here, it means Rating is 1-4 AND it wasn't in KB.
@@ -4021,14 +6073,34 @@ def rate_ai_answer():
         db.session.rollback()
         print(f"Rating Error: {e}")
         return jsonify({"success": False, "message": "Failed to save rating"}), 500
+# Chatbot prompt context size (Manager only)
+@app.route('/api/manager/kb/context', methods=['GET'])
+@require_role('Manager')
+def get_prompt_context_stats():
+    context = get_prompt_context()
+    return jsonify({
+        "success": True,
+        "version": context['version'],
+        "chars": context['chars'],
+        "estimated_tokens": context['estimated_tokens'],
+        "kb_entries": len(context['kb_index']['docs']),
+        "kb_prompt_top_k": KB_PROMPT_TOP_K,
+        "built_at": context['built_at'],
+        "response_cache": {
+            "entries": len(chat_cache),
+            "hits": chat_cache_stats['hits'],
+            "fuzzy_hits": chat_cache_stats['fuzzy_hits'],
+            "misses": chat_cache_stats['misses']
+        }
+    }), 200
+
 @app.route('/api/manager/kb', methods=['GET'])
 def get_kb_entries():
     # Verify Manager Role
     auth_header = request.headers.get('Authorization')
     if not auth_header: return jsonify({"success": False}), 401
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(auth_header)
         if payload.get('role') != 'Manager': return jsonify({"success": False}), 403
     except: return jsonify({"success": False}), 401
 
@@ -4069,8 +6141,7 @@ def add_kb_entry():
     # Verify Manager
     auth_header = request.headers.get('Authorization')
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(auth_header)
         if payload.get('role') != 'Manager': return jsonify({"success": False}), 403
         manager_email = payload.get('email')
     except: return jsonify({"success": False}), 401
@@ -4083,7 +6154,7 @@ def add_kb_entry():
         return jsonify({"success": False, "message": "Question and Answer required"}), 400
 
     try:
-        manager = Employees.query.filter_by(email=manager_email).first()
+        manager = current_employee(payload)
         
         new_kb = AI_Knowledge_Base(
             employee_id=manager.employee_id,
@@ -4094,6 +6165,7 @@ def add_kb_entry():
         )
         db.session.add(new_kb)
         db.session.commit()
+        invalidate_prompt_context()
         return jsonify({"success": True, "message": "Knowledge added"}), 201
     except Exception as e:
         print(e)
@@ -4105,8 +6177,7 @@ def delete_kb_entry(kb_id):
     auth_header = request.headers.get('Authorization')
     if not auth_header: return jsonify({"success": False}), 401
     try:
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(auth_header)
         if payload.get('role') != 'Manager': return jsonify({"success": False}), 403
     except: return jsonify({"success": False}), 401
 
@@ -4118,6 +6189,7 @@ def delete_kb_entry(kb_id):
     try:
         kb_entry.is_deleted = True
         db.session.commit()
+        invalidate_prompt_context()
         return jsonify({"success": True, "message": "Knowledge entry deleted"}), 200
     except Exception as e:
         db.session.rollback()
@@ -4130,8 +6202,7 @@ def delete_kb_entry(kb_id):
 def file_complaint():
     """File a complaint or compliment against a customer, chef, or delivery person"""
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(request.headers.get('Authorization'))
         complainant_email = payload.get('email')
         complainant_role = payload.get('role')
     except: return jsonify({"success": False}), 401
@@ -4156,11 +6227,11 @@ def file_complaint():
     try:
         # Get complainant ID based on role
         if complainant_role == 'Customer':
-            complainant = Customers.query.filter_by(email=complainant_email).first()
+            complainant = current_customer(payload)
             complainant_id = complainant.customer_id
             complainant_type = 'customer'
         elif complainant_role == 'Delivery':
-            complainant = Employees.query.filter_by(email=complainant_email).first()
+            complainant = current_employee(payload)
             complainant_id = complainant.employee_id
             complainant_type = 'delivery'
         else:
@@ -4213,19 +6284,21 @@ def file_complaint():
 @app.route('/api/complaints', methods=['GET'])
 def get_complaints():
     """Get complaints based on user role"""
+    page, error = read_page_args()
+    if error:
+        return error
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(request.headers.get('Authorization'))
         user_role = payload.get('role')
         user_email = payload.get('email')
         
         # If role is not set in token, infer it from user existence
         if not user_role:
-            user = Customers.query.filter_by(email=user_email).first()
+            user = current_customer(payload)
             if user:
                 user_role = 'Customer'
             else:
-                user = Employees.query.filter_by(email=user_email).first()
+                user = current_employee(payload)
                 if user:
                     user_role = user.role
                 else:
@@ -4236,10 +6309,10 @@ def get_complaints():
     try:
         # Get user info
         if user_role == 'Customer':
-            user = Customers.query.filter_by(email=user_email).first()
+            user = current_customer(payload)
             user_id = user.customer_id if user else None
         elif user_role in ['Delivery', 'Chef', 'Manager']:
-            user = Employees.query.filter_by(email=user_email).first()
+            user = current_employee(payload)
             user_id = user.employee_id if user else None
         else:
             return jsonify({"success": False, "message": "Invalid user role"}), 403
@@ -4250,23 +6323,25 @@ def get_complaints():
         # Filter complaints based on user role
         if user_role == 'Manager':
             # Managers see all complaints
-            complaints = Complaints.query.order_by(Complaints.created_at.desc()).all()
+            complaints = Complaints.query
         elif user_role == 'Customer':
             # Customers see complaints they filed or complaints against them
             complaints = Complaints.query.filter(
                 ((Complaints.complainant_type == 'customer') & (Complaints.complainant_id == user_id)) |
                 ((Complaints.accused_type == 'customer') & (Complaints.accused_id == user_id))
-            ).order_by(Complaints.created_at.desc()).all()
+            )
         elif user_role in ['Delivery', 'Chef']:
             # Delivery drivers and chefs see complaints they filed or complaints against them
             employee_type = 'delivery' if user_role == 'Delivery' else 'chef'
             complaints = Complaints.query.filter(
                 ((Complaints.complainant_type == employee_type) & (Complaints.complainant_id == user_id)) |
                 ((Complaints.accused_type == employee_type) & (Complaints.accused_id == user_id))
-            ).order_by(Complaints.created_at.desc()).all()
+            )
         else:
             return jsonify({"success": False, "message": "Unauthorized"}), 403
 
+        complaints, next_cursor = paginate(complaints, Complaints.created_at, Complaints.complaint_id, page)
+
         complaints_list = []
 
         for c in complaints:
@@ -4305,7 +6380,7 @@ def get_complaints():
                 'appeal_message': c.appeal_message
             })
 
-        return jsonify({"success": True, "complaints": complaints_list}), 200
+        return jsonify({"success": True, "complaints": complaints_list, "nextCursor": next_cursor}), 200
 
     except Exception as e:
         print(e)
@@ -4402,8 +6477,7 @@ def evaluate_employee_performance(employee):
 def review_complaint(complaint_id):
     """Manager reviews and decides on a complaint"""
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(request.headers.get('Authorization'))
         if payload.get('role') != 'Manager': return jsonify({"success": False}), 403
         manager_email = payload.get('email')
     except: return jsonify({"success": False}), 401
@@ -4419,7 +6493,7 @@ def review_complaint(complaint_id):
         return jsonify({"success": False, "message": "Decision explanation required"}), 400
 
     try:
-        manager = Employees.query.filter_by(email=manager_email).first()
+        manager = current_employee(payload)
         complaint = Complaints.query.get(complaint_id)
 
         if not complaint:
@@ -4491,8 +6565,7 @@ def review_complaint(complaint_id):
 def dispute_complaint(complaint_id):
     """Allow complainant to dispute a manager's decision"""
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(request.headers.get('Authorization'))
         complainant_email = payload.get('email')
         complainant_role = payload.get('role')
     except: return jsonify({"success": False}), 401
@@ -4506,10 +6579,10 @@ def dispute_complaint(complaint_id):
     try:
         # Get complainant ID
         if complainant_role == 'Customer':
-            complainant = Customers.query.filter_by(email=complainant_email).first()
+            complainant = current_customer(payload)
             complainant_id = complainant.customer_id
         elif complainant_role == 'Delivery':
-            complainant = Employees.query.filter_by(email=complainant_email).first()
+            complainant = current_employee(payload)
             complainant_id = complainant.employee_id
         else:
             return jsonify({"success": False, "message": "Unauthorized"}), 403
@@ -4546,15 +6619,14 @@ def dispute_complaint(complaint_id):
 def accept_complaint(complaint_id):
     """Allow accused employee to accept a complaint and apply penalties immediately"""
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(request.headers.get('Authorization'))
         accused_email = payload.get('email')
     except Exception as e:
         return jsonify({"success": False}), 401
 
     try:
         # Get accused employee
-        accused = Employees.query.filter_by(email=accused_email).first()
+        accused = current_employee(payload)
         if not accused:
             return jsonify({"success": False, "message": "Employee not found"}), 404
 
@@ -4602,8 +6674,7 @@ def accept_complaint(complaint_id):
 def appeal_complaint(complaint_id):
     """Allow accused party to appeal a complaint with a message to the manager"""
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
+        payload = decode_auth_header(request.headers.get('Authorization'))
         accused_email = payload.get('email')
         accused_role = payload.get('role')
     except Exception as e:
@@ -4622,13 +6693,13 @@ def appeal_complaint(complaint_id):
         accused_id = None
         
         # First try to find as customer
-        accused = Customers.query.filter_by(email=accused_email).first()
+        accused = current_customer(payload)
         if accused:
             accused_id = accused.customer_id
             accused_role = 'Customer'  # Override role if not set
         else:
             # Try to find as employee
-            accused = Employees.query.filter_by(email=accused_email).first()
+            accused = current_employee(payload)
             if accused:
                 accused_id = accused.employee_id
                 accused_role = accused.role  # Use the role from employee record
@@ -4684,9 +6755,8 @@ def appeal_complaint(complaint_id):
 def review_complaint_appeal(complaint_id):
     """Manager reviews an appeal and decides to repeal or uphold the complaint"""
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        manager = Employees.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(request.headers.get('Authorization'))
+        manager = current_employee(payload)
 
         if not manager or manager.role != 'Manager':
             return jsonify({"success": False, "message": "Manager access required"}), 403
@@ -4812,9 +6882,8 @@ def review_complaint_appeal(complaint_id):
 def notify_complaint_accused(complaint_id):
     """Notify the accused party about a complaint"""
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        manager = Employees.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(request.headers.get('Authorization'))
+        manager = current_employee(payload)
         
         if not manager or manager.role != 'Manager':
             return jsonify({"success": False, "message": "Manager access required"}), 403
@@ -4861,9 +6930,8 @@ def notify_complaint_accused(complaint_id):
 def update_complaint_status(complaint_id):
     """Update complaint status (used for marking as notified)"""
     try:
-        token = request.headers.get('Authorization').split(' ')[1]
-        payload = jwt.decode(token, app.secret_key, algorithms=['HS256'])
-        manager = Employees.query.filter_by(email=payload.get('email')).first()
+        payload = decode_auth_header(request.headers.get('Authorization'))
+        manager = current_employee(payload)
         
         if not manager or manager.role != 'Manager':
             return jsonify({"success": False, "message": "Manager access required"}), 403
@@ -4889,4 +6957,4 @@ def update_complaint_status(complaint_id):
         return jsonify({"success": False, "message": "Failed to update complaint status"}), 500
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True, threaded=True)  # Threaded: each open SSE stream holds a thread
\ No newline at end of file
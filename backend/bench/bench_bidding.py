@@ -0,0 +1,101 @@
+"""
+Delivery bid settlement: the original loop (load every Bid of a session,
+min() in Python, one commit per auction) against resolve_expired_biddings'
+single window query and bulk updates, over thousands of expired auctions.
+
+    python bench/bench_bidding.py --auctions 2000 --bids 30
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchutil import bulk_insert, count_queries, load_app
+
+
+def seed(A, auctions, bids_per_auction):
+    rng = random.Random(3)
+    with A.app.app_context():
+        bulk_insert(A, A.Employees, [
+            {'name': f'Bench Driver {i}', 'email': f'benchdriver{i}@bytebite.com', 'password_hash': 'x',
+             'role': 'Delivery', 'status': 'Active'} for i in range(50)])
+        driver_ids = [e.employee_id for e in A.Employees.query.filter_by(role='Delivery').all()]
+        customer_id = A.Customers.query.first().customer_id
+        chef_id = A.Employees.query.filter_by(role='Chef').first().employee_id
+        started = datetime.now(timezone.utc) - timedelta(minutes=10)
+        bulk_insert(A, A.Orders, [
+            {'customer_id': customer_id, 'chef_id': chef_id, 'status': 'Ready for Delivery',
+             'total_price': 20, 'order_time': started} for _ in range(auctions)])
+        bulk_insert(A, A.Delivery_Bids, [
+            {'order_id': order_id, 'status': 'active', 'start_time': started} for order_id in range(1, auctions + 1)])
+        # Amounts in whole dollars so ties are common and the tie-break is exercised
+        bulk_insert(A, A.Bid, [
+            {'bidding_id': bidding_id, 'employee_id': rng.choice(driver_ids), 'bid_amount': rng.randint(3, 12),
+             'bid_time': started, 'is_winning_bid': False}
+            for bidding_id in range(1, auctions + 1) for _ in range(bids_per_auction)])
+
+
+def reset(A):
+    with A.app.app_context():
+        A.db.session.execute(A.db.update(A.Orders).values(status='Ready for Delivery', delivery_person_id=None))
+        A.db.session.execute(A.db.update(A.Delivery_Bids).values(status='active', end_time=None))
+        A.db.session.execute(A.db.update(A.Bid).values(is_winning_bid=False))
+        A.db.session.commit()
+
+
+def assignments(A):
+    with A.app.app_context():
+        return dict(A.db.session.query(A.Orders.order_id, A.Orders.delivery_person_id).all())
+
+
+def legacy_resolve_expired_biddings(A):
+    """The original settlement loop."""
+    for bidding in A.Delivery_Bids.query.filter_by(status='active').all():
+        time_diff = datetime.now(timezone.utc) - bidding.start_time.replace(tzinfo=timezone.utc)
+        if time_diff > timedelta(minutes=5):
+            print(f"[SYSTEM] Bidding #{bidding.bidding_id} expired. Resolving...")
+            bids = A.Bid.query.filter_by(bidding_id=bidding.bidding_id).all()
+            if not bids:
+                continue
+            winning_bid = min(bids, key=lambda x: x.bid_amount)
+            order = A.db.session.get(A.Orders, bidding.order_id)
+            order.delivery_person_id = winning_bid.employee_id
+            order.status = 'In Transit'
+            bidding.status = 'completed'
+            winning_bid.is_winning_bid = True
+            A.db.session.commit()
+            print(f"[SYSTEM] Order #{order.order_id} assigned to Emp #{winning_bid.employee_id} at ${winning_bid.bid_amount}")
+
+
+def settle(A, fn):
+    with A.app.app_context(), count_queries(A) as queries, contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+    return elapsed, queries[0], assignments(A)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--auctions', type=int, default=2000)
+    parser.add_argument('--bids', type=int, default=30)
+    args = parser.parse_args()
+
+    A = load_app()
+    seed(A, args.auctions, args.bids)
+
+    legacy = settle(A, lambda: legacy_resolve_expired_biddings(A))
+    reset(A)
+    current = settle(A, A.resolve_expired_biddings)
+    assert legacy[2] == current[2], "window query picked different winners"
+    assert all(current[2].values()), "some auctions were left unassigned"
+
+    print(f"\n{args.auctions} expired auctions x {args.bids} bids")
+    for label, (elapsed, queries, _) in (("per-auction loop (before)", legacy), ("window query + bulk (after)", current)):
+        print(f"{label:<30} {elapsed * 1000:9.1f} ms   {queries:>6} statements")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+/api/chat knowledge-base handling: the original flow (every message goes to
+Gemini with the whole knowledge base in the prompt) against BM25 retrieval
+that answers close matches locally and sends only the top KB_PROMPT_TOP_K
+entries otherwise. Gemini is not called; its latency is modelled.
+
+    python bench/bench_chat_kb.py --model-latency 0.8
+"""
+import argparse
+import json
+import os
+import time
+
+from benchutil import BACKEND_DIR, load_app
+
+# The seeded KB questions, rewordings of them, and questions the KB can't answer
+REPLAY = [
+    "How can I become a VIP?",
+    "What are the benefits of being a VIP?",
+    "What is the delivery process?",
+    "Do you offer refunds?",
+    "Where are you located?",
+    "how do i become a vip",
+    "VIP benefits?",
+    "where are you located??",
+    "Can I get a refund",
+    "what's the delivery process",
+    "Do you have vegan options?",
+    "What time do you open on Sundays?",
+    "Is the Truffle Wagyu Burger spicy?",
+    "Can I pay with a credit card?",
+    "Which dish do you recommend for two people?",
+    "How long does delivery take to downtown?",
+    "Any deals today?",
+]
+
+
+def seed_kb(A):
+    """Add knowledge.json's topics to the five entries app.py seeds."""
+    with open(os.path.join(BACKEND_DIR, 'knowledge.json')) as f:
+        topics = [item for item in json.load(f) if item['topic'] != 'Default']
+    with A.app.app_context():
+        for item in topics:
+            A.db.session.add(A.AI_Knowledge_Base(
+                question=f"Tell me about {', '.join(item['question_keywords'])}", answer=item['answer']))
+        A.db.session.commit()
+        A.invalidate_prompt_context()
+        return A.AI_Knowledge_Base.query.filter_by(is_deleted=False).count()
+
+
+def legacy_prompt(A, context, kb_entries, message):
+    """The original prompt: every active KB entry plus the menu, rebuilt per message."""
+    kb_context_str = "\n---\n".join(f"Q: {entry.question}\nA: {entry.answer}" for entry in kb_entries)
+    return A.PROMPT_HEADER + kb_context_str + context['menu_text'] + f"""{message}
+        """
+
+
+def current_prompt(A, message):
+    """The current chat_with_ai steps up to the Gemini call; returns (direct answer or None, prompt or None)."""
+    context = A.get_prompt_context()
+    query_terms = A.kb_tokenize(message)
+    ranked = A.search_kb(context['kb_index'], query_terms, A.KB_PROMPT_TOP_K)
+    direct = A.find_direct_kb_answer(context['kb_index'], query_terms, ranked)
+    if direct:
+        return direct, None
+    return None, A.build_chat_prompt(context, [doc for _, doc in ranked], message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model-latency', type=float, default=0.8, help="seconds per modelled Gemini call")
+    parser.add_argument('--rounds', type=int, default=200, help="times the replay list is run for timing")
+    args = parser.parse_args()
+
+    A = load_app()
+    entries = seed_kb(A)
+
+    with A.app.app_context():
+        context = A.get_prompt_context()
+        kb_entries = A.AI_Knowledge_Base.query.filter_by(is_deleted=False).all()
+        by_question = {entry.question: entry.kb_id for entry in kb_entries}
+
+        before_chars, after_chars, after_entries, direct = [], [], [], 0
+        for message in REPLAY:
+            before_chars.append(len(legacy_prompt(A, context, kb_entries, message)))
+            doc, prompt = current_prompt(A, message)
+            if doc:
+                direct += 1
+                # A verbatim KB question must be answered by its own entry
+                assert by_question.get(message, doc['kb_id']) == doc['kb_id'], message
+                print(f"  local  {message!r} -> entry {doc['kb_id']}")
+            else:
+                after_chars.append(len(prompt))
+                after_entries.append(prompt.count("\nA: "))
+                print(f"  model  {message!r} ({after_entries[-1]} KB entries in prompt)")
+
+        # Local work per message, excluding the model call
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for message in REPLAY:
+                legacy_prompt(A, A.get_prompt_context(), A.AI_Knowledge_Base.query.filter_by(is_deleted=False).all(), message)
+        before_local = (time.perf_counter() - started) * 1000 / (args.rounds * len(REPLAY))
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for message in REPLAY:
+                current_prompt(A, message)
+        after_local = (time.perf_counter() - started) * 1000 / (args.rounds * len(REPLAY))
+
+    total = len(REPLAY)
+    model_ms = args.model_latency * 1000
+    before_latency = before_local + model_ms
+    after_latency = after_local + model_ms * (total - direct) / total
+    print(f"\n{total} messages, {entries} KB entries, model latency {model_ms:.0f} ms")
+    print(f"{'whole KB in every prompt (before)':<36} model calls {total:>3}   "
+          f"prompt avg {sum(before_chars) / total:7.0f} chars   local {before_local:6.3f} ms/msg   "
+          f"mean reply {before_latency:5.0f} ms")
+    print(f"{'direct answers + top-k (after)':<36} model calls {total - direct:>3}   "
+          f"prompt avg {sum(after_chars) / max(1, len(after_chars)):7.0f} chars   local {after_local:6.3f} ms/msg   "
+          f"mean reply {after_latency:5.0f} ms")
+    print(f"answered locally: {direct}/{total} ({direct / total:.0%}); "
+          f"KB entries per remaining prompt: {min(after_entries, default=0)}-{max(after_entries, default=0)} of {entries}")
+
+
+if __name__ == '__main__':
+    main()
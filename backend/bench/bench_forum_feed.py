@@ -0,0 +1,97 @@
+"""
+GET /api/forum/posts: the original feed (five queries per post) against
+build_forum_feed's single query over the counter columns, for the full list
+and for the first page the endpoint now serves.
+
+    python bench/bench_forum_feed.py --posts 3000 --likes 20000 --comments 15000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+
+from benchutil import bulk_insert, count_queries, load_app, report, time_calls
+
+
+def seed(A, posts, likes, compliments, comments, customers=200):
+    rng = random.Random(11)
+    with A.app.app_context():
+        bulk_insert(A, A.Customers, [
+            {'username': f'benchuser{i}', 'email': f'benchuser{i}@example.com', 'password_hash': 'x'}
+            for i in range(customers)])
+        customer_ids = [c for (c,) in A.db.session.query(A.Customers.customer_id).all()]
+        start = datetime.now(timezone.utc) - timedelta(days=365)
+        bulk_insert(A, A.Forum_Posts, [
+            {'customer_id': rng.choice(customer_ids), 'title': f'Post {i}', 'content': 'Seeded for the feed benchmark',
+             'category': rng.choice(['general', 'reviews', 'tips']), 'created_at': start + timedelta(minutes=i)}
+            for i in range(posts)])
+        post_ids = range(1, posts + 1)
+        # At most one like/compliment per (post, customer), as the routes enforce
+        for model, count in ((A.Forum_Likes, likes), (A.Forum_Post_Compliments, compliments)):
+            pairs = set()
+            while len(pairs) < count:
+                pairs.add((rng.choice(post_ids), rng.choice(customer_ids)))
+            bulk_insert(A, model, [{'post_id': p, 'customer_id': c} for p, c in pairs])
+        bulk_insert(A, A.Forum_Comments, [
+            {'post_id': rng.choice(post_ids), 'customer_id': rng.choice(customer_ids), 'content': 'comment',
+             'created_at': start} for _ in range(comments)])
+        A.reconcile_forum_counters()
+        return customer_ids[len(customer_ids) // 2]
+
+
+def legacy_forum_feed(A, current_user_id):
+    """The original get_forum_posts body."""
+    posts = A.db.session.query(A.Forum_Posts, A.Customers.username).join(A.Customers) \
+        .order_by(A.Forum_Posts.created_at.desc()).all()
+    result = []
+    for post, author in posts:
+        likes_count = A.Forum_Likes.query.filter_by(post_id=post.post_id).count()
+        comments_count = A.Forum_Comments.query.filter_by(post_id=post.post_id).count()
+        compliments_count = A.Forum_Post_Compliments.query.filter_by(post_id=post.post_id).count()
+        is_liked = bool(current_user_id and A.Forum_Likes.query.filter_by(
+            post_id=post.post_id, customer_id=current_user_id).first())
+        is_complimented = bool(current_user_id and A.Forum_Post_Compliments.query.filter_by(
+            post_id=post.post_id, customer_id=current_user_id).first())
+        result.append({
+            "id": str(post.post_id), "authorName": author, "title": post.title, "content": post.content,
+            "category": post.category, "likes": likes_count, "compliments": compliments_count,
+            "commentCount": comments_count, "createdAt": post.created_at.isoformat(),
+            "isLiked": is_liked, "isComplimented": is_complimented
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=3000)
+    parser.add_argument('--likes', type=int, default=20000)
+    parser.add_argument('--compliments', type=int, default=5000)
+    parser.add_argument('--comments', type=int, default=15000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--legacy-runs', type=int, default=3)
+    args = parser.parse_args()
+
+    A = load_app()
+    viewer = seed(A, args.posts, args.likes, args.compliments, args.comments)
+    first_page = {'limit': A.DEFAULT_PAGE_SIZE, 'after': None}
+
+    with A.app.app_context():
+        feed, _ = A.build_forum_feed(viewer)
+        assert legacy_forum_feed(A, viewer) == feed, "aggregated feed differs from the per-post queries"
+
+        results = []
+        for label, fn, runs in (
+            ("per-post queries (before)", lambda: legacy_forum_feed(A, viewer), args.legacy_runs),
+            ("single query, full list", lambda: A.build_forum_feed(viewer), args.runs),
+            (f"single query, first {A.DEFAULT_PAGE_SIZE} (after)", lambda: A.build_forum_feed(viewer, first_page), args.runs),
+        ):
+            with count_queries(A) as queries:
+                fn()
+            results.append((label, time_calls(fn, runs), queries[0]))
+
+    print(f"\n{args.posts} posts, {args.likes} likes, {args.compliments} compliments, {args.comments} comments")
+    for label, samples, queries in results:
+        report(label, samples, queries)
+
+
+if __name__ == '__main__':
+    main()
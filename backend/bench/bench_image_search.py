@@ -0,0 +1,120 @@
+"""
+/api/image-search upload handling: the original path (decode the upload at
+full resolution and let google.generativeai encode it, a lossless WebP for an
+in-memory image) against prepare_search_image + encode_search_image (draft
+decode, downscale to IMAGE_MAX_DIMENSION, JPEG). Each path and image runs in
+its own process and peak memory is the rise in VmHWM over the RSS before the
+first run; Pillow allocates its pixel buffers outside Python, where
+tracemalloc can't see them.
+
+    python bench/bench_image_search.py --runs 3
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import PIL.Image
+
+IMAGES = {
+    # name: (size, format)
+    'phone-12mp.jpg': ((4032, 3024), 'JPEG'),
+    'camera-24mp.jpg': ((6000, 4000), 'JPEG'),
+    'screenshot.png': ((2560, 1600), 'PNG'),
+}
+
+
+def make_photo(size, seed):
+    """Smooth colour regions from an upscaled random grid plus sensor-like noise."""
+    rng = random.Random(seed)
+    coarse = PIL.Image.frombytes('RGB', (48, 36), rng.randbytes(48 * 36 * 3))
+    img = coarse.resize(size, PIL.Image.BICUBIC)
+    noise = PIL.Image.effect_noise(size, 24).convert('RGB')
+    return PIL.Image.blend(img, noise, 0.15)
+
+
+def write_images(directory):
+    paths = {}
+    for seed, (name, (size, fmt)) in enumerate(IMAGES.items()):
+        img = make_photo(size, seed)
+        if fmt == 'PNG':
+            img = img.convert('RGBA')
+        path = os.path.join(directory, name)
+        img.save(path, fmt, **({'quality': 92} if fmt == 'JPEG' else {}))
+        paths[name] = path
+    return paths
+
+
+def read_status_mb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024  # kB
+
+
+def reset_peak_rss():
+    # Resets VmHWM to the current RSS (Linux 4.0+), so the peak covers only what follows
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def run_path(path_name, image_path, runs):
+    from werkzeug.datastructures import FileStorage
+    from google.generativeai.types import content_types
+    from benchutil import load_app
+
+    A = load_app()
+    with open(image_path, 'rb') as f:
+        data = f.read()
+
+    def before():
+        img = PIL.Image.open(io.BytesIO(data))
+        return content_types._pil_to_blob(img).data
+
+    def after():
+        img, error = A.prepare_search_image(FileStorage(stream=io.BytesIO(data)))
+        assert error is None
+        return A.encode_search_image(img)
+
+    fn = before if path_name == 'before' else after
+    reset_peak_rss()
+    baseline = read_status_mb('VmRSS')
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        payload = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    print(json.dumps({'ms': sorted(samples)[len(samples) // 2], 'peak_mb': read_status_mb('VmHWM') - baseline,
+                      'payload': len(payload), 'upload': len(data)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--path', choices=['before', 'after'], help=argparse.SUPPRESS)
+    parser.add_argument('--image', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.path:
+        run_path(args.path, args.image, args.runs)
+        return
+
+    paths = write_images(tempfile.mkdtemp(prefix='bytebite-bench-images-'))
+    print(f"{'image':<18}{'path':<8}{'upload':>10}{'median':>12}{'peak RSS':>12}{'payload':>12}")
+    for name, image_path in paths.items():
+        for path_name in ('before', 'after'):
+            output = subprocess.run(
+                [sys.executable, __file__, '--path', path_name, '--image', image_path, '--runs', str(args.runs)],
+                capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{name:<18}{path_name:<8}{result['upload'] / 1024:>8.0f} KB{result['ms']:>9.0f} ms"
+                  f"{result['peak_mb']:>9.0f} MB{result['payload'] / 1024:>9.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
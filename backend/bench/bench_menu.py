@@ -0,0 +1,113 @@
+"""
+GET /api/menu: the per-dish query loop (3 queries per dish) against the single
+grouped query in build_menu_items, plus the endpoint with its cached body.
+
+    python bench/bench_menu.py --dishes 2000 --orders 20000 --reviews 8000
+"""
+import argparse
+import random
+from datetime import datetime, timezone
+
+from benchutil import bulk_insert, count_queries, load_app, report, time_calls
+
+
+def seed(A, dishes, orders, reviews, chefs=20):
+    rng = random.Random(1)
+    with A.app.app_context():
+        bulk_insert(A, A.Employees, [
+            {'name': f'Bench Chef {i}', 'email': f'benchchef{i}@bytebite.com', 'password_hash': 'x',
+             'role': 'Chef', 'status': 'Active', 'profile_image_url': f'https://example.com/chef{i}.png'}
+            for i in range(chefs)])
+        chef_ids = [e.employee_id for e in A.Employees.query.filter_by(role='Chef').all()]
+        customer_id = A.Customers.query.first().customer_id
+        first_dish = A.db.session.query(A.db.func.max(A.Dishes.dish_id)).scalar() + 1
+        bulk_insert(A, A.Dishes, [
+            {'name': f'Bench Dish {i}', 'price': 5 + i % 20, 'description': 'Seeded for the menu benchmark',
+             'image_url': f'https://example.com/dish{i}.jpg', 'is_vip': i % 10 == 0,
+             'chef_id': rng.choice(chef_ids + [None])}
+            for i in range(dishes)])
+        dish_ids = list(range(1, first_dish + dishes))
+        now = datetime.now(timezone.utc)
+        bulk_insert(A, A.Orders, [
+            {'customer_id': customer_id, 'chef_id': rng.choice(chef_ids), 'status': 'Delivered',
+             'total_price': 20, 'order_time': now}
+            for _ in range(orders)])
+        bulk_insert(A, A.Order_Items, [
+            {'order_id': order_id, 'dish_id': dish_id, 'quantity': 1}
+            for order_id in range(1, orders + 1) for dish_id in rng.sample(dish_ids, 2)])
+        bulk_insert(A, A.Reviews, [
+            {'order_id': order_id, 'customer_id': customer_id, 'chef_rating': 5,
+             'dish_rating': rng.randint(1, 5), 'delivery_rating': 5}
+            for order_id in rng.sample(range(1, orders + 1), reviews)])
+
+
+def legacy_menu_items(A, include_vip=False):
+    """The previous get_menu body: an Employees lookup, an Orders count and a rating AVG per dish."""
+    dishes = A.Dishes.query.all() if include_vip else A.Dishes.query.filter_by(is_vip=False).all()
+    menu_items = []
+    for dish in dishes:
+        chef_name = chef_image = chef_order_count = None
+        if dish.chef_id:
+            chef = A.Employees.query.filter_by(employee_id=dish.chef_id).first()
+            if chef:
+                chef_name = chef.name
+                chef_image = chef.profile_image_url
+                chef_order_count = A.Orders.query.filter_by(chef_id=dish.chef_id).count()
+        rating = A.db.session.query(A.db.func.avg(A.Reviews.dish_rating)) \
+            .join(A.Order_Items, A.Reviews.order_id == A.Order_Items.order_id) \
+            .filter(A.Order_Items.dish_id == dish.dish_id).scalar()
+        menu_items.append({
+            'id': str(dish.dish_id), 'name': dish.name, 'price': float(dish.price),
+            'description': dish.description, 'image': dish.image_url, 'is_vip': dish.is_vip,
+            'chef_name': chef_name, 'chef_image': chef_image, 'chef_order_count': chef_order_count,
+            'rating': round(float(rating), 1) if rating is not None else None
+        })
+    return sorted(menu_items, key=lambda item: int(item['id']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dishes', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--reviews', type=int, default=8000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--legacy-runs', type=int, default=5)
+    args = parser.parse_args()
+
+    A = load_app()
+    seed(A, args.dishes, args.orders, args.reviews)
+    client = A.app.test_client()
+
+    with A.app.app_context():
+        assert legacy_menu_items(A) == A.build_menu_items(), "grouped query differs from the per-dish loop"
+
+        with count_queries(A) as legacy_queries:
+            legacy_menu_items(A)
+        legacy = time_calls(lambda: legacy_menu_items(A), args.legacy_runs)
+
+        with count_queries(A) as grouped_queries:
+            A.build_menu_items()
+        grouped = time_calls(lambda: A.build_menu_items(), args.runs)
+
+    def cold_request():
+        A.invalidate_menu_cache()
+        client.get('/api/menu')
+
+    with count_queries(A) as cold_queries:
+        cold_request()
+    cold = time_calls(cold_request, args.runs)
+
+    client.get('/api/menu')
+    with count_queries(A) as warm_queries:
+        client.get('/api/menu')
+    warm = time_calls(lambda: client.get('/api/menu'), args.runs)
+
+    print(f"\n{args.dishes} extra dishes, {args.orders} orders, {args.reviews} reviews")
+    report("per-dish loop (before)", legacy, legacy_queries[0])
+    report("build_menu_items (after)", grouped, grouped_queries[0])
+    report("GET /api/menu, cache cold", cold, cold_queries[0])
+    report("GET /api/menu, cache warm", warm, warm_queries[0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+GET /api/menu/<id> under concurrent load: the previous handler (a raw
+sqlite3.connect per request) against the pooled engine lookup, with and
+without the per-dish response cache. Reports requests per second.
+
+    python bench/bench_menu_item.py --threads 1 8 --requests 2000
+"""
+import argparse
+import random
+import sqlite3
+import threading
+import time
+
+from flask import jsonify
+
+from benchutil import bulk_insert, load_app
+
+
+def register_variants(A):
+    """Extra routes for the variants being compared; must run before the first request."""
+
+    @A.app.route('/bench/legacy-menu/<item_id>')
+    def legacy_menu_item(item_id):
+        # The previous get_menu_item, minus the ETag check
+        db_conn = sqlite3.connect(A.db_path)
+        db_conn.row_factory = sqlite3.Row
+        cursor = db_conn.cursor()
+        cursor.execute("SELECT * FROM Dishes WHERE dish_id = ?", (item_id,))
+        row = cursor.fetchone()
+        db_conn.close()
+        if row:
+            item = dict(row)
+            item['id'] = str(item.pop('dish_id'))
+            item['price'] = float(item['price']) if item['price'] else 0
+            return jsonify(item)
+        return jsonify({"error": "Item not found"}), 404
+
+    @A.app.route('/bench/pooled-menu/<item_id>')
+    def pooled_menu_item(item_id):
+        # The current lookup with the response cache taken out
+        row = A.db.session.execute(A.dish_by_id_query, {'dish_id': item_id}).mappings().first()
+        if not row:
+            return jsonify({"error": "Item not found"}), 404
+        item = dict(row)
+        item['id'] = str(item.pop('dish_id'))
+        item['price'] = float(item['price']) if item['price'] else 0
+        return jsonify(item)
+
+
+def throughput(A, path, dish_ids, threads, requests):
+    per_thread = requests // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = A.app.test_client()
+        barrier.wait()
+        for _ in range(per_thread):
+            assert client.get(f'{path}/{rng.choice(dish_ids)}').status_code == 200
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dishes', type=int, default=500)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    A = load_app()
+    with A.app.app_context():
+        bulk_insert(A, A.Dishes, [{'name': f'Bench Dish {i}', 'price': 9.5, 'description': 'bench',
+                                   'image_url': 'https://example.com/d.jpg'} for i in range(args.dishes)])
+        dish_ids = [d for (d,) in A.db.session.query(A.Dishes.dish_id).all()]
+    register_variants(A)
+
+    client = A.app.test_client()
+    for dish_id in dish_ids[:3]:
+        legacy = client.get(f'/bench/legacy-menu/{dish_id}').get_json()
+        assert legacy == client.get(f'/api/menu/{dish_id}').get_json() == client.get(f'/bench/pooled-menu/{dish_id}').get_json()
+
+    variants = [
+        ("raw sqlite3.connect (before)", '/bench/legacy-menu'),
+        ("pooled engine, no cache", '/bench/pooled-menu'),
+        ("pooled engine + cache (after)", '/api/menu'),
+    ]
+    print(f"\n{len(dish_ids)} dishes, {args.requests} requests per run")
+    for threads in args.threads:
+        for label, path in variants:
+            rate = throughput(A, path, dish_ids, threads, args.requests)
+            print(f"{label:<32} {threads:>2} threads  {rate:8.0f} req/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Read throughput while checkouts and delivery bids write concurrently, with
+the old SQLite settings (rollback journal, synchronous=FULL, no mmap, default
+page cache) against the tuned ones (WAL, synchronous=NORMAL, mmap, 64 MB
+cache). Each configuration runs in its own process on a fresh database,
+because the pragmas are applied when app.py opens its connections.
+
+    python bench/bench_sqlite_tuning.py --seconds 5 --readers 8 --writers 4
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+CONFIGS = {
+    'before': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_BUSY_TIMEOUT_MS': '5000',
+               'SQLITE_MMAP_SIZE': '0', 'SQLITE_CACHE_SIZE_KB': '2000'},
+    'after': {},  # app.py defaults
+}
+
+
+def run_load(args):
+    import jwt
+    from benchutil import bulk_insert, load_app, percentile
+
+    A = load_app()
+    with A.app.app_context():
+        customer = A.Customers.query.filter_by(email='test@example.com').first()
+        customer.deposited_cash = 10 ** 7
+        A.db.session.commit()
+        chef_id = A.Employees.query.filter_by(role='Chef').first().employee_id
+        dish_id = A.Dishes.query.filter_by(is_vip=False).first().dish_id
+        bulk_insert(A, A.Orders, [
+            {'customer_id': customer.customer_id, 'chef_id': chef_id, 'status': 'Ready for Delivery',
+             'total_price': 20, 'order_time': datetime.now(timezone.utc)} for _ in range(50)])
+        pool_ids = [o for (o,) in A.db.session.query(A.Orders.order_id).all()]
+
+    def headers(email, role):
+        token = jwt.encode({'email': email, 'role': role, 'exp': datetime.now(timezone.utc) + timedelta(hours=1)},
+                           A.app.secret_key, algorithm='HS256')
+        return {'Authorization': f'Bearer {token}'}
+
+    customer_headers = headers('test@example.com', 'Customer')
+    driver_headers = [headers('delivery1@bytebite.com', 'Delivery'), headers('delivery2@bytebite.com', 'Delivery')]
+    reads = [('/api/orders?limit=20', customer_headers), ('/api/user/notifications/unread-count', customer_headers),
+             ('/api/menu/search?q=burger', {})]
+    order_body = {"items": [{"id": dish_id, "quantity": 1}], "totalPrice": 10, "deliveryInfo": {"phone": "555"}}
+
+    stop = threading.Event()
+    results = {'read_ms': [], 'reads': 0, 'writes': 0, 'write_errors': 0}
+    lock = threading.Lock()
+
+    def reader(seed):
+        client, rng, latencies = A.app.test_client(), random.Random(seed), []
+        while not stop.is_set():
+            path, hdrs = rng.choice(reads)
+            started = time.perf_counter()
+            ok = client.get(path, headers=hdrs).status_code == 200
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert ok
+        with lock:
+            results['read_ms'].extend(latencies)
+            results['reads'] += len(latencies)
+
+    def writer(seed):
+        client, rng, done, errors = A.app.test_client(), random.Random(seed), 0, 0
+        while not stop.is_set():
+            if seed % 2:
+                status = client.post('/api/orders', json=order_body, headers=customer_headers).status_code
+            else:
+                status = client.post('/api/delivery/bid', headers=rng.choice(driver_headers),
+                                     json={'order_id': rng.choice(pool_ids), 'bid_amount': rng.randint(3, 9)}).status_code
+            done += 1
+            errors += status >= 300
+        with lock:
+            results['writes'] += done
+            results['write_errors'] += errors
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps({
+        'reads_per_s': results['reads'] / args.seconds,
+        'read_p50': percentile(results['read_ms'], 50),
+        'read_p99': percentile(results['read_ms'], 99),
+        'writes_per_s': results['writes'] / args.seconds,
+        'write_errors': results['write_errors'],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--config', choices=sorted(CONFIGS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.config:
+        os.environ.update(CONFIGS[args.config])
+        run_load(args)
+        return
+
+    print(f"{args.readers} reader and {args.writers} writer threads for {args.seconds:g}s each")
+    for config in ('before', 'after'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--config', config, '--seconds', str(args.seconds),
+             '--readers', str(args.readers), '--writers', str(args.writers)],
+            capture_output=True, text=True, check=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{config:<7} reads {r['reads_per_s']:7.0f}/s  p50 {r['read_p50']:7.2f} ms  p99 {r['read_p99']:8.2f} ms"
+              f"   writes {r['writes_per_s']:6.0f}/s  failed writes {r['write_errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Shared setup for the benchmark scripts: a throwaway SQLite database seeded
+with seed_data.py's employees, dishes and customers, statement counting and
+latency percentiles. Each bench_*.py script seeds the rest of its own data,
+times the previous implementation of a hot path (kept inline in the script)
+against the current one and checks that both return the same result.
+
+Run from backend/:  python bench/bench_menu.py --help
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(journal_mode=None):
+    """Import app.py against a fresh database file and seed the base data."""
+    db_dir = tempfile.mkdtemp(prefix='bytebite-bench-')
+    os.environ['SQLITE_DB_PATH'] = os.path.join(db_dir, 'bench.db')
+    os.environ.pop('GOOGLE_API_KEY', None)
+    if journal_mode:
+        os.environ['SQLITE_JOURNAL_MODE'] = journal_mode
+    sys.path.insert(0, BACKEND_DIR)
+
+    import app as app_module
+    import seed_data
+
+    with app_module.app.app_context():
+        seed_data.seed_employees()
+        seed_data.seed_dishes()
+        seed_data.seed_customers()
+    return app_module
+
+
+def bulk_insert(app_module, model, rows, chunk=5000):
+    """Insert plain dicts in chunks; returns nothing. Skips ORM events, like a data import."""
+    db = app_module.db
+    for start in range(0, len(rows), chunk):
+        db.session.execute(db.insert(model), rows[start:start + chunk])
+    db.session.commit()
+
+
+@contextmanager
+def count_queries(app_module):
+    """Count the SQL statements run inside the block: `with count_queries(A) as counter: ...; counter[0]`."""
+    from sqlalchemy import event
+
+    counter = [0]
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+
+
+def time_calls(fn, runs, warmup=1):
+    """Run fn warmup + runs times; returns the timed durations in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label, samples, queries=None):
+    line = f"{label:<34} p50 {percentile(samples, 50):9.2f} ms   p99 {percentile(samples, 99):9.2f} ms"
+    if queries is not None:
+        line += f"   {queries:>6} queries"
+    print(line)
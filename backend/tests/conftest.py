@@ -0,0 +1,51 @@
+"""
+Shared fixtures: the app is imported once per test session against a fresh
+SQLite file (SQLITE_DB_PATH), seeded with seed_data.py's employees, dishes and
+customers. Tests that need more data add it themselves.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_db_dir = tempfile.mkdtemp(prefix='bytebite-tests-')
+os.environ['SQLITE_DB_PATH'] = os.path.join(_db_dir, 'test.db')
+os.environ.pop('GOOGLE_API_KEY', None)
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app as app_module
+    import seed_data
+
+    with app_module.app.app_context():
+        seed_data.seed_employees()
+        seed_data.seed_dishes()
+        seed_data.seed_customers()
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def make_token(app_module):
+    def make_token(email, role):
+        payload = {'email': email, 'role': role, 'exp': datetime.now(timezone.utc) + timedelta(hours=1)}
+        return jwt.encode(payload, app_module.app.secret_key, algorithm='HS256')
+    return make_token
+
+
+@pytest.fixture
+def auth_header(make_token):
+    def auth_header(email, role):
+        return {'Authorization': f'Bearer {make_token(email, role)}'}
+    return auth_header
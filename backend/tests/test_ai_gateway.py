@@ -0,0 +1,143 @@
+"""
+The AI gateway against a stubbed model: rate limits are retried up to
+AI_MAX_RETRIES inside the time budget, and the request thread never waits
+much past that budget. One test runs the real SDK over REST against a local
+fake Gemini server via GEMINI_API_ENDPOINT.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+
+class StubModel:
+    """generate_content fails with the queued errors in order, then answers."""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, contents, request_options=None):
+        with self.lock:
+            self.calls += 1
+            error = self.errors.pop(0) if self.errors else None
+        if self.delay:
+            time.sleep(self.delay)
+        if error:
+            raise error
+        return type('Response', (), {'text': f'reply to {contents}'})()
+
+
+@pytest.fixture
+def stub_model(app_module, monkeypatch):
+    def install(**kwargs):
+        model = StubModel(**kwargs)
+        monkeypatch.setattr(app_module, 'ai_model', model)
+        return model
+    monkeypatch.setattr(app_module, 'AI_BACKOFF_BASE', 0.01)
+    return install
+
+
+def rate_limited():
+    return google_exceptions.ResourceExhausted('quota')
+
+
+def test_retries_rate_limits_then_answers(app_module, stub_model):
+    model = stub_model(errors=[rate_limited(), google_exceptions.TooManyRequests('slow down')])
+    assert app_module.ai_generate('hi', budget=2) == ('reply to hi', None)
+    assert model.calls == 3
+
+
+def test_gives_up_after_max_retries(app_module, stub_model):
+    model = stub_model(errors=[rate_limited() for _ in range(10)])
+    assert app_module.ai_generate('hi', budget=2) == (None, 'busy')
+    assert model.calls == app_module.AI_MAX_RETRIES
+
+
+def test_backoff_that_overruns_the_budget_fails_fast(app_module, stub_model, monkeypatch):
+    model = stub_model(errors=[rate_limited() for _ in range(10)])
+    monkeypatch.setattr(app_module, 'AI_BACKOFF_BASE', 5.0)
+    monkeypatch.setattr(app_module.random, 'uniform', lambda low, high: high)
+    started = time.monotonic()
+    assert app_module.ai_generate('hi', budget=1) == (None, 'busy')
+    assert time.monotonic() - started < 0.5
+    assert model.calls == 1
+
+
+def test_slow_model_times_out_within_budget(app_module, stub_model):
+    stub_model(delay=1.0)
+    started = time.monotonic()
+    assert app_module.ai_generate('hi', budget=0.2) == (None, 'timeout')
+    assert time.monotonic() - started < 0.2 + app_module.AI_RESULT_GRACE
+
+
+def test_full_queue_fails_fast(app_module, stub_model, monkeypatch):
+    stub_model(delay=0.5)
+    monkeypatch.setattr(app_module, 'AI_MAX_PENDING', 2)
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(app_module.ai_generate('hi', budget=2)))
+               for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    assert app_module.ai_generate('hi', budget=2) == (None, 'busy')
+    assert time.monotonic() - started < 0.1
+
+    for worker in workers:
+        worker.join()
+    assert results == [('reply to hi', None)] * 2
+    assert app_module.ai_pending == 0
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """Answers generateContent with the server's queued statuses in order, then 200."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        server.paths.append(self.path)
+        status = server.statuses.pop(0) if server.statuses else 200
+        if status == 200:
+            body = {"candidates": [{"content": {"role": "model", "parts": [{"text": "Code Burger"}]},
+                                    "finishReason": "STOP", "index": 0}]}
+        else:
+            body = {"error": {"code": status, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_gemini(app_module, monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGeminiHandler)
+    server.statuses, server.paths = [], []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('GOOGLE_API_KEY', 'test-key')
+    monkeypatch.setattr(app_module, 'AI_API_ENDPOINT', f'http://127.0.0.1:{server.server_port}')
+    monkeypatch.setattr(app_module, 'ai_model', None)  # Reconfigured against the fake on first use
+    monkeypatch.setattr(app_module, 'AI_BACKOFF_BASE', 0.01)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_rest_transport_retries_429_from_gemini_endpoint(app_module, fake_gemini):
+    fake_gemini.statuses = [429]
+    assert app_module.ai_generate('what dish is this?', budget=5) == ('Code Burger', None)
+    assert len(fake_gemini.paths) == 2
+    assert all(path.split('?')[0].endswith(f'models/{app_module.AI_MODEL_NAME}:generateContent')
+               for path in fake_gemini.paths)
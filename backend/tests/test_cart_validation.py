@@ -0,0 +1,38 @@
+"""Malformed carts are rejected with 400 by both the quote and the checkout route."""
+import pytest
+
+BAD_BODIES = [
+    {"items": [{"id": "abc", "quantity": 1}]},
+    {"items": [{"id": 1, "quantity": 0}]},
+    {"items": [{"id": 1, "quantity": -2}]},
+    {"items": [{"id": 1, "quantity": "2"}]},
+    {"items": [{"id": 1, "quantity": True}]},
+    {"items": [{"id": None, "quantity": 1}]},
+    {"items": [{"quantity": 1}]},
+    {"items": ["1"]},
+    {"items": {"id": 1, "quantity": 1}},
+    {"items": [{"id": 1, "quantity": 1}], "totalPrice": "abc"},
+    {"items": [{"id": 1, "quantity": 1}], "deliveryInfo": "street"},
+    [{"id": 1, "quantity": 1}],
+]
+
+
+@pytest.mark.parametrize('path', ['/api/orders/quote', '/api/orders'])
+@pytest.mark.parametrize('body', BAD_BODIES, ids=[str(i) for i in range(len(BAD_BODIES))])
+def test_malformed_cart_is_rejected(app_module, client, auth_header, path, body):
+    with app_module.app.app_context():
+        before = app_module.Customers.query.filter_by(email='test@example.com').first().deposited_cash
+    response = client.post(path, json=body, headers=auth_header('test@example.com', 'Customer'))
+    assert response.status_code == 400, response.get_data(as_text=True)
+    assert response.get_json()['success'] is False
+    with app_module.app.app_context():
+        assert app_module.Customers.query.filter_by(email='test@example.com').first().deposited_cash == before
+
+
+def test_numeric_string_dish_id_is_accepted(app_module, client, auth_header):
+    with app_module.app.app_context():
+        dish = app_module.Dishes.query.filter_by(is_vip=False).first()
+    body = {"items": [{"id": str(dish.dish_id), "quantity": 2}]}
+    response = client.post('/api/orders/quote', json=body, headers=auth_header('test@example.com', 'Customer'))
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['items'][0]['quantity'] == 2
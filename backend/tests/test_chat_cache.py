@@ -0,0 +1,36 @@
+"""Chat reply cache keys: any script gets its own key, and keyless messages are never cached."""
+import pytest
+
+
+@pytest.fixture
+def chat_cache(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'chat_cache', type(app_module.chat_cache)())
+    return app_module
+
+
+def keys(A, message):
+    return A.chat_cache_keys(message, A.kb_tokenize(message))
+
+
+def test_non_latin_messages_get_distinct_keys(chat_cache):
+    A = chat_cache
+    assert keys(A, "你们有汉堡吗？") != keys(A, "你们几点关门？")
+    assert keys(A, "你们有汉堡吗？") == keys(A, "你们有汉堡吗")
+    assert keys(A, "Есть ли бургеры?") == keys(A, "есть  ли БУРГЕРЫ")
+    assert keys(A, "Straße") == keys(A, "STRASSE")
+
+
+def test_messages_without_words_are_not_cached(chat_cache):
+    A = chat_cache
+    assert keys(A, "🍔🍔?") == []
+    A.store_cached_reply(1, keys(A, "🍔🍔?"), "burgers!")
+    assert A.get_cached_reply(1, keys(A, "🍕")) is None
+    assert len(A.chat_cache) == 0
+
+
+def test_fuzzy_keys_are_off_by_default(chat_cache, monkeypatch):
+    A = chat_cache
+    assert not A.CHAT_CACHE_FUZZY
+    assert [kind for kind, _ in keys(A, "Do you have burgers?")] == ['text']
+    monkeypatch.setattr(A, 'CHAT_CACHE_FUZZY', True)
+    assert [kind for kind, _ in keys(A, "Do you have burgers?")] == ['text', 'terms']
@@ -0,0 +1,107 @@
+"""
+Parallel checkouts against one balance.
+The debit is a single conditional UPDATE, so however the requests interleave
+exactly as many orders succeed as the balance covers, the balance never goes
+negative, and every successful order has exactly one Financial_Log row.
+"""
+import threading
+from decimal import Decimal
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+PARALLEL_CHECKOUTS = 16
+
+
+@pytest.fixture
+def checkout(app_module, auth_header):
+    """A fresh customer and a one-dish cart; returns (email, body, order_total)."""
+    A = app_module
+    with A.app.app_context():
+        dish = A.Dishes.query.filter_by(is_vip=False).first()
+        count = A.Customers.query.count()
+        email = f'parallel{count}@example.com'
+        A.db.session.add(A.Customers(username=f'parallel{count}', email=email,
+                                     password_hash=generate_password_hash('x'), deposited_cash=Decimal('0.00')))
+        A.db.session.commit()
+        body = {"items": [{"id": dish.dish_id, "quantity": 1}], "totalPrice": float(dish.price),
+                "deliveryInfo": {"phone": "555-0000"}}
+
+    quote = A.app.test_client().post('/api/orders/quote', json=body, headers=auth_header(email, 'Customer'))
+    assert quote.status_code == 200, quote.get_data(as_text=True)
+    return email, body, Decimal(str(quote.get_json()['finalTotal']))
+
+
+def fund(app_module, email, amount):
+    with app_module.app.app_context():
+        customer = app_module.Customers.query.filter_by(email=email).first()
+        customer.deposited_cash = amount
+        app_module.db.session.commit()
+
+
+def place_in_parallel(app_module, headers, body, count):
+    barrier = threading.Barrier(count)
+    statuses = [None] * count
+
+    def place(i):
+        client = app_module.app.test_client()
+        barrier.wait()
+        statuses[i] = client.post('/api/orders', json=body, headers=headers).status_code
+
+    threads = [threading.Thread(target=place, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return statuses
+
+
+def customer_state(app_module, email):
+    A = app_module
+    with A.app.app_context():
+        customer = A.Customers.query.filter_by(email=email).first()
+        logs = A.Financial_Log.query.filter_by(customer_id=customer.customer_id, type='Order').all()
+        orders = A.Orders.query.filter_by(customer_id=customer.customer_id).count()
+        return Decimal(str(customer.deposited_cash)), logs, orders
+
+
+@pytest.mark.parametrize('affordable', [PARALLEL_CHECKOUTS, PARALLEL_CHECKOUTS // 2 + 1])
+def test_parallel_checkouts_debit_exactly_once(app_module, auth_header, checkout, affordable):
+    email, body, order_total = checkout
+    # A little over `affordable` orders' worth, but not enough for one more
+    start_balance = (order_total * affordable + order_total / 2).quantize(Decimal('0.01'))
+    fund(app_module, email, start_balance)
+
+    statuses = place_in_parallel(app_module, auth_header(email, 'Customer'), body, PARALLEL_CHECKOUTS)
+
+    assert statuses.count(201) == affordable, statuses
+    # Rejected checkouts are "Insufficient funds" (or blacklisted once the warnings pile up), never errors
+    assert all(status in (201, 400, 403) for status in statuses), statuses
+
+    balance, logs, orders = customer_state(app_module, email)
+    assert balance == start_balance - order_total * affordable
+    assert orders == affordable
+    assert len(logs) == affordable
+    assert all(Decimal(str(log.amount)) == order_total for log in logs)
+    assert len({log.order_id for log in logs}) == affordable
+
+
+def test_sequential_checkouts_drain_wallet_to_exactly_zero(app_module, client, auth_header, checkout):
+    email, body, order_total = checkout
+    orders = 10
+    fund(app_module, email, order_total * orders)
+    headers = auth_header(email, 'Customer')
+
+    statuses = [client.post('/api/orders', json=body, headers=headers).status_code for _ in range(orders)]
+
+    assert statuses == [201] * orders
+    balance, logs, placed = customer_state(app_module, email)
+    assert balance == Decimal('0.00')
+    assert placed == orders
+    # The stored value itself is exact, not a float a hair above or below zero
+    with app_module.app.app_context():
+        stored = app_module.db.session.execute(
+            app_module.db.text("SELECT deposited_cash FROM Customers WHERE email = :email"), {'email': email}).scalar()
+    assert stored == 0
+    # An empty wallet rejects the next order
+    assert client.post('/api/orders', json=body, headers=headers).status_code == 400
@@ -0,0 +1,31 @@
+"""Subscribers that fall behind are cut off so they reconnect and replay, instead of silently missing events."""
+
+
+def test_overflowing_subscriber_is_marked_dead(app_module):
+    A = app_module
+    topics = [('test-topic', 1)]
+    slow = A.subscribe_events(topics)
+    try:
+        for i in range(A.SUBSCRIBER_QUEUE_SIZE + 1):
+            A.publish_event(topics, {'n': i})
+        assert slow.dead
+        assert slow.qsize() == A.SUBSCRIBER_QUEUE_SIZE
+    finally:
+        A.unsubscribe_events(topics, slow)
+
+
+def test_overflowed_order_stream_closes(app_module, client, auth_header):
+    A = app_module
+    ticket = client.post('/api/stream-ticket', headers=auth_header('manager@bytebite.com', 'Manager')).get_json()['ticket']
+    response = client.get('/api/orders/stream', query_string={'ticket': ticket})
+    assert response.status_code == 200
+    assert b'retry:' in next(response.response)
+
+    for seq in range(A.SUBSCRIBER_QUEUE_SIZE + 1):
+        A.publish_event([('orders', 'all')], {'seq': seq, 'order_id': seq, 'status': 'Pending'})
+
+    # The generator stops at the first read after the overflow instead of streaming a gapped log
+    remaining = list(response.response)
+    response.close()
+    assert remaining == []
+    assert ('orders', 'all') not in A.event_subscribers
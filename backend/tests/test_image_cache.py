@@ -0,0 +1,95 @@
+"""Image search label cache: only real dish labels, bounded by age and size, never for flat images."""
+import io
+import random
+
+import PIL.Image
+import pytest
+
+
+@pytest.fixture
+def image_cache(app_module):
+    A = app_module
+    with A.app.app_context():
+        A.Image_Search_Cache.query.delete()
+        A.db.session.commit()
+        A.load_image_hash_tree(reload=True)
+        yield A
+        A.Image_Search_Cache.query.delete()
+        A.db.session.commit()
+        A.load_image_hash_tree(reload=True)
+
+
+def textured_image(seed=1):
+    """Smooth blotches of colour: coarse random pixels scaled up, like a photo's large shapes."""
+    rng = random.Random(seed)
+    coarse = PIL.Image.new('RGB', (8, 8))
+    coarse.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(64)])
+    return coarse.resize((256, 256), PIL.Image.BICUBIC)
+
+
+def upload(img):
+    out = io.BytesIO()
+    img.save(out, 'PNG')
+    out.seek(0)
+    return {'image': (out, 'dish.png')}
+
+
+def test_flat_images_are_not_distinctive(image_cache):
+    A = image_cache
+    flat = PIL.Image.new('RGB', (256, 256), (200, 120, 40))
+    # Barely-visible noise gives a hash of random bits, which is just as meaningless
+    noisy = flat.copy()
+    noisy.putdata([(200 + (i % 3), 120, 40) for i in range(256 * 256)])
+    for img in (flat, noisy):
+        assert not A.image_hash_is_distinctive(img, A.image_dhash(img))
+    img = textured_image()
+    assert A.image_hash_is_distinctive(img, A.image_dhash(img))
+
+
+@pytest.mark.parametrize('label', ['ERROR: NOT_FOOD', 'ERROR: MULTIPLE', ''])
+def test_error_answers_are_not_cached(image_cache, client, monkeypatch, label):
+    A = image_cache
+    monkeypatch.setattr(A, 'identify_dish_image', lambda img: (label, None))
+    client.post('/api/menu/search-by-image', data=upload(textured_image()), content_type='multipart/form-data')
+    assert A.Image_Search_Cache.query.count() == 0
+
+
+def test_dish_label_is_cached_and_reused(image_cache, client, monkeypatch):
+    A = image_cache
+    calls = []
+    monkeypatch.setattr(A, 'identify_dish_image', lambda img: (calls.append(img) or 'Burger', None))
+    for _ in range(2):
+        client.post('/api/menu/search-by-image', data=upload(textured_image()), content_type='multipart/form-data')
+    assert len(calls) == 1
+    assert A.Image_Search_Cache.query.count() == 1
+
+
+def test_flat_upload_always_asks_the_model(image_cache, client, monkeypatch):
+    A = image_cache
+    calls = []
+    monkeypatch.setattr(A, 'identify_dish_image', lambda img: (calls.append(img) or 'Soup', None))
+    for _ in range(2):
+        client.post('/api/menu/search-by-image', data=upload(PIL.Image.new('RGB', (64, 64), 'white')),
+                    content_type='multipart/form-data')
+    assert len(calls) == 2
+    assert A.Image_Search_Cache.query.count() == 0
+
+
+def test_expired_labels_are_dropped(image_cache, monkeypatch):
+    A = image_cache
+    monkeypatch.setattr(A, 'IMAGE_CACHE_TTL', 0)
+    A.remember_image_label(0x0F0F0F0F0F0F0F0F, 'Ramen')
+    assert A.lookup_image_label(0x0F0F0F0F0F0F0F0F) is None
+    assert A.Image_Search_Cache.query.count() == 0
+
+
+def test_row_cap_keeps_the_newest(image_cache, monkeypatch):
+    A = image_cache
+    monkeypatch.setattr(A, 'IMAGE_CACHE_MAX_ROWS', 3)
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(5)]
+    for i, image_hash in enumerate(hashes):
+        A.remember_image_label(image_hash, f'dish{i}')
+    assert A.Image_Search_Cache.query.count() == 3
+    assert A.lookup_image_label(hashes[0]) is None
+    assert A.lookup_image_label(hashes[-1]) == (0, 'dish4')
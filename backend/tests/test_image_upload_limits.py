@@ -0,0 +1,38 @@
+"""Oversized image uploads are refused with 413, however the size shows up."""
+import io
+
+import PIL.Image
+
+
+def multipart_body(payload, boundary='bytebite'):
+    return (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="dish.png"\r\n'
+            f'Content-Type: image/png\r\n\r\n').encode() + payload + f'\r\n--{boundary}--\r\n'.encode()
+
+
+def test_chunked_upload_past_the_limit_is_refused(app_module, client):
+    body = multipart_body(b'\0' * (app_module.app.config['MAX_CONTENT_LENGTH'] + 1))
+    # No Content-Length: the server terminates the stream (as for chunked encoding)
+    response = client.post('/api/menu/search-by-image', input_stream=io.BytesIO(body),
+                           content_type='multipart/form-data; boundary=bytebite',
+                           environ_overrides={'wsgi.input_terminated': True})
+    assert response.status_code == 413
+    assert response.get_json()['success'] is False
+
+
+def test_declared_length_past_the_limit_is_refused(app_module, client):
+    body = multipart_body(b'\0' * (app_module.app.config['MAX_CONTENT_LENGTH'] + 1))
+    response = client.post('/api/menu/search-by-image', data=body,
+                           content_type='multipart/form-data; boundary=bytebite')
+    assert response.status_code == 413
+
+
+def test_decompression_bomb_header_is_refused(client, monkeypatch):
+    out = io.BytesIO()
+    PIL.Image.new('RGB', (64, 64), 'white').save(out, 'PNG')
+    out.seek(0)
+    # Past twice MAX_IMAGE_PIXELS PIL.Image.open raises DecompressionBombError
+    monkeypatch.setattr(PIL.Image, 'MAX_IMAGE_PIXELS', 1000)
+    response = client.post('/api/menu/search-by-image', data={'image': (out, 'dish.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert response.get_json()['message'] == "Image resolution is too large"
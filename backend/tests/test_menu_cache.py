@@ -0,0 +1,94 @@
+"""
+Menu ETags change when the menu does: dish, chef and review changes at once,
+new orders at most once per MENU_ORDER_REFRESH_SECONDS. A single dish's
+ETag changes only when that dish is edited.
+"""
+from decimal import Decimal
+
+import pytest
+
+
+def place_order(app_module, client, auth_header):
+    A = app_module
+    with A.app.app_context():
+        customer = A.Customers.query.filter_by(email='test@example.com').first()
+        customer.deposited_cash = Decimal('1000.00')
+        customer.is_blacklisted = False
+        A.db.session.commit()
+        dish = A.Dishes.query.filter_by(is_vip=False).order_by(A.Dishes.dish_id).first()
+        body = {"items": [{"id": dish.dish_id, "quantity": 1}], "totalPrice": float(dish.price),
+                "deliveryInfo": {"phone": "555-0000"}}
+    response = client.post('/api/orders', json=body, headers=auth_header('test@example.com', 'Customer'))
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return dish.dish_id
+
+
+def menu_entry(response, dish_id):
+    return next(item for item in response.get_json() if item['id'] == str(dish_id))
+
+
+def interval_passes(app_module):
+    app_module.menu_orders_refreshed_at -= app_module.MENU_ORDER_REFRESH_SECONDS
+
+
+def test_orders_refresh_the_menu_at_most_once_per_interval(app_module, client, auth_header):
+    A = app_module
+    A.invalidate_menu_cache()
+
+    first = client.get('/api/menu')
+    dish_id = place_order(A, client, auth_header)
+    place_order(A, client, auth_header)
+
+    # Within the interval the cached menu and its ETag stay valid
+    assert client.get('/api/menu', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    interval_passes(A)
+    refreshed = client.get('/api/menu', headers={'If-None-Match': first.headers['ETag']})
+    assert refreshed.status_code == 200
+    assert refreshed.headers['ETag'] != first.headers['ETag']
+    assert menu_entry(refreshed, dish_id)['chef_order_count'] == menu_entry(first, dish_id)['chef_order_count'] + 2
+
+    # Nothing new since: the refreshed ETag holds past the next interval too
+    interval_passes(A)
+    assert client.get('/api/menu', headers={'If-None-Match': refreshed.headers['ETag']}).status_code == 304
+
+
+def test_dish_edit_refreshes_the_menu_immediately(app_module, client, auth_header):
+    A = app_module
+    with A.app.app_context():
+        dish = A.Dishes.query.filter_by(is_vip=False).order_by(A.Dishes.dish_id).first()
+        dish_id, description = dish.dish_id, dish.description
+    first = client.get('/api/menu')
+
+    response = client.put(f'/api/chef/dishes/{dish_id}', json={'description': description + ' (new)'},
+                          headers=auth_header('chef1@bytebite.com', 'Chef'))
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    edited = client.get('/api/menu', headers={'If-None-Match': first.headers['ETag']})
+    assert edited.status_code == 200
+    assert menu_entry(edited, dish_id)['description'] == description + ' (new)'
+    client.put(f'/api/chef/dishes/{dish_id}', json={'description': description},
+               headers=auth_header('chef1@bytebite.com', 'Chef'))
+
+
+def test_single_dish_etag_ignores_orders_and_other_dishes(app_module, client, auth_header):
+    A = app_module
+    with A.app.app_context():
+        dishes = A.Dishes.query.filter_by(is_vip=False).order_by(A.Dishes.dish_id).limit(2).all()
+        (dish_id, description), (other_id, _) = [(d.dish_id, d.description) for d in dishes]
+    first = client.get(f'/api/menu/{dish_id}')
+    other = client.get(f'/api/menu/{other_id}')
+
+    place_order(A, client, auth_header)
+    A.invalidate_menu_cache()  # As a review or chef change would
+    assert client.get(f'/api/menu/{dish_id}', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    response = client.put(f'/api/chef/dishes/{dish_id}', json={'description': description + ' (new)'},
+                          headers=auth_header('chef1@bytebite.com', 'Chef'))
+    assert response.status_code == 200, response.get_data(as_text=True)
+    edited = client.get(f'/api/menu/{dish_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert edited.status_code == 200
+    assert edited.get_json()['description'] == description + ' (new)'
+    assert client.get(f'/api/menu/{other_id}', headers={'If-None-Match': other.headers['ETag']}).status_code == 304
+    client.put(f'/api/chef/dishes/{dish_id}', json={'description': description},
+               headers=auth_header('chef1@bytebite.com', 'Chef'))
@@ -0,0 +1,25 @@
+"""Bulk mark-as-read rejects malformed bodies with 400."""
+import pytest
+
+
+@pytest.mark.parametrize('body', [[1, 2], ["ids"], "ids", 5, {"ids": 5}, {"ids": "1,2"}, {"ids": ["x"]}, {}])
+def test_mark_read_rejects_bad_body(client, auth_header, body):
+    response = client.put('/api/user/notifications/read', json=body,
+                          headers=auth_header('test@example.com', 'Customer'))
+    assert response.status_code == 400, response.get_data(as_text=True)
+
+
+def test_mark_read_by_ids(app_module, client, auth_header):
+    A = app_module
+    with A.app.app_context():
+        customer = A.Customers.query.filter_by(email='test@example.com').first()
+        notification = A.User_Notifications(user_id=customer.customer_id, title='t', message='m', type='system')
+        A.db.session.add(notification)
+        A.db.session.commit()
+        notification_id = notification.notification_id
+
+    response = client.put('/api/user/notifications/read', json={"ids": [notification_id]},
+                          headers=auth_header('test@example.com', 'Customer'))
+    assert response.status_code == 200
+    with A.app.app_context():
+        assert A.db.session.get(A.User_Notifications, notification_id).is_read
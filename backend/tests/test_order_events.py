@@ -0,0 +1,72 @@
+"""Order events carry customer/staff ids only to the order's own parties; the delivery pool sees id and status."""
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.fixture
+def subscribed(app_module):
+    """Subscribe a pool watcher and the order's customer, and clean up afterwards."""
+    A = app_module
+    subscriptions = []
+
+    def subscribe(topics):
+        subscriber = A.subscribe_events(topics)
+        subscriptions.append((topics, subscriber))
+        return subscriber
+
+    yield subscribe
+    for topics, subscriber in subscriptions:
+        A.unsubscribe_events(topics, subscriber)
+
+
+def drain(subscriber):
+    events = []
+    while not subscriber.empty():
+        events.append(subscriber.get_nowait())
+    return events
+
+
+def test_delivery_pool_gets_stripped_payload(app_module, subscribed):
+    A = app_module
+    with A.app.app_context():
+        customer = A.Customers.query.filter_by(email='vip@example.com').first()
+        chef = A.Employees.query.filter_by(email='chef2@bytebite.com').first()
+        driver = A.Employees.query.filter_by(email='delivery2@bytebite.com').first()
+
+        pool = subscribed([A.DELIVERY_POOL_TOPIC])
+        assigned = subscribed([A.DELIVERY_POOL_TOPIC, ('orders', 'driver', driver.employee_id)])
+        owner = subscribed([('orders', 'customer', customer.customer_id)])
+
+        order = A.Orders(customer_id=customer.customer_id, chef_id=chef.employee_id,
+                         status='Ready for Delivery', total_price=Decimal('12.00'))
+        A.db.session.add(order)
+        A.db.session.commit()
+        assert order.status == 'Ready for Delivery'  # Reload, as a route would, so the status history is known
+        order.delivery_person_id = driver.employee_id
+        order.status = 'Out for Delivery'
+        A.db.session.commit()
+        order_id, customer_id = order.order_id, customer.customer_id
+
+    pool_events = drain(pool)
+    assert [e['status'] for e in pool_events] == ['Ready for Delivery', 'Out for Delivery']
+    for event in pool_events:
+        assert set(event) == set(A.DELIVERY_POOL_FIELDS)
+        assert event['order_id'] == order_id
+
+    # The assigned driver gets the pool version while the order is open, then the
+    # full event once it is theirs, and each event only once
+    assigned_events = drain(assigned)
+    assert [e['seq'] for e in assigned_events] == [e['seq'] for e in pool_events]
+    assert 'customer_id' not in assigned_events[0]
+    assert assigned_events[1]['customer_id'] == customer_id
+
+    owner_events = drain(owner)
+    assert [e['seq'] for e in owner_events] == [e['seq'] for e in pool_events]
+    assert all(e['customer_id'] == customer_id for e in owner_events)
+
+    # Replay from the log applies the same stripping
+    with A.order_event_lock:
+        entries = [(data, topics) for seq, topics, data in A.order_event_log if data['order_id'] == order_id]
+    replayed = [A.order_event_for(data, topics, [A.DELIVERY_POOL_TOPIC]) for data, topics in entries]
+    assert replayed == pool_events
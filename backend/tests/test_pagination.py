@@ -0,0 +1,66 @@
+"""List endpoints page by default and the nextCursor chain covers every row exactly once."""
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def test_notifications_are_paged_without_params(app_module, client, auth_header):
+    A = app_module
+    with A.app.app_context():
+        customer = A.Customers.query.filter_by(email='vip@example.com').first()
+        start = datetime.now(timezone.utc)
+        existing = A.User_Notifications.query.filter_by(user_id=customer.customer_id).count()
+        for i in range(A.DEFAULT_PAGE_SIZE + 7):
+            # Rows share timestamps in threes so the id tie-break is exercised
+            A.db.session.add(A.User_Notifications(user_id=customer.customer_id, title=f'n{i}', message='m',
+                                                  type='system', created_at=start + timedelta(seconds=i // 3)))
+        A.db.session.commit()
+        total = existing + A.DEFAULT_PAGE_SIZE + 7
+
+    headers = auth_header('vip@example.com', 'Customer')
+    first = client.get('/api/user/notifications', headers=headers).get_json()
+    assert len(first['notifications']) == A.DEFAULT_PAGE_SIZE
+    assert first['nextCursor']
+
+    seen = [n['notification_id'] for n in first['notifications']]
+    cursor = first['nextCursor']
+    while cursor:
+        page = client.get('/api/user/notifications', query_string={'cursor': cursor}, headers=headers).get_json()
+        seen.extend(n['notification_id'] for n in page['notifications'])
+        cursor = page['nextCursor']
+    assert len(seen) == len(set(seen)) == total
+
+
+def test_bad_cursor_is_rejected(client, auth_header):
+    response = client.get('/api/user/notifications', query_string={'cursor': 'not-a-cursor'},
+                          headers=auth_header('vip@example.com', 'Customer'))
+    assert response.status_code == 400
+
+
+def test_financial_totals_cover_every_page(app_module, client, auth_header):
+    A = app_module
+    with A.app.app_context():
+        customer = A.Customers.query.filter_by(email='vip@example.com').first()
+        for _ in range(A.DEFAULT_PAGE_SIZE + 5):
+            A.db.session.add(A.Financial_Log(customer_id=customer.customer_id, type='Deposit', amount=2,
+                                             created_at=datetime.now(timezone.utc)))
+        A.db.session.commit()
+        expected = {log_type: float(total) for log_type, total in A.db.session.query(
+            A.Financial_Log.type, A.db.func.sum(A.Financial_Log.amount)).group_by(A.Financial_Log.type)}
+        manager = A.Employees.query.filter_by(role='Manager').first().email
+
+    body = client.get('/api/manager/financials', headers=auth_header(manager, 'Manager')).get_json()
+    assert len(body['logs']) == A.DEFAULT_PAGE_SIZE
+    assert body['nextCursor']
+    assert body['totals'] == expected
+
+
+@pytest.mark.parametrize('payload', [[[], 1], [{"a": 1}, 1], [1.5, 1], [None, "1"], [None, True], [None, None], [None]],
+                         ids=repr)
+def test_malformed_cursor_payload_is_rejected(client, auth_header, payload):
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+    response = client.get('/api/user/notifications', query_string={'cursor': cursor},
+                          headers=auth_header('vip@example.com', 'Customer'))
+    assert response.status_code == 400
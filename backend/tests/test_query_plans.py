@@ -0,0 +1,144 @@
+"""
+EXPLAIN QUERY PLAN regression checks for the secondary indexes.
+
+Two layers:
+- every index declared on a model must be usable: an equality lookup on its
+  columns has to SEARCH the table instead of scanning it;
+- the hot per-user routes are called for real, every SELECT they run is
+  captured and explained, and none may full-scan one of the big tables.
+A route rewrite that loses an index fails here rather than in production.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+# Tables that grow with traffic; a plain SCAN of any of these in a hot route is a regression
+HOT_TABLES = {
+    'Orders', 'Order_Items', 'Reviews', 'Delivery_Bids', 'Bid', 'User_Notifications',
+    'Forum_Comments', 'Forum_Likes', 'Forum_Comment_Likes', 'Forum_Post_Compliments',
+    'Forum_Comment_Compliments', 'Financial_Log', 'Complaints',
+}
+
+
+def explain(connection, statement, parameters=()):
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """Plan lines that read a whole hot table without any index."""
+    scans = []
+    for line in plan:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] == 'SCAN' and parts[1] in HOT_TABLES and 'INDEX' not in line:
+            scans.append(line)
+    return scans
+
+
+def declared_indexes(app_module):
+    indexes = []
+    for table in app_module.db.metadata.sorted_tables:
+        for index in table.indexes:
+            indexes.append(pytest.param((table, index), id=index.name))
+    return indexes
+
+
+def pytest_generate_tests(metafunc):
+    if 'declared_index' in metafunc.fixturenames:
+        import app as app_module
+        metafunc.parametrize('declared_index', declared_indexes(app_module))
+
+
+def test_declared_index_is_used_for_equality_lookup(app_module, declared_index):
+    table, index = declared_index
+    columns = list(index.columns)
+    where = " AND ".join(f'"{column.name}" = ?' for column in columns)
+    statement = f'SELECT * FROM "{table.name}" WHERE {where}'
+
+    with app_module.app.app_context():
+        with app_module.db.engine.connect() as connection:
+            plan = explain(connection, statement, tuple(1 for _ in columns))
+
+    searches = [line for line in plan if line.startswith(f'SEARCH {table.name} ')]
+    assert searches, f"{index.name}: expected SEARCH {table.name}, got {plan}"
+    assert 'INDEX' in searches[0], f"{index.name}: lookup does not use an index: {plan}"
+
+
+def test_delivery_pool_uses_composite_index(app_module):
+    with app_module.app.app_context():
+        query = app_module.Orders.query.filter_by(status='Ready for Delivery', delivery_person_id=None)
+        compiled = query.statement.compile(app_module.db.engine, compile_kwargs={'literal_binds': True})
+        with app_module.db.engine.connect() as connection:
+            plan = explain(connection, str(compiled))
+    assert any('ix_Orders_status_delivery_person_id' in line for line in plan), plan
+
+
+@pytest.fixture(scope='module')
+def hot_route_data(app_module):
+    """An order (with items, review, bidding, notification) and a forum thread for the test customer."""
+    A = app_module
+    with A.app.app_context():
+        customer = A.Customers.query.filter_by(email='test@example.com').first()
+        chef = A.Employees.query.filter_by(email='chef1@bytebite.com').first()
+        driver = A.Employees.query.filter_by(email='delivery1@bytebite.com').first()
+        dish = A.Dishes.query.filter_by(chef_id=chef.employee_id).first()
+
+        order = A.Orders(customer_id=customer.customer_id, chef_id=chef.employee_id,
+                         status='Ready for Delivery', total_price=Decimal('20.00'))
+        A.db.session.add(order)
+        A.db.session.flush()
+        A.db.session.add(A.Order_Items(order_id=order.order_id, dish_id=dish.dish_id, quantity=1))
+        bidding = A.Delivery_Bids(order_id=order.order_id, status='active', start_time=datetime.now(timezone.utc))
+        A.db.session.add(bidding)
+        A.db.session.flush()
+        A.db.session.add(A.Bid(bidding_id=bidding.bidding_id, employee_id=driver.employee_id, bid_amount=Decimal('4.00')))
+        A.db.session.add(A.Reviews(order_id=order.order_id, customer_id=customer.customer_id, chef_id=chef.employee_id,
+                                   chef_rating=5, dish_rating=5, delivery_rating=5))
+        A.db.session.add(A.User_Notifications(user_id=customer.customer_id, title='t', message='hi', type='system'))
+        post = A.Forum_Posts(customer_id=customer.customer_id, title='t', content='c', category='general', created_at=datetime.now(timezone.utc))
+        A.db.session.add(post)
+        A.db.session.flush()
+        A.db.session.add(A.Forum_Comments(post_id=post.post_id, customer_id=customer.customer_id, content='c',
+                                          created_at=datetime.now(timezone.utc)))
+        A.db.session.commit()
+        return {'post_id': post.post_id}
+
+
+HOT_ROUTES = [
+    ('test@example.com', 'Customer', '/api/orders'),
+    ('test@example.com', 'Customer', '/api/user/notifications'),
+    ('test@example.com', 'Customer', '/api/user/notifications/unread-count'),
+    ('test@example.com', 'Customer', '/api/recommendations'),
+    ('test@example.com', 'Customer', '/api/forum/posts/{post_id}/comments'),
+    ('chef1@bytebite.com', 'Chef', '/api/chef/orders'),
+    ('chef1@bytebite.com', 'Chef', '/api/chef/reviews'),
+    ('delivery1@bytebite.com', 'Delivery', '/api/delivery/available-orders'),
+    ('delivery1@bytebite.com', 'Delivery', '/api/delivery/my-bids'),
+    ('delivery1@bytebite.com', 'Delivery', '/api/delivery/my-deliveries'),
+]
+
+
+@pytest.mark.parametrize('email, role, path', HOT_ROUTES, ids=[path for _, _, path in HOT_ROUTES])
+def test_hot_route_does_not_scan_big_tables(app_module, client, auth_header, hot_route_data, email, role, path):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    with app_module.app.app_context():
+        engine = app_module.db.engine
+        event.listen(engine, 'before_cursor_execute', capture)
+        try:
+            response = client.get(path.format(**hot_route_data), headers=auth_header(email, role))
+        finally:
+            event.remove(engine, 'before_cursor_execute', capture)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert statements, "route ran no queries"
+
+        with engine.connect() as connection:
+            for statement, parameters in statements:
+                scans = full_scans(explain(connection, statement, parameters))
+                assert not scans, f"{path} scans {scans} in:\n{statement}"
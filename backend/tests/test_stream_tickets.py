@@ -0,0 +1,68 @@
+"""SSE endpoints authenticate with short-lived stream tickets, never a login token in the URL."""
+import pytest
+
+
+@pytest.fixture
+def ticket(client, auth_header):
+    response = client.post('/api/stream-ticket', headers=auth_header('test@example.com', 'Customer'))
+    assert response.status_code == 200
+    return response.get_json()['ticket']
+
+
+def open_stream(client, path, **query):
+    response = client.get(path, query_string=query)
+    first_chunk = next(response.response) if response.status_code == 200 else None
+    response.close()
+    return response, first_chunk
+
+
+@pytest.mark.parametrize('path', ['/api/user/notifications/stream', '/api/orders/stream'])
+def test_stream_opens_with_ticket(client, ticket, path):
+    response, first_chunk = open_stream(client, path, ticket=ticket)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert b'retry:' in first_chunk
+
+
+@pytest.mark.parametrize('path', ['/api/user/notifications/stream', '/api/orders/stream'])
+def test_stream_rejects_login_token_in_query(client, make_token, path):
+    response, _ = open_stream(client, path, ticket=make_token('test@example.com', 'Customer'))
+    assert response.status_code == 401
+    response, _ = open_stream(client, path, token=make_token('test@example.com', 'Customer'))
+    assert response.status_code == 401
+
+
+def test_ticket_is_not_an_api_token(client, ticket):
+    response = client.get('/api/orders', headers={'Authorization': f'Bearer {ticket}'})
+    assert response.status_code == 401
+
+
+def test_ticket_requires_authentication(client):
+    assert client.post('/api/stream-ticket').status_code == 401
+    assert client.post('/api/stream-ticket', headers={'Authorization': 'Bearer nope'}).status_code == 401
+
+
+@pytest.mark.parametrize('path', ['/api/user/notifications/stream', '/api/orders/stream'])
+def test_open_streams_are_capped(app_module, client, auth_header, monkeypatch, path):
+    monkeypatch.setattr(app_module, 'SSE_MAX_STREAMS', 2)
+    headers = auth_header('test@example.com', 'Customer')
+    baseline = app_module.open_streams
+    subscribed = sum(len(subs) for subs in app_module.event_subscribers.values())
+
+    first = client.get(path, headers=headers)
+    second = client.get(path, headers=headers)
+    next(first.response)  # One stream running, one never read from
+    assert (first.status_code, second.status_code) == (200, 200)
+
+    rejected = client.get(path, headers=headers)
+    assert rejected.status_code == 503
+    assert rejected.headers['Retry-After']
+
+    # Closing a stream frees its slot, whether or not its generator ever ran
+    second.close()
+    third = client.get(path, headers=headers)
+    assert third.status_code == 200
+    first.close()
+    third.close()
+    assert app_module.open_streams == baseline
+    assert sum(len(subs) for subs in app_module.event_subscribers.values()) == subscribed
@@ -10,6 +10,8 @@ import { Alert, AlertDescription } from './ui/alert';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from './ui/tabs';
 import { useNavigate } from 'react-router-dom';
 import { api } from '../utils/api';
+import { usePagedList } from '../utils/usePagedList';
+import { LoadMoreButton } from './LoadMoreButton';
 // wei: add 'Utensils, Clock, CheckCircle'
 import { ChefHat, Plus, Edit, Trash2, Star, Utensils, Clock, CheckCircle } from 'lucide-react';
 
@@ -213,7 +215,8 @@ export function ChefDashboard() {
   
   const [activeOrders, setActiveOrders] = useState<ChefOrder[]>([]); // wei
   const [reviews, setReviews] = useState<any[]>([]); // wei
-  const [complaints, setComplaints] = useState<Complaint[]>([]);
+  const { items: complaints, hasMore: hasMoreComplaints, loadingMore: loadingMoreComplaints,
+          showPage: showComplaintsPage, loadMore: loadMoreComplaints } = usePagedList<Complaint>(api.getComplaints, 'complaints');
 
   // New dish form
   const [newDish, setNewDish] = useState({
@@ -238,6 +241,11 @@ export function ChefDashboard() {
     loadData();
   }, []);
 
+  // Refresh the order queue when one of this chef's orders changes status
+  useEffect(() => {
+    return api.subscribeOrderEvents(() => loadOrders(), { employee: true, onResync: () => loadOrders() });
+  }, []);
+
   const loadData = async () => {
     setLoading(true);
     await Promise.all([loadDishes(), loadOrders(), loadComplaints()]);
@@ -273,7 +281,7 @@ export function ChefDashboard() {
     try {
       const res = await api.getComplaints();
       if (res.success) {
-        setComplaints(res.complaints);
+        showComplaintsPage(res);
       }
     } catch (err) {
       console.error("Failed to load complaints", err);
@@ -715,6 +723,7 @@ export function ChefDashboard() {
                       onAppealSubmitted={loadComplaints}
                     />
                   ))}
+                  <LoadMoreButton hasMore={hasMoreComplaints} loading={loadingMoreComplaints} onClick={loadMoreComplaints} />
                 </div>
               </div>
             </Card>
@@ -10,6 +10,8 @@ import { Alert, AlertDescription } from './ui/alert';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from './ui/tabs';
 import { useNavigate } from 'react-router-dom';
 import { api } from '../utils/api';
+import { usePagedList } from '../utils/usePagedList';
+import { LoadMoreButton } from './LoadMoreButton';
 import { Truck, MapPin, Clock, DollarSign, CheckCircle, Package, MessageSquare, Star } from 'lucide-react';
 
 // 1. Updated Interface to include customer_phone and feedback fields
@@ -203,7 +205,8 @@ export function DeliveryDashboard() {
   const [availableOrders, setAvailableOrders] = useState<Order[]>([]);
   const [myDeliveries, setMyDeliveries] = useState<Order[]>([]);
   const [myBids, setMyBids] = useState<DeliveryBid[]>([]);
-  const [complaints, setComplaints] = useState<Complaint[]>([]);
+  const { items: complaints, hasMore: hasMoreComplaints, loadingMore: loadingMoreComplaints,
+          showPage: showComplaintsPage, loadMore: loadMoreComplaints } = usePagedList<Complaint>(api.getComplaints, 'complaints');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
@@ -224,6 +227,26 @@ export function DeliveryDashboard() {
     loadData();
   }, []);
 
+  // Refresh the bidding pool and deliveries when an order enters/leaves the pool or is assigned
+  useEffect(() => {
+    return api.subscribeOrderEvents(() => refreshOrders(), { employee: true, onResync: () => refreshOrders() });
+  }, []);
+
+  const refreshOrders = async () => {
+    try {
+      const [availableResponse, bidsResponse, deliveriesResponse] = await Promise.all([
+        api.getAvailableOrders(),
+        api.getDeliveryBids(),
+        api.getDeliveryDeliveries()
+      ]);
+      if (availableResponse.success) setAvailableOrders(availableResponse.orders || []);
+      if (bidsResponse.success) setMyBids(bidsResponse.bids || []);
+      if (deliveriesResponse.success) setMyDeliveries(deliveriesResponse.deliveries || []);
+    } catch (err) {
+      console.error(err);
+    }
+  };
+
   const loadData = async () => {
     try {
       setLoading(true);
@@ -248,7 +271,7 @@ export function DeliveryDashboard() {
         setFeedbackCategories(categoriesResponse.categories || {complaint: [], compliment: []});
       }
       if (complaintsResponse.success) {
-        setComplaints(complaintsResponse.complaints || []);
+        showComplaintsPage(complaintsResponse);
       }
     } catch (err) {
       console.error(err);
@@ -583,6 +606,7 @@ export function DeliveryDashboard() {
                       onAppealSubmitted={loadData}
                     />
                   ))}
+                  <LoadMoreButton hasMore={hasMoreComplaints} loading={loadingMoreComplaints} onClick={loadMoreComplaints} />
                 </div>
               </div>
             </Card>
@@ -8,6 +8,8 @@ import { Separator } from './ui/separator';
 import { MessageSquare, ThumbsUp, Send, Plus, User, Calendar, Flag, X, Heart } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 import { api } from '../utils/api';
+import { usePagedList } from '../utils/usePagedList';
+import { LoadMoreButton } from './LoadMoreButton';
 
 // Interface for forum post
 interface ForumPost {
@@ -40,9 +42,12 @@ interface Comment {
 
 export function ForumPage() {
   const navigate = useNavigate();
-  const [posts, setPosts] = useState<ForumPost[]>([]);
-  const [comments, setComments] = useState<Comment[]>([]);
   const [selectedPost, setSelectedPost] = useState<ForumPost | null>(null);
+  const { items: posts, setItems: setPosts, hasMore: hasMorePosts, loadingMore: loadingMorePosts,
+          showPage: showPostsPage, loadMore: loadMorePosts } = usePagedList<ForumPost>(api.getForumPosts, 'posts');
+  const { items: comments, setItems: setComments, hasMore: hasMoreComments, loadingMore: loadingMoreComments,
+          showPage: showCommentsPage, loadMore: loadMoreComments } = usePagedList<Comment>(
+    (page) => api.getPostComments(selectedPost!.id, page), 'comments');
   const [showNewPostForm, setShowNewPostForm] = useState(false);
   const [newComment, setNewComment] = useState('');
   const [loading, setLoading] = useState(true);
@@ -65,7 +70,7 @@ export function ForumPage() {
       try {
           const res = await api.getForumPosts();
           if (res.success) {
-              setPosts(res.posts);
+              showPostsPage(res);
           }
       } catch (err) {
           console.error("Failed to load posts", err);
@@ -219,7 +224,7 @@ export function ForumPage() {
     try {
         const res = await api.getPostComments(post.id);
         if (res.success) {
-            setComments(res.comments);
+            showCommentsPage(res);
         }
     } catch (err) {
         console.error("Failed to load comments", err);
@@ -236,7 +241,7 @@ export function ForumPage() {
             setNewComment('');
             // Reload comments
             const commentsRes = await api.getPostComments(selectedPost.id);
-            if (commentsRes.success) setComments(commentsRes.comments);
+            if (commentsRes.success) showCommentsPage(commentsRes);
             
             // Update comment count in post list locally
             setPosts(posts.map(p => 
@@ -410,6 +415,7 @@ export function ForumPage() {
                 </Card>
               ))
             )}
+            <LoadMoreButton hasMore={hasMorePosts} loading={loadingMorePosts} onClick={loadMorePosts} />
           </div>
 
           {/* Comment Section (Right Side) */}
@@ -455,6 +461,7 @@ export function ForumPage() {
                       <p className="text-white/80 text-sm">{comment.content}</p>
                     </div>
                   ))}
+                  <LoadMoreButton hasMore={hasMoreComments} loading={loadingMoreComments} onClick={loadMoreComments} />
                 </div>
 
                 <form onSubmit={handleAddComment} className="flex gap-2 mt-auto pt-2">
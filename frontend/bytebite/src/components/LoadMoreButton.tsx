@@ -0,0 +1,25 @@
+import { Button } from './ui/button';
+
+interface LoadMoreButtonProps {
+  hasMore: boolean;
+  loading: boolean;
+  onClick: () => void;
+}
+
+// Footer for lists paged with usePagedList; renders nothing once the last page is in
+export function LoadMoreButton({ hasMore, loading, onClick }: LoadMoreButtonProps) {
+  if (!hasMore) return null;
+  return (
+    <div className="flex justify-center pt-4">
+      <Button
+        onClick={onClick}
+        disabled={loading}
+        variant="outline"
+        size="sm"
+        className="border-[#00ff88]/30 text-white hover:bg-[#00ff88]/10"
+      >
+        {loading ? 'Loading...' : 'Load more'}
+      </Button>
+    </div>
+  );
+}
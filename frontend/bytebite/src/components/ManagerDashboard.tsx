@@ -11,6 +11,8 @@ import { Alert, AlertDescription } from './ui/alert';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from './ui/tabs';
 import { useNavigate } from 'react-router-dom';
 import { api } from '../utils/api';
+import { usePagedList } from '../utils/usePagedList';
+import { LoadMoreButton } from './LoadMoreButton';
 import { 
   Users, ChefHat, Truck, Crown, Edit, Trash2, Plus, X, Search, 
   DollarSign, Clock, Gavel, FileText, ArrowUpRight, ArrowDownLeft,
@@ -127,12 +129,18 @@ interface Complaint {
 
 export function ManagerDashboard() {
   const [employees, setEmployees] = useState<Employee[]>([]);
-  const [customers, setCustomers] = useState<Customer[]>([]);
+  const { items: customers, hasMore: hasMoreCustomers, loadingMore: loadingMoreCustomers,
+          showPage: showCustomersPage, loadMore: loadMoreCustomers } = usePagedList<Customer>(api.getAllCustomers, 'customers');
   const [customerSearch, setCustomerSearch] = useState('');
   const [biddings, setBiddings] = useState<BiddingSession[]>([]);
-  const [financialLogs, setFinancialLogs] = useState<FinancialLog[]>([]);
-  const [forumReports, setForumReports] = useState<ForumReport[]>([]);
-  const [complaints, setComplaints] = useState<Complaint[]>([]);
+  const { items: financialLogs, hasMore: hasMoreLogs, loadingMore: loadingMoreLogs,
+          showPage: showLogsPage, loadMore: loadMoreLogs } = usePagedList<FinancialLog>(api.getFinancialLogs, 'logs');
+  // Server-side sums over every log; the table itself is paged
+  const [financialTotals, setFinancialTotals] = useState<Record<string, number>>({});
+  const { items: forumReports, hasMore: hasMoreReports, loadingMore: loadingMoreReports,
+          showPage: showReportsPage, loadMore: loadMoreReports } = usePagedList<ForumReport>(api.getForumReports, 'reports');
+  const { items: complaints, hasMore: hasMoreComplaints, loadingMore: loadingMoreComplaints,
+          showPage: showComplaintsPage, loadMore: loadMoreComplaints } = usePagedList<Complaint>(api.getComplaints, 'complaints');
   const [deliveryStaff, setDeliveryStaff] = useState<Employee[]>([]);
   const [registrationRequests, setRegistrationRequests] = useState<RegistrationRequest[]>([]);
   
@@ -204,20 +212,23 @@ export function ManagerDashboard() {
       } else if (employeesRes.status === 'rejected') {
           console.error('Failed to load employees:', employeesRes.reason);
       }
-      if (customersRes.status === 'fulfilled' && customersRes.value.success) setCustomers(customersRes.value.customers);
+      if (customersRes.status === 'fulfilled' && customersRes.value.success) showCustomersPage(customersRes.value);
       else if (customersRes.status === 'rejected') console.error('Failed to load customers:', customersRes.reason);
       if (biddingsRes.status === 'fulfilled' && biddingsRes.value.success) setBiddings(biddingsRes.value.biddings);
       else if (biddingsRes.status === 'rejected') console.error('Failed to load biddings:', biddingsRes.reason);
-      if (financialsRes.status === 'fulfilled' && financialsRes.value.success) setFinancialLogs(financialsRes.value.logs);
+      if (financialsRes.status === 'fulfilled' && financialsRes.value.success) {
+          showLogsPage(financialsRes.value);
+          setFinancialTotals(financialsRes.value.totals || {});
+      }
       else if (financialsRes.status === 'rejected') console.error('Failed to load financial logs:', financialsRes.reason);
       if (reportsRes.status === 'fulfilled' && reportsRes.value.success) {
-          setForumReports(reportsRes.value.reports);
+          showReportsPage(reportsRes.value);
           console.log('Loaded forum reports:', reportsRes.value.reports);
       } else if (reportsRes.status === 'rejected') {
           console.error('Failed to load forum reports:', reportsRes.reason);
       }
       if (complaintsRes.status === 'fulfilled' && complaintsRes.value.success) {
-          setComplaints(complaintsRes.value.complaints);
+          showComplaintsPage(complaintsRes.value);
           console.log('Loaded complaints:', complaintsRes.value.complaints);
       } else if (complaintsRes.status === 'rejected') {
           console.error('Failed to load complaints:', complaintsRes.reason);
@@ -594,13 +605,13 @@ export function ManagerDashboard() {
                     <Card className="bg-[#1a2f4a] p-4 border border-[#00ff88]/10">
                         <p className="text-white/70 text-sm">Total Revenue</p>
                         <p className="text-2xl font-bold text-[#00ff88]">
-                            ${financialLogs.filter(l => l.type === 'Order').reduce((sum, l) => sum + l.amount, 0).toFixed(2)}
+                            ${(financialTotals.Order || 0).toFixed(2)}
                         </p>
                     </Card>
                     <Card className="bg-[#1a2f4a] p-4 border border-[#00ff88]/10">
                         <p className="text-white/70 text-sm">Total Deposits</p>
                         <p className="text-2xl font-bold text-blue-400">
-                            ${financialLogs.filter(l => l.type === 'Deposit').reduce((sum, l) => sum + l.amount, 0).toFixed(2)}
+                            ${(financialTotals.Deposit || 0).toFixed(2)}
                         </p>
                     </Card>
                 </div>
@@ -649,6 +660,7 @@ export function ManagerDashboard() {
                         )}
                     </TableBody>
                     </Table>
+                    <LoadMoreButton hasMore={hasMoreLogs} loading={loadingMoreLogs} onClick={loadMoreLogs} />
                 </div>
               </div>
             </Card>
@@ -827,6 +839,7 @@ export function ManagerDashboard() {
                         </TableRow>
                     ))}</TableBody>
                 </Table>
+                <LoadMoreButton hasMore={hasMoreCustomers} loading={loadingMoreCustomers} onClick={loadMoreCustomers} />
             </Card>
           </TabsContent>
 
@@ -1009,6 +1022,7 @@ export function ManagerDashboard() {
                         </TableRow>
                     )}</TableBody>
                 </Table>
+                <LoadMoreButton hasMore={hasMoreReports} loading={loadingMoreReports} onClick={loadMoreReports} />
               </Card>
 
               {/* Complaints */}
@@ -1082,6 +1096,7 @@ export function ManagerDashboard() {
                         </TableRow>
                     )}</TableBody>
                 </Table>
+                <LoadMoreButton hasMore={hasMoreComplaints} loading={loadingMoreComplaints} onClick={loadMoreComplaints} />
               </Card>
             </div>
           </TabsContent>
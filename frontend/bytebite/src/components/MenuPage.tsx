@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Button } from './ui/button';
 import { Card } from './ui/card';
 import { Badge } from './ui/badge';
@@ -21,6 +21,10 @@ export function MenuPage() {
   const [selectedCategory, setSelectedCategory] = useState('All');
   // Search term state
   const [searchTerm, setSearchTerm] = useState('');
+  // Ranked dish ids from the server-side search, tagged with the query they answer
+  const [searchResults, setSearchResults] = useState<{ query: string; ids: string[] } | null>(null);
+  // The query currently being typed; responses for any other query are dropped
+  const latestQueryRef = useRef('');
   // State for Image Search Modal
   const [isImageSearchOpen, setIsImageSearchOpen] = useState(false);
   // User profile and login state
@@ -66,6 +70,31 @@ export function MenuPage() {
     loadProfile();
   }, []);
 
+  // Search on the server (typo-tolerant, ranked) once typing pauses
+  useEffect(() => {
+    const query = searchTerm.trim();
+    latestQueryRef.current = query;
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await api.searchMenu(query);
+        if (!cancelled && latestQueryRef.current === query && response.success) {
+          setSearchResults({ query, ids: response.dishes.map((dish: { id: string }) => dish.id) });
+        }
+      } catch (err) {
+        console.error('Menu search error:', err);
+      }
+    }, 200);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
+
   // Function to add item to cart and show temporary success feedback
   const handleAddToCart = (item: MenuItem) => {
     addToCart(item); // Add to cart
@@ -86,17 +115,24 @@ export function MenuPage() {
     return cart.some((cartItem) => cartItem.id === itemId);
   };
 
-  // Filter menu items based on selected category and search term
-  const filteredItems = menuItems.filter((item) => {
-    const matchesCategory = selectedCategory === 'All' ||
+  // Filter menu items based on selected category and search term.
+  // Search results keep the server's ranking; until the ones for the current query
+  // arrive, fall back to a plain substring match so the list reacts while typing
+  // instead of showing the previous query's results.
+  const currentResults = searchResults && searchResults.query === searchTerm.trim() ? searchResults.ids : null;
+  const searchedItems = currentResults
+    ? currentResults
+        .map((id) => menuItems.find((item) => item.id === id))
+        .filter((item): item is MenuItem => item !== undefined)
+    : menuItems.filter((item) =>
+        item.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
+        item.description.toLowerCase().includes(searchTerm.toLowerCase()));
+
+  const filteredItems = searchedItems.filter((item) => {
+    return selectedCategory === 'All' ||
       (selectedCategory === 'Street Bites' && ['1', '2'].includes(item.id)) ||
       (selectedCategory === 'Main Bowls' && ['3', '4', '5', '6'].includes(item.id)) ||
       (selectedCategory === 'Snacks' && ['7', '8'].includes(item.id));
-    
-    const matchesSearch = item.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      item.description.toLowerCase().includes(searchTerm.toLowerCase());
-    
-    return matchesCategory && matchesSearch;
   });
 
   if (loading) {
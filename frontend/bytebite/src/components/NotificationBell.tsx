@@ -5,6 +5,8 @@ import { Card, CardContent, CardHeader, CardTitle } from './ui/card';
 import { Badge } from './ui/badge';
 import { Textarea } from './ui/textarea';
 import { api } from '../utils/api';
+import { usePagedList } from '../utils/usePagedList';
+import { LoadMoreButton } from './LoadMoreButton';
 
 interface Notification {
   notification_id: number;
@@ -17,7 +19,11 @@ interface Notification {
 }
 
 export function NotificationBell() {
-  const [notifications, setNotifications] = useState<Notification[]>([]);
+  // Newest first, one page at a time; older pages load on demand
+  const { items: notifications, setItems: setNotifications, hasMore, loadingMore,
+          showPage, loadMore } = usePagedList<Notification>(api.getUserNotifications, 'notifications');
+  // From the server's per-user counter, since most notifications are on pages not loaded yet
+  const [unreadCount, setUnreadCount] = useState(0);
   const [isOpen, setIsOpen] = useState(false);
   const [loading, setLoading] = useState(false);
   const [showAppealModal, setShowAppealModal] = useState(false);
@@ -30,43 +36,65 @@ export function NotificationBell() {
   // Get token for reactivity
   const customerToken = localStorage.getItem('authToken');
 
-  const unreadCount = notifications.filter(n => !n.is_read).length;
-
   useEffect(() => {
-    if (customerToken) {
-      loadNotifications();
-      
-      // Refresh notifications every 30 seconds
-      const interval = setInterval(loadNotifications, 30000);
-      
-      return () => clearInterval(interval);
-    }
-  }, [customerToken]);
+    if (!customerToken) return;
+    let closeStream: (() => void) | null = null;
+    let cancelled = false;
 
-  // Also refresh when opening the notification panel
-  useEffect(() => {
-    if (isOpen) {
-      loadNotifications();
-    }
-  }, [isOpen]);
+    // Load the newest page and the unread count, then let the server push new
+    // notifications. The stream reconnects on its own and resumes from the last event id.
+    loadNotifications().then((latestId) => {
+      if (cancelled) return;
+      closeStream = api.subscribeNotifications((notification: Notification) => {
+        setNotifications(prev =>
+          prev.some(n => n.notification_id === notification.notification_id)
+            ? prev
+            : [notification, ...prev]
+        );
+        // Re-read the counter rather than incrementing, so a replayed event isn't counted twice
+        refreshUnreadCount();
+      }, latestId);
+    });
+
+    return () => {
+      cancelled = true;
+      closeStream?.();
+    };
+  }, [customerToken]);
 
-  const loadNotifications = async () => {
+  // Returns the newest notification id so the stream can resume after it
+  const loadNotifications = async (): Promise<number | undefined> => {
     try {
       setLoading(true);
-      const response = await api.getUserNotifications();
+      const [response] = await Promise.all([api.getUserNotifications(), refreshUnreadCount()]);
       if (response.success) {
-        setNotifications(response.notifications);
+        showPage(response);
+        const ids = response.notifications.map((n: Notification) => n.notification_id);
+        return ids.length ? Math.max(...ids) : 0;
       }
     } catch (error) {
       console.error('Failed to load notifications:', error);
     } finally {
       setLoading(false);
     }
+    return undefined;
+  };
+
+  const refreshUnreadCount = async () => {
+    try {
+      const response = await api.getUnreadNotificationCount();
+      if (response.success) setUnreadCount(response.unread);
+    } catch (error) {
+      console.error('Failed to load unread count:', error);
+    }
   };
 
   const markAsRead = async (notificationId: number) => {
     try {
       await api.markNotificationRead(notificationId);
+      if (notifications.some(n => n.notification_id === notificationId && !n.is_read)) {
+        setUnreadCount(count => Math.max(0, count - 1));
+      }
       setNotifications(prev =>
         prev.map(n =>
           n.notification_id === notificationId
@@ -133,7 +161,10 @@ export function NotificationBell() {
       <Button
         variant="ghost"
         size="sm"
-        onClick={() => setIsOpen(!isOpen)}
+        onClick={() => {
+          if (!isOpen) refreshUnreadCount();
+          setIsOpen(!isOpen);
+        }}
         className="relative text-white hover:bg-white/10"
       >
         <Bell className="w-5 h-5" />
@@ -206,6 +237,7 @@ export function NotificationBell() {
                 </div>
               ))
             )}
+            <LoadMoreButton hasMore={hasMore} loading={loadingMore} onClick={loadMore} />
           </CardContent>
         </Card>
       )}
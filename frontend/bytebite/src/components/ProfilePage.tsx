@@ -9,6 +9,8 @@ import { api, UserProfile, UpdateProfilePayload } from '../utils/api';
 import { LogOut, Edit2, Check, X, CreditCard, Star } from 'lucide-react';
 import { ReviewModal } from './ReviewModal';
 import { OrderDetailsModal } from './OrderDetailsModal';
+import { LoadMoreButton } from './LoadMoreButton';
+import { usePagedList } from '../utils/usePagedList';
 
 // Interface for Order data fetched from backend
 interface Order {
@@ -24,7 +26,9 @@ export function ProfilePage() {
   const location = useLocation();
   
   const [profile, setProfile] = useState<UserProfile | null>(null);
-  const [orders, setOrders] = useState<Order[]>([]); // Store real orders here
+  // Store real orders here, one page at a time
+  const { items: orders, setItems: setOrders, hasMore: hasMoreOrders, loadingMore: loadingMoreOrders,
+          showPage: showOrdersPage, loadMore: loadMoreOrders } = usePagedList<Order>(api.getOrders, 'orders');
   
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
@@ -50,6 +54,14 @@ export function ProfilePage() {
     loadData();
   }, [navigate, location.pathname]);
 
+  // Update order statuses in place as they change
+  useEffect(() => {
+    return api.subscribeOrderEvents(
+      (event) => setOrders(prev => prev.map(o => o.order_id === event.order_id ? { ...o, status: event.status } : o)),
+      { onResync: () => loadData() }
+    );
+  }, []);
+
   const loadData = async () => {
     try {
       setLoading(true);
@@ -74,7 +86,7 @@ export function ProfilePage() {
 
       // Handle Orders Data
       if (ordersRes.success) {
-        setOrders(ordersRes.orders);
+        showOrdersPage(ordersRes);
       }
 
     } catch (err) {
@@ -403,6 +415,8 @@ export function ProfilePage() {
                 </div>
               </div>
             ))}
+
+            <LoadMoreButton hasMore={hasMoreOrders} loading={loadingMoreOrders} onClick={loadMoreOrders} />
           </div>
 
           {/* Review Modal */}
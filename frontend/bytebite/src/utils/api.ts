@@ -64,6 +64,13 @@ export interface HireEmployeePayload {
     role: string;
 }
 
+// Keyset pagination: the backend returns one page (50 rows by default) plus
+// nextCursor; pass it back as `cursor` to get the next page
+export interface PageParams {
+    limit?: number;
+    cursor?: string | null;
+}
+
 // Token helpers
 const getAuthToken = (): string | null => localStorage.getItem("authToken");
 const getEmployeeToken = (): string | null => localStorage.getItem("employeeToken");
@@ -77,10 +84,8 @@ export const isAuthenticated = (): boolean => {
     return getAuthToken() !== null || getEmployeeToken() !== null;
 };
 
-// Core fetch function
-async function fetchAPI(endpoint: string, options: RequestInit = {}): Promise<any> {
-    const url = `${API_BASE_URL}/api/${endpoint.replace(/^\//, "")}`;
-
+// Build request headers, attaching the right token for the endpoint
+function buildHeaders(endpoint: string, options: RequestInit = {}): Headers {
     // Use Headers to safely set fields, wei
     const headers = new Headers(options.headers as HeadersInit);
     if (!headers.has("Content-Type")) headers.set("Content-Type", "application/json");
@@ -89,9 +94,10 @@ async function fetchAPI(endpoint: string, options: RequestInit = {}): Promise<an
     const employeeToken = getEmployeeToken();
 
     let tokenToUse = null;
+    const path = endpoint.split("?")[0];
     
     // If the request path contains 'chef', 'manager', or 'delivery', prioritize using the employee token.
-    if (endpoint.includes('chef') || endpoint.includes('manager') || endpoint.includes('delivery')) {
+    if (path.includes('chef') || path.includes('manager') || path.includes('delivery')) {
         tokenToUse = employeeToken;
     } else {
         // In other situations (such as orders, profile), the customer token is used. If there is no customer token but there is an employee token (for example, an employee testing an order), a combination of both can also be used.
@@ -102,8 +108,11 @@ async function fetchAPI(endpoint: string, options: RequestInit = {}): Promise<an
         headers.set("Authorization", `Bearer ${tokenToUse}`);
     }
 
-    const response = await fetch(url, { ...options, headers }); //wei
-      
+    return headers;
+}
+
+// Parse a response body, throwing on non-2xx statuses
+async function parseResponse(response: Response): Promise<any> {
     // try to parse JSON body safely
     const text = await response.text();
     let body: any = null;
@@ -124,6 +133,122 @@ async function fetchAPI(endpoint: string, options: RequestInit = {}): Promise<an
     return body;
 }
 
+// Append pagination params to an endpoint (which may already have a query string)
+function withPage(endpoint: string, page?: PageParams): string {
+    if (!page) return endpoint;
+    const params = new URLSearchParams();
+    if (page.limit) params.set("limit", String(page.limit));
+    if (page.cursor) params.set("cursor", page.cursor);
+    const query = params.toString();
+    if (!query) return endpoint;
+    return `${endpoint}${endpoint.includes("?") ? "&" : "?"}${query}`;
+}
+
+// Core fetch function
+async function fetchAPI(endpoint: string, options: RequestInit = {}): Promise<any> {
+    const url = `${API_BASE_URL}/api/${endpoint.replace(/^\//, "")}`;
+    const headers = buildHeaders(endpoint, options);
+    const response = await fetch(url, { ...options, headers }); //wei
+    return parseResponse(response);
+}
+
+// Fetch one page of a list endpoint. Without `page` this is the first page;
+// screens load the rest on demand by passing back nextCursor (see usePagedList).
+async function fetchList(endpoint: string, page?: PageParams): Promise<any> {
+    return fetchAPI(withPage(endpoint, page));
+}
+
+// Responses cached by ETag; keyed by endpoint + token since the menu differs for VIPs
+const etagCache = new Map<string, { etag: string; body: any }>();
+
+// GET with If-None-Match revalidation: a 304 reuses the cached body
+async function fetchWithETag(endpoint: string): Promise<any> {
+    const url = `${API_BASE_URL}/api/${endpoint.replace(/^\//, "")}`;
+    const headers = buildHeaders(endpoint);
+    const cacheKey = `${endpoint}|${headers.get("Authorization") || ""}`;
+    const cached = etagCache.get(cacheKey);
+    if (cached) headers.set("If-None-Match", cached.etag);
+
+    const response = await fetch(url, { headers });
+    if (response.status === 304 && cached) {
+        return cached.body;
+    }
+
+    const body = await parseResponse(response);
+    const etag = response.headers.get("ETag");
+    if (etag) etagCache.set(cacheKey, { etag, body });
+    return body;
+}
+
+
+// Open an SSE stream. EventSource can't send headers, so each connection uses
+// a short-lived ticket from POST /api/stream-ticket instead of the login token.
+// The browser reconnects on its own while the ticket is valid; once a reconnect
+// is refused (expired ticket) the stream is reopened with a fresh ticket,
+// resuming after the last event id. Returns a function that closes the stream.
+function openEventStream(
+    path: string,
+    token: string,
+    listeners: Record<string, (event: MessageEvent) => void>,
+    lastEventId?: number
+): () => void {
+    let source: EventSource | null = null;
+    let closed = false;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let lastId = lastEventId !== undefined ? String(lastEventId) : "";
+
+    const reopenLater = () => {
+        if (!closed) retryTimer = setTimeout(open, 5000);
+    };
+
+    async function open() {
+        try {
+            const response = await fetch(`${API_BASE_URL}/api/stream-ticket`, {
+                method: "POST",
+                headers: { Authorization: `Bearer ${token}` },
+            });
+            const { ticket } = await parseResponse(response);
+            if (closed) return;
+
+            const params = new URLSearchParams({ ticket });
+            if (lastId) params.set("lastEventId", lastId);
+            source = new EventSource(`${API_BASE_URL}/api/${path}?${params.toString()}`);
+            for (const [name, listener] of Object.entries(listeners)) {
+                source.addEventListener(name, (event) => {
+                    const message = event as MessageEvent;
+                    if (message.lastEventId) lastId = message.lastEventId;
+                    listener(message);
+                });
+            }
+            source.onerror = () => {
+                if (source?.readyState === EventSource.CLOSED) reopenLater();
+            };
+        } catch (err) {
+            // A rejected login token won't get better by retrying
+            if (![401, 403, 404].includes((err as any)?.status)) reopenLater();
+        }
+    }
+
+    open();
+    return () => {
+        closed = true;
+        clearTimeout(retryTimer);
+        source?.close();
+    };
+}
+
+// Order status change pushed by /api/orders/stream. Delivery-pool events for
+// orders that aren't the driver's own carry only seq, order_id and status.
+export interface OrderEvent {
+    seq: number;
+    order_id: number;
+    status: string;
+    previous_status?: string | null;
+    customer_id?: number;
+    chef_id?: number | null;
+    delivery_person_id?: number | null;
+    at?: string;
+}
 
 // API functions
 export const api = {
@@ -171,15 +296,38 @@ export const api = {
     // Menu operations
     getMenu: (category?: string) => {
         const endpoint = category ? `menu?category=${encodeURIComponent(category)}` : "menu";
-        return fetchAPI(endpoint);
+        return fetchWithETag(endpoint);
     },
 
-    getMenuItem: (itemId: string) => fetchAPI(`menu/${encodeURIComponent(itemId)}`),
+    getMenuItem: (itemId: string) => fetchWithETag(`menu/${encodeURIComponent(itemId)}`),
+
+    // Ranked, typo-tolerant dish search ("ramn" finds "Fusion Ramen Bowl")
+    searchMenu: (query: string, limit?: number) => {
+        const params = new URLSearchParams({ q: query });
+        if (limit) params.set("limit", String(limit));
+        return fetchAPI(`menu/search?${params.toString()}`);
+    },
 
     // Orders
-    getOrders: () => fetchAPI("orders"),
+    getOrders: (page?: PageParams) => fetchList("orders", page),
 
     createOrder: (order: OrderPayload) => fetchAPI("orders", { method: "POST", body: JSON.stringify(order) }),
+
+    quoteOrder: (order: OrderPayload) => fetchAPI("orders/quote", { method: "POST", body: JSON.stringify(order) }),
+
+    // Live order status changes (customers: own orders, chefs: their queue,
+    // drivers: the bidding pool and their deliveries). onResync fires when the
+    // server could not replay missed events and lists should be refetched.
+    // Returns a function that closes the stream.
+    subscribeOrderEvents: (onEvent: (event: OrderEvent) => void, options: { employee?: boolean; onResync?: () => void } = {}) => {
+        const token = options.employee ? getEmployeeToken() : getAuthToken();
+        if (!token) return () => {};
+        const listeners: Record<string, (event: MessageEvent) => void> = {
+            order: (event) => onEvent(JSON.parse(event.data)),
+        };
+        if (options.onResync) listeners.resync = () => options.onResync!();
+        return openEventStream("orders/stream", token, listeners);
+    },
     
     // Reviews //wei
     createReview: (data: { order_id: number, chef_rating: number, dish_rating: number, delivery_rating: number, comment: string, compliment_chef?: boolean, complaint_chef?: boolean, compliment_delivery?: boolean, complaint_delivery?: boolean }) => {
@@ -264,7 +412,7 @@ export const api = {
         body: JSON.stringify({ action }),
     }),
     
-    getAllCustomers: () => fetchAPI("manager/customers"),
+    getAllCustomers: (page?: PageParams) => fetchList("manager/customers", page),
 
 
     // --- Manager: Employee Management ---
@@ -310,8 +458,8 @@ export const api = {
         });
     },
 
-    getFinancialLogs: () => {
-        return fetchAPI("manager/financials");
+    getFinancialLogs: (page?: PageParams) => {
+        return fetchList("manager/financials", page);
     },
 
     // Delivery operations (Added for Bidding System)
@@ -426,21 +574,33 @@ export const api = {
 
 
     // Forum operations
-    getForumPosts: () => fetchAPI("forum/posts"),
+    getForumPosts: (page?: PageParams) => fetchList("forum/posts", page),
     createForumPost: (post: any) => fetchAPI("forum/posts", { method: "POST", body: JSON.stringify(post) }),
-    getPostComments: (postId: string) => fetchAPI(`forum/posts/${postId}/comments`),
+    getPostComments: (postId: string, page?: PageParams) => fetchList(`forum/posts/${postId}/comments`, page),
     createComment: (postId: string, comment: string) => fetchAPI(`forum/posts/${postId}/comments`, { method: "POST", body: JSON.stringify({ content: comment }) }),
     reportForumContent: (report: any) => fetchAPI("forum/reports", { method: "POST", body: JSON.stringify(report) }),
-    getForumReports: () => fetchAPI("manager/forum-reports"),
+    getForumReports: (page?: PageParams) => fetchList("manager/forum-reports", page),
     updateReportStatus: (reportId: number, status: string) => fetchAPI(`manager/forum-reports/${reportId}`, { method: "PUT", body: JSON.stringify({ status }) }),
 
     // Notification endpoints
-    getUserNotifications: () => fetchAPI("user/notifications"),
+    getUserNotifications: (page?: PageParams) => fetchList("user/notifications", page),
+    getNewNotifications: (sinceId: number) => fetchList(`user/notifications?since=${sinceId}`),
+    getUnreadNotificationCount: () => fetchAPI("user/notifications/unread-count"),
     markNotificationRead: (notificationId: number) => fetchAPI(`user/notifications/${notificationId}/read`, { method: "PUT" }),
+    markNotificationsRead: (ids: number[]) => fetchAPI("user/notifications/read", { method: "PUT", body: JSON.stringify({ ids }) }),
+    markNotificationRangeRead: (fromId?: number, toId?: number) => fetchAPI("user/notifications/read", { method: "PUT", body: JSON.stringify({ from_id: fromId, to_id: toId }) }),
+    // Push new notifications (SSE), starting after lastEventId. Returns a function that closes the stream.
+    subscribeNotifications: (onNotification: (notification: any) => void, lastEventId?: number) => {
+        const token = getAuthToken() || getEmployeeToken();
+        if (!token) return () => {};
+        return openEventStream("user/notifications/stream", token, {
+            notification: (event) => onNotification(JSON.parse(event.data)),
+        }, lastEventId);
+    },
 
     // Complaint endpoints
     fileComplaint: (complaint: any) => fetchAPI("complaints", { method: "POST", body: JSON.stringify(complaint) }),
-    getComplaints: () => fetchAPI("complaints"),
+    getComplaints: (page?: PageParams) => fetchList("complaints", page),
     reviewComplaint: (complaintId: string, review: any) => fetchAPI(`complaints/${complaintId}/review`, { method: "PUT", body: JSON.stringify(review) }),
     disputeComplaint: (complaintId: number, dispute: any) => fetchAPI(`complaints/${complaintId}/dispute`, { method: "PUT", body: JSON.stringify(dispute) }),
     appealComplaint: (complaintId: number, appeal: any) => fetchAPI(`complaints/${complaintId}/appeal`, { method: "POST", body: JSON.stringify(appeal) }),
@@ -0,0 +1,38 @@
+import { useCallback, useRef, useState } from 'react';
+import { PageParams } from './api';
+
+// List state for a keyset-paged endpoint. showPage() replaces the list with a
+// freshly fetched first page; loadMore() appends the page after nextCursor.
+// A loadMore() still in flight when showPage() runs is dropped, so a refresh
+// never gets rows from the previous cursor chain appended to it.
+export function usePagedList<T>(fetchPage: (page?: PageParams) => Promise<any>, listKey: string) {
+    const [items, setItems] = useState<T[]>([]);
+    const [cursor, setCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const generation = useRef(0);
+
+    const showPage = useCallback((response: any) => {
+        generation.current += 1;
+        setItems(response?.[listKey] ?? []);
+        setCursor(response?.nextCursor ?? null);
+        setLoadingMore(false);
+    }, [listKey]);
+
+    const loadMore = async () => {
+        if (!cursor || loadingMore) return;
+        const started = generation.current;
+        setLoadingMore(true);
+        try {
+            const response = await fetchPage({ cursor });
+            if (started !== generation.current) return;
+            setItems(prev => [...prev, ...(response?.[listKey] ?? [])]);
+            setCursor(response?.nextCursor ?? null);
+        } catch (err) {
+            console.error(`Failed to load more ${listKey}:`, err);
+        } finally {
+            if (started === generation.current) setLoadingMore(false);
+        }
+    };
+
+    return { items, setItems, hasMore: cursor !== null, loadingMore, showPage, loadMore };
+}